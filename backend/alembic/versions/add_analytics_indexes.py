@@ -0,0 +1,62 @@
+"""add composite and partial indexes for analytics queries
+
+Revision ID: add_analytics_indexes
+Revises: add_engagement_rollups
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_analytics_indexes'
+down_revision = 'add_engagement_rollups'
+branch_labels = None
+depends_on = None
+
+# (name, table, columns, unique, partial predicate)
+INDEXES = [
+    ('ix_login_events_user_id_login_timestamp', 'login_events', ['user_id', sa.text('login_timestamp DESC')], False, None),
+    ('ix_login_events_open_sessions', 'login_events', ['user_id', sa.text('login_timestamp DESC')], False, 'session_duration_seconds IS NULL'),
+    ('ix_login_events_login_timestamp', 'login_events', ['login_timestamp'], False, None),
+    ('ix_logout_events_login_event_id', 'logout_events', ['login_event_id'], False, None),
+    ('ix_logout_events_user_id_logout_timestamp', 'logout_events', ['user_id', 'logout_timestamp'], False, None),
+    ('ix_page_visits_user_id_entry_time', 'page_visits', ['user_id', 'entry_time'], False, None),
+    ('ix_page_visits_entry_time', 'page_visits', ['entry_time'], False, None),
+    ('ix_form_submissions_user_id', 'form_submissions', ['user_id'], False, None),
+    ('uq_personalized_presentations_active_user', 'personalized_presentations', ['user_id'], True, 'is_active'),
+]
+
+
+def upgrade():
+    duplicates = [] if op.get_context().as_sql else op.get_bind().execute(sa.text(
+        "SELECT user_id FROM personalized_presentations WHERE is_active "
+        "GROUP BY user_id HAVING count(*) > 1"
+    )).scalars().all()
+    if duplicates:
+        raise RuntimeError(
+            "Users with more than one active personalized presentation: "
+            f"{sorted(duplicates)}. Deactivate the extras before upgrading."
+        )
+    
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction; it avoids
+    # locking out writes to the event tables while the indexes build. A failed
+    # build leaves an INVALID index that IF NOT EXISTS would skip, so drop it
+    # before re-running.
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique, where in INDEXES:
+            op.create_index(
+                name, table, columns,
+                unique=unique,
+                if_not_exists=True,
+                postgresql_concurrently=True,
+                postgresql_where=sa.text(where) if where else None,
+                sqlite_where=sa.text(where) if where else None,
+            )
+
+
+def downgrade():
+    with op.get_context().autocommit_block():
+        for name, table, columns, unique, where in reversed(INDEXES):
+            op.drop_index(name, table_name=table, if_exists=True, postgresql_concurrently=True)
@@ -0,0 +1,58 @@
+"""add daily engagement rollup tables
+
+Revision ID: add_engagement_rollups
+Revises: add_personalized_presentations
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_engagement_rollups'
+down_revision = 'add_personalized_presentations'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_user_engagement',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('page_visits', sa.Integer(), nullable=True),
+        sa.Column('page_time_seconds', sa.Float(), nullable=True),
+        sa.Column('logins', sa.Integer(), nullable=True),
+        sa.Column('completed_sessions', sa.Integer(), nullable=True),
+        sa.Column('session_time_seconds', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('user_id', 'day')
+    )
+    op.create_index(op.f('ix_daily_user_engagement_day'), 'daily_user_engagement', ['day'], unique=False)
+    
+    op.create_table('daily_page_engagement',
+        sa.Column('page_name', sa.String(), nullable=False),
+        sa.Column('day', sa.Date(), nullable=False),
+        sa.Column('visits', sa.Integer(), nullable=True),
+        sa.Column('unique_users', sa.Integer(), nullable=True),
+        sa.Column('completed_visits', sa.Integer(), nullable=True),
+        sa.Column('total_duration_seconds', sa.Float(), nullable=True),
+        sa.PrimaryKeyConstraint('page_name', 'day')
+    )
+    op.create_index(op.f('ix_daily_page_engagement_day'), 'daily_page_engagement', ['day'], unique=False)
+    
+    op.create_table('rollup_state',
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('last_page_visit_id', sa.Integer(), nullable=True),
+        sa.Column('last_login_event_id', sa.Integer(), nullable=True),
+        sa.Column('covered_until', sa.Date(), nullable=True),
+        sa.Column('refreshed_at', sa.DateTime(timezone=True), nullable=True),
+        sa.PrimaryKeyConstraint('name')
+    )
+
+
+def downgrade():
+    op.drop_table('rollup_state')
+    op.drop_index(op.f('ix_daily_page_engagement_day'), table_name='daily_page_engagement')
+    op.drop_table('daily_page_engagement')
+    op.drop_index(op.f('ix_daily_user_engagement_day'), table_name='daily_user_engagement')
+    op.drop_table('daily_user_engagement')
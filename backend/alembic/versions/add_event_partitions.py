@@ -0,0 +1,44 @@
+"""partition page_visits and login_events by month (opt-in)
+
+Revision ID: add_event_partitions
+Revises: add_analytics_indexes
+Create Date: 2026-10-18 00:00:00.000000
+
+Only runs on Postgres with PARTITION_EVENT_TABLES enabled; otherwise it is a
+no-op and the tables can be converted later with
+``python partition_job.py --convert``. Converting copies every row, so run it
+in a maintenance window.
+
+"""
+from alembic import op
+from config import settings
+from partitions import PARTITIONED_TABLES, is_partitioned, convert_to_partitioned, convert_to_regular
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_event_partitions'
+down_revision = 'add_analytics_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    if not settings.PARTITION_EVENT_TABLES or op.get_context().dialect.name != "postgresql":
+        return
+    if op.get_context().as_sql:
+        raise RuntimeError("Partitioning reads the existing rows; run this revision against the database")
+    
+    conn = op.get_bind()
+    for table in PARTITIONED_TABLES:
+        if not is_partitioned(conn, table):
+            convert_to_partitioned(conn, table, settings.PARTITION_MONTHS_AHEAD)
+
+
+def downgrade():
+    if op.get_context().dialect.name != "postgresql" or op.get_context().as_sql:
+        return
+    
+    conn = op.get_bind()
+    for table in PARTITIONED_TABLES:
+        if is_partitioned(conn, table):
+            convert_to_regular(conn, table)
@@ -0,0 +1,51 @@
+"""add presentation templates and per-user slide overrides
+
+Revision ID: add_presentation_templates
+Revises: add_presentation_versions
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_presentation_templates'
+down_revision = 'add_presentation_versions'
+branch_labels = None
+depends_on = None
+
+JSON_DOCUMENT = sa.JSON().with_variant(postgresql.JSONB(), 'postgresql')
+
+
+def upgrade():
+    op.create_table('presentation_templates',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(), nullable=False),
+        sa.Column('title', sa.String(), nullable=True),
+        sa.Column('subtitle', sa.String(), nullable=True),
+        sa.Column('slides', JSON_DOCUMENT, nullable=False),
+        sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+        sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.Column('updated_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('name')
+    )
+    op.create_index(op.f('ix_presentation_templates_id'), 'presentation_templates', ['id'], unique=False)
+    op.add_column('personalized_presentations', sa.Column('template_id', sa.Integer(), nullable=True))
+    op.add_column('personalized_presentations', sa.Column('slide_overrides', JSON_DOCUMENT, nullable=True))
+    op.create_foreign_key(
+        'personalized_presentations_template_id_fkey', 'personalized_presentations',
+        'presentation_templates', ['template_id'], ['id']
+    )
+    op.create_index('ix_personalized_presentations_template_id', 'personalized_presentations', ['template_id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_personalized_presentations_template_id', table_name='personalized_presentations')
+    op.drop_constraint('personalized_presentations_template_id_fkey', 'personalized_presentations', type_='foreignkey')
+    op.drop_column('personalized_presentations', 'slide_overrides')
+    op.drop_column('personalized_presentations', 'template_id')
+    op.drop_index(op.f('ix_presentation_templates_id'), table_name='presentation_templates')
+    op.drop_table('presentation_templates')
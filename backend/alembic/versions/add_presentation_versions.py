@@ -0,0 +1,38 @@
+"""store presentation slides as JSONB and add an edit version
+
+Revision ID: add_presentation_versions
+Revises: add_sessions
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_presentation_versions'
+down_revision = 'add_sessions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.add_column('personalized_presentations', sa.Column('version', sa.Integer(), server_default='1', nullable=False))
+    if op.get_context().dialect.name == 'postgresql':
+        # Rewrites the table; JSONB is stored parsed, so single slides can be edited in SQL
+        op.alter_column(
+            'personalized_presentations', 'slides',
+            type_=postgresql.JSONB(), existing_type=sa.JSON(),
+            postgresql_using='slides::jsonb'
+        )
+
+
+def downgrade():
+    if op.get_context().dialect.name == 'postgresql':
+        op.alter_column(
+            'personalized_presentations', 'slides',
+            type_=sa.JSON(), existing_type=postgresql.JSONB(),
+            postgresql_using='slides::json'
+        )
+    op.drop_column('personalized_presentations', 'version')
@@ -0,0 +1,39 @@
+"""add sessions table built from page visit gaps
+
+Revision ID: add_sessions
+Revises: add_event_partitions
+Create Date: 2026-10-18 00:00:00.000000
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'add_sessions'
+down_revision = 'add_event_partitions'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('sessions',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('started_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('ended_at', sa.DateTime(timezone=True), nullable=False),
+        sa.Column('duration_seconds', sa.Float(), nullable=False),
+        sa.Column('page_visits', sa.Integer(), nullable=False),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+        sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index('ix_sessions_user_id_started_at', 'sessions', ['user_id', 'started_at'], unique=False)
+    op.create_index('ix_sessions_started_at', 'sessions', ['started_at'], unique=False)
+    op.create_index('ix_sessions_ended_at', 'sessions', ['ended_at'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_sessions_ended_at', table_name='sessions')
+    op.drop_index('ix_sessions_started_at', table_name='sessions')
+    op.drop_index('ix_sessions_user_id_started_at', table_name='sessions')
+    op.drop_table('sessions')
@@ -1,17 +1,28 @@
+import hashlib
+import time
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import HTTPException, status, Depends
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from sqlalchemy.orm import Session
 from database import get_db
 from models import User
 from config import settings
+from ttl_cache import TTLCache
+from password_hashing import pwd_context
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 security = HTTPBearer()
 
+# Decoded claims keyed by token digest, so repeat requests skip the signature check
+#
+# Cached claims only prove the token is genuine; whether its user still
+# exists and what role they hold is resolved per request (dependencies.py),
+# and delete_user drops that through invalidate_principal(). Tokens carry no
+# revocation state of their own, so a deleted user is refused at once on the
+# worker that deleted them and within PRINCIPAL_CACHE_TTL_SECONDS elsewhere.
+token_cache = TTLCache(settings.TOKEN_CACHE_SIZE, settings.TOKEN_CACHE_TTL_SECONDS)
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return pwd_context.verify(plain_password, hashed_password)
 
@@ -28,12 +39,29 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, settings.SECRET_KEY, algorithm=settings.ALGORITHM)
     return encoded_jwt
 
+def _token_digest(token: str) -> bytes:
+    return hashlib.sha256(token.encode()).digest()
+
 def verify_token(token: str) -> Optional[dict]:
+    digest = _token_digest(token)
+    claims = token_cache.get(digest)
+    if claims is not None:
+        exp = claims.get("exp")
+        if exp is None or exp > time.time():
+            return dict(claims)
+        token_cache.pop(digest)
+        return None
+    
     try:
         payload = jwt.decode(token, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        return payload
     except JWTError:
         return None
+    
+    # Never cache a token past its own expiry; failed tokens are not cached at all
+    exp = payload.get("exp")
+    ttl = exp - time.time() if isinstance(exp, (int, float)) else None
+    token_cache.set(digest, payload, ttl)
+    return dict(payload)
 
 def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(security), db: Session = Depends(get_db)) -> User:
     credentials_exception = HTTPException(
@@ -42,12 +70,11 @@ def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(securit
         headers={"WWW-Authenticate": "Bearer"},
     )
     
-    try:
-        payload = jwt.decode(credentials.credentials, settings.SECRET_KEY, algorithms=[settings.ALGORITHM])
-        user_id: str = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
+    payload = verify_token(credentials.credentials)
+    if payload is None:
+        raise credentials_exception
+    user_id: str = payload.get("sub")
+    if user_id is None:
         raise credentials_exception
     
     user = db.query(User).filter(User.id == int(user_id)).first()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Print query plans for the hot analytics queries.
+
+Run from the backend directory before and after `alembic upgrade head` and
+diff the output to see which queries pick up the new indexes:
+    python -m benchmarks.explain_hot_queries [--user-id N] [--analyze]
+"""
+
+import argparse
+from datetime import datetime, timedelta, timezone
+from sqlalchemy import func, select, text
+from database import engine, SessionLocal
+from models import FormSubmission, LoginEvent, LogoutEvent, PageVisit, PersonalizedPresentation
+
+def hot_queries(user_id: int, user_ids: list) -> dict:
+    """Statements shaped like the ones the routes and jobs issue"""
+    now = datetime.now(timezone.utc)
+    latest_logout = select(
+        LogoutEvent.login_event_id.label("login_event_id"),
+        func.max(LogoutEvent.logout_timestamp).label("logout_timestamp")
+    ).where(LogoutEvent.user_id.in_(user_ids)).group_by(LogoutEvent.login_event_id).subquery()
+    
+    return {
+        "open session for logout (record_logout)": select(LoginEvent).where(
+            LoginEvent.user_id == user_id,
+            LoginEvent.session_duration_seconds.is_(None),
+            LoginEvent.login_timestamp <= now
+        ).order_by(LoginEvent.login_timestamp.desc()).limit(1),
+        "logout for a login event (record_logout)": select(LogoutEvent).where(
+            LogoutEvent.login_event_id == 1
+        ).limit(1),
+        "sessions with latest logout (simplified-analytics)": select(
+            LoginEvent.user_id,
+            LoginEvent.login_timestamp,
+            LoginEvent.session_duration_seconds,
+            latest_logout.c.logout_timestamp
+        ).outerjoin(
+            latest_logout, latest_logout.c.login_event_id == LoginEvent.id
+        ).where(LoginEvent.user_id.in_(user_ids)).order_by(LoginEvent.user_id, LoginEvent.login_timestamp.desc()),
+        "page visits for a page of users (user-analytics)": select(PageVisit).where(
+            PageVisit.user_id.in_(user_ids)
+        ),
+        "page visits for one user (my-analytics)": select(PageVisit).where(PageVisit.user_id == user_id),
+        "form submission for a user (submit/my-submission)": select(FormSubmission).where(
+            FormSubmission.user_id == user_id
+        ).limit(1),
+        "active presentation for a user": select(PersonalizedPresentation).where(
+            PersonalizedPresentation.user_id == user_id,
+            PersonalizedPresentation.is_active
+        ).limit(1),
+        "page visits in a day range (rollups)": select(PageVisit).where(
+            PageVisit.entry_time >= now - timedelta(days=1),
+            PageVisit.entry_time < now
+        ),
+    }
+
+def explain_prefix(dialect: str, analyze: bool) -> str:
+    if dialect == "postgresql":
+        return "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+    return "EXPLAIN QUERY PLAN "
+
+def main():
+    parser = argparse.ArgumentParser(description="Print EXPLAIN plans for the hot analytics queries")
+    parser.add_argument("--user-id", type=int, help="User to plan for; defaults to the one with the most logins")
+    parser.add_argument("--analyze", action="store_true", help="Run the queries too (Postgres EXPLAIN ANALYZE)")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        user_id = args.user_id or db.scalar(
+            select(LoginEvent.user_id).group_by(LoginEvent.user_id).order_by(func.count().desc()).limit(1)
+        ) or 1
+        user_ids = list(db.scalars(select(LoginEvent.user_id).distinct().limit(100))) or [user_id]
+        prefix = explain_prefix(engine.dialect.name, args.analyze)
+        
+        print(f"🔍 Query plans on {engine.dialect.name} for user {user_id}")
+        for name, statement in hot_queries(user_id, user_ids).items():
+            sql = str(statement.compile(engine, compile_kwargs={"literal_binds": True}))
+            print(f"\n=== {name}")
+            for row in db.execute(text(prefix + sql)):
+                print("   ", " ".join(str(value) for value in row))
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
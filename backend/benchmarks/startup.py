@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Startup benchmark: how long `import main` takes and how long a fresh uvicorn
+process needs to answer its first request.
+
+Run from the backend directory against the database and Redis configured in
+the environment:
+    python -m benchmarks.startup --runs 5
+
+Pass --max-import / --max-first-request (seconds) to fail when the median
+exceeds a budget, e.g. in CI.
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = "import time; start = time.perf_counter(); import main; print(time.perf_counter() - start)"
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def measure_import() -> float:
+    output = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=BACKEND_DIR, capture_output=True, text=True, check=True,
+    ).stdout
+    return float(output.strip().splitlines()[-1])
+
+def measure_first_request(timeout: float) -> float:
+    port = free_port()
+    start = time.perf_counter()
+    server = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning"],
+        cwd=BACKEND_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f"http://127.0.0.1:{port}/", timeout=1):
+                    return time.perf_counter() - start
+            except (urllib.error.URLError, ConnectionError):
+                if server.poll() is not None:
+                    raise RuntimeError(f"server exited with code {server.returncode}")
+                time.sleep(0.01)
+        raise RuntimeError(f"no response within {timeout}s")
+    finally:
+        server.terminate()
+        server.wait()
+
+def report(name: str, samples: list, budget: float) -> bool:
+    median = statistics.median(samples)
+    within = budget is None or median <= budget
+    status = "" if budget is None else (" ✅" if within else f" ❌ over {budget * 1000:.0f} ms budget")
+    print(f"   {name:<15} median {median * 1000:>8.1f} ms  min {min(samples) * 1000:>8.1f} ms{status}")
+    return within
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--timeout", type=float, default=30.0, help="Seconds to wait for the first response")
+    parser.add_argument("--max-import", type=float, help="Fail when the median import time exceeds this")
+    parser.add_argument("--max-first-request", type=float, help="Fail when the median time to first response exceeds this")
+    args = parser.parse_args()
+    
+    print(f"🚀 Measuring startup over {args.runs} runs")
+    imports = [measure_import() for _ in range(args.runs)]
+    first_requests = [measure_first_request(args.timeout) for _ in range(args.runs)]
+    
+    ok = report("import main", imports, args.max_import)
+    ok = report("first request", first_requests, args.max_first_request) and ok
+    if not ok:
+        sys.exit(1)
+    print("✅ Startup within budget")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Throughput benchmark for a running API at increasing connection counts.
+
+Start the server the way production does, e.g.
+    gunicorn main:app -k uvicorn.workers.UvicornWorker --workers 4 --bind 0.0.0.0:8000
+then, from the backend directory (requires httpx):
+    python -m benchmarks.throughput --email user@example.com --password secret
+
+Run it against a build from before and after a change to compare them.
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+import httpx
+
+async def login(client: httpx.AsyncClient, email: str, password: str) -> str:
+    response = await client.post("/auth/auth/login", json={"email": email, "password": password})
+    response.raise_for_status()
+    return response.json()["access_token"]
+
+async def worker(client: httpx.AsyncClient, args, headers: dict, deadline: float, latencies: list, errors: list):
+    body = json.loads(args.body) if args.body else None
+    while time.perf_counter() < deadline:
+        start = time.perf_counter()
+        try:
+            response = await client.request(args.method, args.path, json=body, headers=headers)
+            if response.status_code >= 400:
+                errors.append(response.status_code)
+            else:
+                latencies.append(time.perf_counter() - start)
+        except httpx.HTTPError as e:
+            errors.append(type(e).__name__)
+
+async def run_level(args, token: str, concurrency: int):
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=args.timeout) as client:
+        headers = {"Authorization": f"Bearer {token}"}
+        latencies, errors = [], []
+        deadline = time.perf_counter() + args.duration
+        await asyncio.gather(*(
+            worker(client, args, headers, deadline, latencies, errors)
+            for _ in range(concurrency)
+        ))
+    
+    if latencies:
+        quantiles = statistics.quantiles(latencies, n=100)
+        p50, p99 = quantiles[49] * 1000, quantiles[98] * 1000
+    else:
+        p50 = p99 = float("nan")
+    print(f"   {concurrency:>5} {len(latencies) / args.duration:>10.1f} {p50:>9.1f} {p99:>9.1f} {len(errors):>7}")
+
+async def main_async(args):
+    async with httpx.AsyncClient(base_url=args.url, timeout=args.timeout) as client:
+        token = await login(client, args.email, args.password)
+    
+    print(f"🚀 {args.method} {args.path} for {args.duration}s per level against {args.url}")
+    print(f"   {'conns':>5} {'req/s':>10} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for concurrency in args.concurrency:
+        await run_level(args, token, concurrency)
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure API throughput at increasing connection counts")
+    parser.add_argument("--url", default="http://localhost:8000")
+    parser.add_argument("--email", required=True)
+    parser.add_argument("--password", required=True)
+    parser.add_argument("--method", default="POST")
+    parser.add_argument("--path", default="/analytics/analytics/page-visit")
+    parser.add_argument("--body", default='{"page_name": "benchmark"}', help="JSON request body, empty for none")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[10, 50, 100, 200, 500])
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds per concurrency level")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    asyncio.run(main_async(parser.parse_args()))
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,102 @@
-from sqlalchemy import create_engine
+import time
+from prometheus_client import Counter, Gauge, Histogram
+from sqlalchemy import create_engine, exc
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import AsyncAdaptedQueuePool, NullPool, QueuePool
 from config import settings
 
-engine = create_engine(settings.DATABASE_URL)
+# Async drivers for the request path; scripts and workers keep the sync engine
+ASYNC_DRIVERS = {
+    "postgresql": "postgresql+asyncpg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+POOL_CHECKOUT_WAIT = Histogram(
+    'db_pool_checkout_wait_seconds',
+    'Time spent waiting to check a connection out of the pool',
+    ['pool'],
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30)
+)
+POOL_CHECKOUT_TIMEOUTS = Counter(
+    'db_pool_checkout_timeouts_total',
+    'Checkouts that gave up after DB_POOL_TIMEOUT',
+    ['pool']
+)
+# Summed over live gunicorn workers in multiprocess mode
+POOL_CHECKED_OUT = Gauge('db_pool_checked_out', 'Connections currently checked out', ['pool'], multiprocess_mode='livesum')
+POOL_OVERFLOW = Gauge('db_pool_overflow', 'Connections open beyond DB_POOL_SIZE', ['pool'], multiprocess_mode='livesum')
+POOL_SIZE = Gauge('db_pool_size', 'Configured pool size', ['pool'], multiprocess_mode='livesum')
+
+class _InstrumentedPoolMixin:
+    metrics_label = "sync"
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        POOL_SIZE.labels(pool=self.metrics_label).set(self.size())
+    
+    def _update_occupancy(self):
+        POOL_CHECKED_OUT.labels(pool=self.metrics_label).set(self.checkedout())
+        POOL_OVERFLOW.labels(pool=self.metrics_label).set(max(self.overflow(), 0))
+    
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except exc.TimeoutError:
+            POOL_CHECKOUT_TIMEOUTS.labels(pool=self.metrics_label).inc()
+            raise
+        finally:
+            POOL_CHECKOUT_WAIT.labels(pool=self.metrics_label).observe(time.perf_counter() - start)
+        self._update_occupancy()
+        return connection
+    
+    def _do_return_conn(self, record):
+        super()._do_return_conn(record)
+        self._update_occupancy()
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    """QueuePool that reports checkout wait time, timeouts and occupancy"""
+
+class InstrumentedAsyncQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    """AsyncAdaptedQueuePool that reports checkout wait time, timeouts and occupancy"""
+    metrics_label = "async"
+
+def async_database_url(url: str) -> str:
+    scheme, rest = url.split("://", 1)
+    return f"{ASYNC_DRIVERS.get(scheme.split('+')[0], scheme)}://{rest}"
+
+def engine_options(url: str, poolclass) -> dict:
+    """Pool settings from config, or none at all when PgBouncer does the pooling"""
+    if url.startswith("sqlite"):
+        # Local development; the SQLite dialects pick pools that suit file databases
+        return {}
+    
+    if settings.DB_PGBOUNCER:
+        options = {"poolclass": NullPool}
+        if url.startswith("postgresql+asyncpg"):
+            # Transaction pooling can hand each statement a different server connection
+            options["connect_args"] = {"statement_cache_size": 0, "prepared_statement_cache_size": 0}
+        return options
+    
+    return {
+        "poolclass": poolclass,
+        "pool_size": settings.DB_POOL_SIZE,
+        "max_overflow": settings.DB_MAX_OVERFLOW,
+        "pool_timeout": settings.DB_POOL_TIMEOUT,
+        "pool_recycle": settings.DB_POOL_RECYCLE,
+        "pool_pre_ping": settings.DB_POOL_PRE_PING,
+    }
+
+engine = create_engine(settings.DATABASE_URL, **engine_options(settings.DATABASE_URL, InstrumentedQueuePool))
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+ASYNC_DATABASE_URL = async_database_url(settings.DATABASE_URL)
+async_engine = create_async_engine(ASYNC_DATABASE_URL, **engine_options(ASYNC_DATABASE_URL, InstrumentedAsyncQueuePool))
+# Objects stay readable after commit, like the sync routes' refresh-then-return pattern
+AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
 Base = declarative_base()
 
 def get_db():
@@ -13,4 +104,8 @@ def get_db():
     try:
         yield db
     finally:
-        db.close() 
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
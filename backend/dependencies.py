@@ -1,18 +1,38 @@
+import json
+from dataclasses import dataclass, asdict
+from typing import Optional
+import redis
+import structlog
 from fastapi import Depends, HTTPException, status, Cookie
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
-from sqlalchemy.orm import Session
-from database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from database import get_async_db
 from models import User
 from auth import verify_token
+from config import settings
+from ttl_cache import TTLCache
+import redis_conn
+
+logger = structlog.get_logger()
 
 security = HTTPBearer()
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials = Depends(security),
-    db: Session = Depends(get_db)
-) -> User:
-    token = credentials.credentials
-    payload = verify_token(token)
+@dataclass(frozen=True)
+class Principal:
+    """The parts of a user most requests need, cacheable without a session"""
+    id: int
+    role: str
+    username: str
+
+# Per-worker cache; entries in other workers can outlive an invalidation by at most the TTL
+principal_cache = TTLCache(settings.PRINCIPAL_CACHE_SIZE, settings.PRINCIPAL_CACHE_TTL_SECONDS)
+
+def _principal_key(user_id: int) -> str:
+    return f"principal:{user_id}"
+
+def _user_id_from_credentials(credentials: HTTPAuthorizationCredentials) -> int:
+    payload = verify_token(credentials.credentials)
     if payload is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -20,15 +40,79 @@ def get_current_user(
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    user_id: int = payload.get("sub")
-    if user_id is None:
+    try:
+        return int(payload.get("sub"))
+    except (TypeError, ValueError):
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
             headers={"WWW-Authenticate": "Bearer"},
         )
+
+async def load_principal(user_id: int, db: AsyncSession) -> Optional[Principal]:
+    """Resolve a principal from the local cache, then Redis, then the database"""
+    principal = principal_cache.get(user_id)
+    if principal is not None:
+        return principal
+    
+    client = redis_conn.async_redis_client
+    if client is not None:
+        try:
+            cached = await client.get(_principal_key(user_id))
+            if cached is not None:
+                principal = Principal(**json.loads(cached))
+                principal_cache.set(user_id, principal)
+                return principal
+        except redis.RedisError as e:
+            logger.warning("Principal cache lookup failed", user_id=user_id, error=str(e))
+    
+    row = (await db.execute(
+        select(User.id, User.role, User.username).where(User.id == user_id)
+    )).first()
+    if row is None:
+        return None
+    
+    principal = Principal(id=row.id, role=row.role, username=row.username)
+    principal_cache.set(user_id, principal)
+    if client is not None:
+        try:
+            await client.set(_principal_key(user_id), json.dumps(asdict(principal)), ex=settings.PRINCIPAL_REDIS_TTL_SECONDS)
+        except redis.RedisError as e:
+            logger.warning("Principal cache store failed", user_id=user_id, error=str(e))
+    return principal
+
+def invalidate_principal(user_id: int):
+    """Drop a cached principal after the user is deleted or their role changes"""
+    principal_cache.pop(user_id)
+    client = redis_conn.redis_client
+    if client is not None:
+        try:
+            client.delete(_principal_key(user_id))
+        except redis.RedisError as e:
+            logger.warning("Principal cache invalidation failed", user_id=user_id, error=str(e))
+
+async def get_current_principal(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> Principal:
+    """Like get_current_user, but usually answered without a database round trip"""
+    user_id = _user_id_from_credentials(credentials)
+    principal = await load_principal(user_id, db)
+    if principal is None:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="User not found",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+    return principal
+
+async def get_current_user(
+    credentials: HTTPAuthorizationCredentials = Depends(security),
+    db: AsyncSession = Depends(get_async_db)
+) -> User:
+    user_id = _user_id_from_credentials(credentials)
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = await db.get(User, user_id)
     if user is None:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
@@ -38,10 +122,10 @@ def get_current_user(
     
     return user
 
-def get_current_admin_user(current_user: User = Depends(get_current_user)) -> User:
+async def get_current_admin_user(current_user: Principal = Depends(get_current_principal)) -> Principal:
     if current_user.role != "admin":
         raise HTTPException(
             status_code=status.HTTP_403_FORBIDDEN,
             detail="Not enough permissions"
         )
-    return current_user 
\ No newline at end of file
+    return current_user
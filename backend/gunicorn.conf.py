@@ -0,0 +1,43 @@
+"""
+Gunicorn settings for production, used by Dockerfile.prod.
+
+Sets up prometheus_client multiprocess mode so /metrics aggregates every
+worker: each worker writes its samples under PROMETHEUS_MULTIPROC_DIR.
+
+The app is imported once in the master and forked (preload_app), so workers
+start without repeating the imports. Connections are opened in each worker's
+lifespan startup, after the fork.
+"""
+
+import os
+import shutil
+from prometheus_client import multiprocess
+
+bind = "0.0.0.0:8000"
+worker_class = "uvicorn.workers.UvicornWorker"
+workers = int(os.environ.get("WORKER_PROCESSES", 4))
+max_requests = int(os.environ.get("MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.environ.get("MAX_REQUESTS_JITTER", 100))
+timeout = int(os.environ.get("TIMEOUT", 30))
+keepalive = int(os.environ.get("KEEP_ALIVE", 2))
+preload_app = os.environ.get("GUNICORN_PRELOAD", "true").lower() in ("1", "true", "yes")
+
+def on_starting(server):
+    # Samples left by a previous run would be summed into the new one
+    directory = os.environ.get("PROMETHEUS_MULTIPROC_DIR")
+    if directory:
+        shutil.rmtree(directory, ignore_errors=True)
+        os.makedirs(directory, exist_ok=True)
+
+def post_fork(server, worker):
+    # Forget any pooled connections inherited from the master without
+    # closing them, since they belong to its sockets
+    if preload_app:
+        from database import engine, async_engine
+        engine.dispose(close=False)
+        async_engine.sync_engine.dispose(close=False)
+
+def child_exit(server, worker):
+    # Drop live gauges of workers that exit, e.g. after max_requests
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+"""
+Ingestion worker
+Drains the analytics event stream into Postgres in large batches
+"""
+
+import json
+import os
+import signal
+import socket
+import redis
+import structlog
+from config import settings
+from database import SessionLocal
+from ingestion import apply_events, decode_event
+import redis_conn
+import response_cache
+
+logger = structlog.get_logger()
+
+running = True
+
+def stop(signum, frame):
+    global running
+    running = False
+
+def ensure_group(client):
+    """Create the consumer group (and stream) if they don't exist yet"""
+    try:
+        client.xgroup_create(settings.INGESTION_STREAM, settings.INGESTION_CONSUMER_GROUP, id="0", mkstream=True)
+    except redis.ResponseError as e:
+        if "BUSYGROUP" not in str(e):
+            raise
+
+def acknowledge(client, message_ids):
+    if not message_ids:
+        return
+    pipe = client.pipeline()
+    pipe.xack(settings.INGESTION_STREAM, settings.INGESTION_CONSUMER_GROUP, *message_ids)
+    pipe.xdel(settings.INGESTION_STREAM, *message_ids)
+    pipe.hdel(settings.INGESTION_ERRORS_KEY, *message_ids)
+    pipe.execute()
+
+def record_errors(client, failed):
+    """Remember why each message failed, for when it is dead-lettered by
+    whichever consumer reclaims it last"""
+    if failed:
+        client.hset(settings.INGESTION_ERRORS_KEY, mapping=failed)
+
+def _text(value):
+    return value.decode() if isinstance(value, bytes) else value
+
+def dead_letter(client, message_id, fields, deliveries, error=None):
+    """Move a message that keeps failing to the dead-letter list"""
+    if error is None:
+        error = _text(client.hget(settings.INGESTION_ERRORS_KEY, message_id))
+    client.lpush(settings.INGESTION_DEAD_LETTER_KEY, json.dumps({
+        "message_id": _text(message_id),
+        "fields": {_text(k): _text(v) for k, v in fields.items()},
+        "deliveries": deliveries,
+        "error": error,
+    }))
+    acknowledge(client, [message_id])
+    logger.error("Event moved to dead-letter list", message_id=message_id, deliveries=deliveries, error=error)
+
+def write_batch(messages):
+    """Write decoded messages in one transaction.
+    
+    Falls back to one transaction per message when the batch fails, so a
+    single bad event cannot hold back the rest. Returns ``(done, failed,
+    undecodable)``; the last two map message ids to an error description.
+    Undecodable messages will never succeed, so they are not attempted.
+    """
+    events = []
+    failed = {}
+    undecodable = {}
+    for message_id, fields in messages:
+        try:
+            events.append((message_id, *decode_event(fields)))
+        except (KeyError, ValueError) as e:
+            undecodable[message_id] = f"undecodable: {e}"
+    
+    db = SessionLocal()
+    try:
+        try:
+            retry = apply_events(db, events)
+            db.commit()
+            return [e[0] for e in events if e[0] not in retry], {m: "not ready" for m in retry}, undecodable
+        except Exception as e:
+            db.rollback()
+            logger.warning("Batch write failed, retrying events individually", size=len(events), error=str(e))
+        
+        done = []
+        for event in events:
+            try:
+                retry = apply_events(db, [event])
+                db.commit()
+                if retry:
+                    failed[event[0]] = "not ready"
+                else:
+                    done.append(event[0])
+            except Exception as e:
+                db.rollback()
+                failed[event[0]] = str(e)
+        return done, failed, undecodable
+    finally:
+        db.close()
+
+def reclaim_stale(client, consumer):
+    """Take over messages left pending by a crashed consumer or failed write.
+    
+    Messages delivered too many times are dead-lettered; the rest are
+    returned for another attempt.
+    """
+    _, messages, *_ = client.xautoclaim(
+        settings.INGESTION_STREAM,
+        settings.INGESTION_CONSUMER_GROUP,
+        consumer,
+        min_idle_time=settings.INGESTION_RETRY_IDLE_MS,
+        start_id="0-0",
+        count=settings.INGESTION_WORKER_BATCH_SIZE,
+    )
+    messages = [(message_id, fields) for message_id, fields in messages if fields]
+    if not messages:
+        return []
+    
+    pending = client.xpending_range(
+        settings.INGESTION_STREAM,
+        settings.INGESTION_CONSUMER_GROUP,
+        min=messages[0][0],
+        max=messages[-1][0],
+        count=len(messages),
+    )
+    deliveries = {p["message_id"]: p["times_delivered"] for p in pending}
+    
+    retry = []
+    for message_id, fields in messages:
+        count = deliveries.get(message_id, 0)
+        if count > settings.INGESTION_MAX_DELIVERIES:
+            dead_letter(client, message_id, fields, count)
+        else:
+            retry.append((message_id, fields))
+    return retry
+
+def run():
+    client = redis_conn.connect(block_seconds=settings.INGESTION_WORKER_BLOCK_MS / 1000)
+    if client is None:
+        raise SystemExit("Redis is required for the ingestion worker")
+    
+    ensure_group(client)
+    consumer = f"{socket.gethostname()}-{os.getpid()}"
+    logger.info("Ingestion worker started", stream=settings.INGESTION_STREAM, consumer=consumer)
+    
+    while running:
+        messages = reclaim_stale(client, consumer)
+        if not messages:
+            response = client.xreadgroup(
+                settings.INGESTION_CONSUMER_GROUP,
+                consumer,
+                {settings.INGESTION_STREAM: ">"},
+                count=settings.INGESTION_WORKER_BATCH_SIZE,
+                block=settings.INGESTION_WORKER_BLOCK_MS,
+            )
+            messages = [message for _, batch in response for message in batch]
+        if not messages:
+            continue
+        
+        done, failed, undecodable = write_batch(messages)
+        acknowledge(client, done)
+        if done:
+            response_cache.invalidate(response_cache.ANALYTICS)
+        fields_by_id = dict(messages)
+        for message_id, error in undecodable.items():
+            dead_letter(client, message_id, fields_by_id[message_id], 1, error)
+        # Failed messages stay pending and are reclaimed after INGESTION_RETRY_IDLE_MS
+        record_errors(client, failed)
+        logger.info("Ingested events", written=len(done), pending_retry=len(failed))
+        for message_id, error in failed.items():
+            logger.warning("Event write deferred", message_id=message_id, error=error)
+    
+    logger.info("Ingestion worker stopped", consumer=consumer)
+
+def main():
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+    run()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,216 @@
+import asyncio
+import json
+from datetime import datetime
+from typing import Dict, List, Optional, Set
+import redis
+import structlog
+from sqlalchemy import insert, select, update, text
+from sqlalchemy.dialects.postgresql import insert as pg_insert
+from sqlalchemy.orm import Session
+from config import settings
+import database
+from models import PageVisit, LoginEvent, LogoutEvent
+from partitions import PARTITIONED_TABLES, is_partitioned
+import redis_conn
+
+logger = structlog.get_logger()
+
+def insert_page_visits(db: Session, rows: List[Dict]) -> List[int]:
+    """Insert page visits with a single multi-row INSERT and return their ids in input order"""
+    if not rows:
+        return []
+    
+    result = db.execute(
+        insert(PageVisit).returning(PageVisit.id, sort_by_parameter_order=True),
+        rows
+    )
+    return list(result.scalars())
+
+def update_page_visit_exits(db: Session, rows: List[Dict]) -> Set[int]:
+    """Apply exit times with one bulk UPDATE and return the ids that were updated.
+    
+    Each row carries ``id``, ``user_id``, ``exit_time`` and ``duration_seconds``;
+    visits that do not exist or belong to another user are skipped.
+    """
+    if not rows:
+        return set()
+    
+    # Later exits for the same visit win, matching the single-event endpoints
+    latest = {row["id"]: row for row in rows}
+    owners = dict(db.execute(
+        select(PageVisit.id, PageVisit.user_id).where(PageVisit.id.in_(latest.keys()))
+    ).all())
+    
+    updates = [
+        {
+            "id": visit_id,
+            "exit_time": row["exit_time"],
+            "duration_seconds": row["duration_seconds"],
+        }
+        for visit_id, row in latest.items()
+        if owners.get(visit_id) == row["user_id"]
+    ]
+    if updates:
+        db.execute(update(PageVisit), updates)
+    
+    return {row["id"] for row in updates}
+
+def record_logout(db: Session, user_id: int, logout_time: datetime) -> Optional[tuple]:
+    """Close the user's latest open session at ``logout_time``.
+    
+    Returns ``(login_event, session_duration)`` or None when there is no open session.
+    Safe to call twice for the same logout.
+    """
+    latest_login = db.query(LoginEvent).filter(
+        LoginEvent.user_id == user_id,
+        LoginEvent.session_duration_seconds.is_(None),
+        LoginEvent.login_timestamp <= logout_time
+    ).order_by(LoginEvent.login_timestamp.desc()).first()
+    
+    if not latest_login:
+        return None
+    
+    session_duration = (logout_time - latest_login.login_timestamp).total_seconds()
+    session_duration = max(0, session_duration)  # Ensure non-negative
+    latest_login.session_duration_seconds = session_duration
+    
+    existing_logout = db.query(LogoutEvent).filter(
+        LogoutEvent.login_event_id == latest_login.id
+    ).first()
+    
+    if not existing_logout:
+        db.add(LogoutEvent(
+            user_id=user_id,
+            login_event_id=latest_login.id,
+            logout_timestamp=logout_time
+        ))
+    
+    return latest_login, session_duration
+
+# Write-behind queue
+#
+# In "queue" mode the ingestion handlers append events to a Redis stream and
+# return immediately; ingest_worker.py drains the stream into Postgres.
+
+class IdAllocator:
+    """Hands out primary keys reserved in blocks from a Postgres sequence.
+    
+    Lets queued inserts return their id to the client before the row exists,
+    and makes redelivered inserts idempotent.
+    """
+    
+    def __init__(self, table: str):
+        self.table = table
+        self._ids: List[int] = []
+        self._lock = asyncio.Lock()
+    
+    async def allocate(self) -> Optional[int]:
+        if database.async_engine.dialect.name != "postgresql":
+            return None
+        
+        # Only the refill awaits; popping needs no lock on a single event loop
+        if not self._ids:
+            async with self._lock:
+                if not self._ids:
+                    # On a connection of its own, so the caller's transaction is
+                    # left alone; nextval is never rolled back
+                    async with database.async_engine.connect() as conn:
+                        result = await conn.execute(
+                            text(
+                                "SELECT nextval(pg_get_serial_sequence(:table, 'id')) "
+                                "FROM generate_series(1, :count)"
+                            ),
+                            {"table": self.table, "count": settings.INGESTION_ID_BLOCK_SIZE}
+                        )
+                        ids = list(result.scalars())
+                    ids.reverse()
+                    self._ids = ids
+        return self._ids.pop()
+
+page_visit_ids = IdAllocator("page_visits")
+login_event_ids = IdAllocator("login_events")
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+async def enqueue_event(kind: str, data: Dict) -> bool:
+    """Append an event to the ingestion stream.
+    
+    Returns False when queue mode is off or Redis is unavailable, in which
+    case the caller writes synchronously instead.
+    """
+    client = redis_conn.async_redis_client
+    if settings.INGESTION_MODE != "queue" or client is None:
+        return False
+    
+    try:
+        await client.xadd(settings.INGESTION_STREAM, {
+            "kind": kind,
+            "data": json.dumps(data, default=_encode),
+        })
+        return True
+    except redis.RedisError as e:
+        logger.warning("Failed to enqueue event, writing synchronously", kind=kind, error=str(e))
+        return False
+
+def _parse_time(value: Optional[str]) -> Optional[datetime]:
+    return datetime.fromisoformat(value) if value else None
+
+def decode_event(fields: Dict) -> tuple:
+    """Turn raw stream fields into ``(kind, data)`` with datetimes restored"""
+    fields = {
+        (k.decode() if isinstance(k, bytes) else k): (v.decode() if isinstance(v, bytes) else v)
+        for k, v in fields.items()
+    }
+    data = json.loads(fields["data"])
+    for key in ("login_timestamp", "logout_timestamp", "entry_time", "exit_time"):
+        if key in data:
+            data[key] = _parse_time(data[key])
+    return fields["kind"], data
+
+def _insert_ignoring_duplicates(db: Session, model, rows: List[Dict]):
+    """Insert rows, skipping ids that already exist from an earlier delivery"""
+    if not rows:
+        return
+    if db.get_bind().dialect.name == "postgresql":
+        # A partitioned table's primary key includes the partition column, and
+        # ON CONFLICT has to name a unique index that exists
+        table = model.__tablename__
+        conflict = ["id"]
+        if table in PARTITIONED_TABLES and is_partitioned(db.connection(), table):
+            conflict.append(PARTITIONED_TABLES[table])
+        db.execute(pg_insert(model).on_conflict_do_nothing(index_elements=conflict), rows)
+    else:
+        db.execute(insert(model), rows)
+
+EVENT_KINDS = {"login", "page_visit_enter", "page_visit_exit", "logout"}
+
+def apply_events(db: Session, events: List[tuple]) -> Set[str]:
+    """Write a batch of decoded ``(message_id, kind, data)`` events.
+    
+    Returns the message ids that should be retried later, such as exits
+    whose page visit has not been written yet. The caller commits.
+    """
+    by_kind: Dict[str, List[tuple]] = {}
+    for message_id, kind, data in events:
+        by_kind.setdefault(kind, []).append((message_id, data))
+    
+    unknown = set(by_kind) - EVENT_KINDS
+    if unknown:
+        raise ValueError(f"Unknown event kinds: {sorted(unknown)}")
+    
+    _insert_ignoring_duplicates(db, LoginEvent, [data for _, data in by_kind.get("login", [])])
+    _insert_ignoring_duplicates(db, PageVisit, [data for _, data in by_kind.get("page_visit_enter", [])])
+    
+    exits = by_kind.get("page_visit_exit", [])
+    updated = update_page_visit_exits(db, [data for _, data in exits])
+    retry = {message_id for message_id, data in exits if data["id"] not in updated}
+    
+    # Logouts are matched by timestamp, so they are correct after the logins above
+    for _, data in by_kind.get("logout", []):
+        record_logout(db, data["user_id"], data["logout_timestamp"])
+        db.flush()
+    
+    return retry
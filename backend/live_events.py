@@ -0,0 +1,107 @@
+import json
+import re
+from datetime import datetime
+from typing import AsyncIterator, Dict, Iterable, Optional, Tuple
+import redis
+import structlog
+from config import settings
+import redis_conn
+
+logger = structlog.get_logger()
+
+# Deltas pushed to admin dashboards over Server-Sent Events
+#
+# Handlers publish small events to a capped Redis stream, which every worker
+# reads, so a dashboard connected to any worker sees writes made on all of
+# them. Stream entry ids double as SSE event ids: a reconnecting EventSource
+# sends the last one back in Last-Event-ID and resumes from there.
+
+EVENT_KINDS = {"login", "logout", "page_visit_enter", "page_visit_exit", "form_submission"}
+
+EVENT_ID = re.compile(r"^\d+-\d+$")
+
+# How long a disconnected EventSource waits before reconnecting
+RECONNECT_MS = 3000
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+async def publish_many(events: Iterable[Tuple[str, Dict]]):
+    """Append ``(kind, data)`` events to the live stream in one round trip.
+    
+    Best effort: dashboards are a view, so a Redis failure never fails the write.
+    """
+    client = redis_conn.async_redis_client
+    if not settings.LIVE_EVENTS_ENABLED or client is None:
+        return
+    
+    try:
+        pipe = client.pipeline(transaction=False)
+        for kind, data in events:
+            pipe.xadd(
+                settings.LIVE_EVENTS_STREAM,
+                {"kind": kind, "data": json.dumps(data, default=_encode)},
+                maxlen=settings.LIVE_EVENTS_MAXLEN,
+                approximate=True,
+            )
+        await pipe.execute()
+    except redis.RedisError as e:
+        logger.warning("Failed to publish live events", error=str(e))
+
+async def publish(kind: str, data: Dict):
+    await publish_many([(kind, data)])
+
+def _id_tuple(event_id: str) -> Tuple[int, int]:
+    milliseconds, sequence = event_id.split("-")
+    return int(milliseconds), int(sequence)
+
+def _text(value) -> str:
+    return value.decode() if isinstance(value, bytes) else value
+
+def format_event(event_id: Optional[str], kind: str, data: str) -> str:
+    lines = [f"id: {event_id}"] if event_id else []
+    return "\n".join(lines + [f"event: {kind}", f"data: {data}"]) + "\n\n"
+
+async def stream_events(last_event_id: Optional[str] = None, is_disconnected=None) -> AsyncIterator[str]:
+    """SSE messages for events after ``last_event_id``, or from now on.
+    
+    Sends a ``reset`` event when the id is older than everything the capped
+    stream still holds, telling the client to reload before following deltas.
+    Comments go out every LIVE_EVENTS_HEARTBEAT_SECONDS while idle, so
+    proxies keep the connection open and dead clients are noticed.
+    """
+    client = redis_conn.stream_redis_client
+    stream = settings.LIVE_EVENTS_STREAM
+    yield f"retry: {RECONNECT_MS}\n\n"
+    
+    # On a Redis error the response just ends; EventSource reconnects after
+    # RECONNECT_MS and resumes from the last id it received
+    try:
+        if last_event_id:
+            oldest = await client.xrange(stream, count=1)
+            if oldest and _id_tuple(last_event_id) < _id_tuple(_text(oldest[0][0])):
+                yield format_event(None, "reset", json.dumps({"reason": "events since last_event_id were trimmed"}))
+                last_event_id = None
+        if not last_event_id:
+            # Pin "now" to a concrete id so nothing published between reads is missed
+            info = await client.xinfo_stream(stream) if await client.exists(stream) else None
+            last_event_id = _text(info["last-generated-id"]) if info else "0-0"
+        
+        while is_disconnected is None or not await is_disconnected():
+            response = await client.xread(
+                {stream: last_event_id},
+                count=500,
+                block=settings.LIVE_EVENTS_HEARTBEAT_SECONDS * 1000,
+            )
+            if not response:
+                yield ": keepalive\n\n"
+                continue
+            for _, entries in response:
+                for entry_id, fields in entries:
+                    last_event_id = _text(entry_id)
+                    fields = {_text(k): _text(v) for k, v in fields.items()}
+                    yield format_event(last_event_id, fields["kind"], fields["data"])
+    except redis.RedisError as e:
+        logger.warning("Live event stream failed", last_event_id=last_event_id, error=str(e))
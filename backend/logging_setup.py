@@ -0,0 +1,111 @@
+import atexit
+import logging
+import os
+import queue
+import random
+import sys
+from logging.handlers import QueueHandler, QueueListener
+from typing import Optional
+import structlog
+from prometheus_client import Counter
+from config import settings
+
+LOG_RECORDS_DROPPED = Counter(
+    'log_records_dropped_total',
+    'Log records dropped because the logging queue was full'
+)
+
+_listener: Optional[QueueListener] = None
+_log_queue: Optional[queue.Queue] = None
+_output: Optional[logging.Handler] = None
+
+class NonBlockingQueueHandler(QueueHandler):
+    """Hands records to the listener thread without formatting them.
+    
+    Requests never wait on log I/O: when the queue is full the record is
+    dropped and counted instead.
+    """
+    
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Formatting happens on the listener thread
+        return record
+    
+    def enqueue(self, record: logging.LogRecord):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            LOG_RECORDS_DROPPED.inc()
+
+def configure_logging():
+    """Route structlog and stdlib logging through a bounded queue to a background writer"""
+    global _listener, _log_queue, _output
+    if _listener is not None:
+        return
+    
+    shared_processors = [
+        structlog.stdlib.add_logger_name,
+        structlog.stdlib.add_log_level,
+        structlog.stdlib.PositionalArgumentsFormatter(),
+        structlog.processors.TimeStamper(fmt="iso"),
+    ]
+    structlog.configure(
+        processors=[
+            structlog.stdlib.filter_by_level,
+            *shared_processors,
+            structlog.processors.StackInfoRenderer(),
+            structlog.processors.format_exc_info,
+            structlog.processors.UnicodeDecoder(),
+            structlog.stdlib.ProcessorFormatter.wrap_for_formatter,
+        ],
+        context_class=dict,
+        logger_factory=structlog.stdlib.LoggerFactory(),
+        wrapper_class=structlog.stdlib.BoundLogger,
+        cache_logger_on_first_use=True,
+    )
+    
+    # JSON rendering and the stdout write run on the listener thread
+    _output = logging.StreamHandler(sys.stdout)
+    _output.setFormatter(structlog.stdlib.ProcessorFormatter(
+        processor=structlog.processors.JSONRenderer(),
+        foreign_pre_chain=shared_processors,
+    ))
+    
+    _log_queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+    root = logging.getLogger()
+    root.handlers = [NonBlockingQueueHandler(_log_queue)]
+    root.setLevel(settings.LOG_LEVEL)
+    
+    _start_listener()
+    atexit.register(stop_logging)
+    # Threads do not survive fork, e.g. gunicorn --preload workers
+    os.register_at_fork(after_in_child=_restart_listener_after_fork)
+
+def _start_listener():
+    global _listener
+    _listener = QueueListener(_log_queue, _output, respect_handler_level=True)
+    _listener.start()
+
+def _restart_listener_after_fork():
+    if _listener is not None:
+        _start_listener()
+
+def stop_logging():
+    """Flush queued records and stop the writer thread"""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+def request_sample_rate(method: str, route: str, status_code: int, duration: float) -> float:
+    """Fraction of requests like this one to log.
+    
+    Errors and slow requests are always kept; other requests use the rate
+    configured for their route template or method, or the default.
+    """
+    if status_code >= 400 or duration >= settings.LOG_SLOW_REQUEST_SECONDS:
+        return 1.0
+    rates = settings.LOG_SAMPLE_RATES
+    return rates.get(route, rates.get(method, settings.LOG_SUCCESS_SAMPLE_RATE))
+
+def should_log(sample_rate: float) -> bool:
+    return sample_rate >= 1.0 or random.random() < sample_rate
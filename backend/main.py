@@ -1,3 +1,4 @@
+from contextlib import asynccontextmanager
 from fastapi import FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.middleware.trustedhost import TrustedHostMiddleware
@@ -7,17 +8,21 @@ from slowapi.errors import RateLimitExceeded
 import structlog
 import sentry_sdk
 from sentry_sdk.integrations.fastapi import FastApiIntegration
-from prometheus_client import Counter, Histogram, generate_latest, CONTENT_TYPE_LATEST
-from fastapi.responses import Response
 import time
-import redis
-from database import engine
+from starlette.concurrency import run_in_threadpool
+from database import engine, async_engine
 from models import Base
-from routes import auth, users, forms, analytics
+from routes import auth, users, forms, analytics, exports
 from config import settings
+import redis_conn
 from sqlalchemy import text
+import password_hashing
+from metrics import REQUEST_COUNT, REQUEST_LATENCY, REQUESTS_IN_PROGRESS, metrics_response, route_template
+from logging_setup import configure_logging, request_sample_rate, should_log, stop_logging
 
-# Initialize Sentry if DSN is provided
+# Initialize Sentry if DSN is provided. This stays at import time so its
+# integrations patch FastAPI before the routes are built; it opens no
+# connections here and restarts its transport thread after a fork.
 if settings.SENTRY_DSN:
     sentry_sdk.init(
         dsn=settings.SENTRY_DSN,
@@ -26,48 +31,40 @@ if settings.SENTRY_DSN:
         environment=settings.ENVIRONMENT,
     )
 
-# Configure structured logging
-structlog.configure(
-    processors=[
-        structlog.stdlib.filter_by_level,
-        structlog.stdlib.add_logger_name,
-        structlog.stdlib.add_log_level,
-        structlog.stdlib.PositionalArgumentsFormatter(),
-        structlog.processors.TimeStamper(fmt="iso"),
-        structlog.processors.StackInfoRenderer(),
-        structlog.processors.format_exc_info,
-        structlog.processors.UnicodeDecoder(),
-        structlog.processors.JSONRenderer()
-    ],
-    context_class=dict,
-    logger_factory=structlog.stdlib.LoggerFactory(),
-    wrapper_class=structlog.stdlib.BoundLogger,
-    cache_logger_on_first_use=True,
-)
+# Configure structured logging; records are rendered and written on a background thread
+configure_logging()
 
 logger = structlog.get_logger()
 
-# Create database tables
-Base.metadata.create_all(bind=engine)
-
-# Initialize Redis
-try:
-    redis_client = redis.from_url(settings.REDIS_URL)
-    redis_client.ping()
-    logger.info("Redis connection established")
-except Exception as e:
-    logger.warning(f"Redis connection failed (optional): {e}")
-    redis_client = None
-
 # Initialize rate limiter
 limiter = Limiter(key_func=get_remote_address)
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Runs in each worker after gunicorn forks, so connections made here are
+    # never shared between processes and --preload stays safe
+    logger.info("Application starting up", environment=settings.ENVIRONMENT)
+    if settings.SCHEMA_MANAGEMENT == "create_all":
+        await run_in_threadpool(Base.metadata.create_all, bind=engine)
+    await run_in_threadpool(redis_conn.connect)
+    
+    yield
+    
+    logger.info("Application shutting down")
+    password_hashing.shutdown()
+    redis_conn.close()
+    await redis_conn.close_async()
+    await async_engine.dispose()
+    engine.dispose()
+    stop_logging()
+
 app = FastAPI(
     title="Presentation Analytics API",
     version="1.0.0",
     description="Production-ready API for presentation analytics platform",
     docs_url="/docs" if settings.ENVIRONMENT == "development" else None,
     redoc_url="/redoc" if settings.ENVIRONMENT == "development" else None,
+    lifespan=lifespan,
 )
 
 # Add rate limiting
@@ -100,14 +97,10 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "DELETE", "OPTIONS", "PATCH"],
     allow_headers=["*"],
-    expose_headers=["*"],
+    expose_headers=["*", "X-Next-Cursor"],
     max_age=86400,  # Cache preflight responses for 24 hours
 )
 
-# Prometheus metrics
-REQUEST_COUNT = Counter('http_requests_total', 'Total HTTP requests', ['method', 'endpoint', 'status'])
-REQUEST_LATENCY = Histogram('http_request_duration_seconds', 'HTTP request latency')
-
 # Middleware for metrics and logging
 @app.middleware("http")
 async def add_process_time_header(request: Request, call_next):
@@ -117,43 +110,46 @@ async def add_process_time_header(request: Request, call_next):
     request_id = request.headers.get("X-Request-ID", str(time.time()))
     request.state.request_id = request_id
     
-    # Log CORS preflight requests
-    if request.method == "OPTIONS":
-        logger.info("CORS preflight request", 
-                   origin=request.headers.get("origin"),
-                   method=request.method,
-                   headers=dict(request.headers))
-    
-    response = await call_next(request)
+    in_progress = REQUESTS_IN_PROGRESS.labels(method=request.method)
+    in_progress.inc()
+    try:
+        response = await call_next(request)
+    finally:
+        in_progress.dec()
     
     # Calculate processing time
     process_time = time.time() - start_time
     
-    # Record metrics
+    # Record metrics against the route template so path parameters don't create new series
+    route = route_template(request)
     REQUEST_COUNT.labels(
         method=request.method,
-        endpoint=request.url.path,
+        route=route,
         status=response.status_code
     ).inc()
     
-    REQUEST_LATENCY.observe(process_time)
+    REQUEST_LATENCY.labels(method=request.method, route=route).observe(process_time)
     
     # Add headers
     response.headers["X-Process-Time"] = str(process_time)
     response.headers["X-Request-ID"] = request_id
     
-    # Log request
-    logger.info(
-        "HTTP request",
-        method=request.method,
-        url=str(request.url),
-        status_code=response.status_code,
-        process_time=process_time,
-        request_id=request_id,
-        user_agent=request.headers.get("user-agent"),
-        client_ip=request.client.host if request.client else None,
-        origin=request.headers.get("origin"),
-    )
+    # Log errors and slow requests, and a sample of the rest
+    sample_rate = request_sample_rate(request.method, route, response.status_code, process_time)
+    if should_log(sample_rate):
+        logger.info(
+            "HTTP request",
+            method=request.method,
+            url=str(request.url),
+            route=route,
+            status_code=response.status_code,
+            process_time=process_time,
+            request_id=request_id,
+            user_agent=request.headers.get("user-agent"),
+            client_ip=request.client.host if request.client else None,
+            origin=request.headers.get("origin"),
+            sample_rate=sample_rate,
+        )
     
     return response
 
@@ -170,8 +166,8 @@ async def health_check():
     
     # Check database
     try:
-        with engine.connect() as connection:
-            connection.execute(text("SELECT 1")).fetchone()
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
         health_status["database"] = "healthy"
     except Exception as e:
         health_status["database"] = "unhealthy"
@@ -179,9 +175,10 @@ async def health_check():
         health_status["status"] = "unhealthy"
     
     # Check Redis
+    redis_client = redis_conn.async_redis_client
     if redis_client:
         try:
-            redis_client.ping()
+            await redis_client.ping()
             health_status["redis"] = "healthy"
         except Exception as e:
             health_status["redis"] = "unhealthy"
@@ -196,13 +193,14 @@ async def health_check():
 @app.get("/metrics")
 async def metrics():
     """Prometheus metrics endpoint"""
-    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+    return metrics_response()
 
 # Include routers
 app.include_router(auth.router, prefix="/auth", tags=["authentication"])
 app.include_router(users.router, prefix="/users", tags=["users"])
 app.include_router(forms.router, prefix="/forms", tags=["forms"])
 app.include_router(analytics.router, prefix="/analytics", tags=["analytics"])
+app.include_router(exports.router, prefix="/exports", tags=["exports"])
 
 @app.get("/")
 @limiter.limit("60/minute")
@@ -214,15 +212,3 @@ async def read_root(request: Request):
         "environment": settings.ENVIRONMENT,
         "docs": "/docs" if settings.ENVIRONMENT == "development" else None,
     }
-
-# Startup event
-@app.on_event("startup")
-async def startup_event():
-    logger.info("Application starting up", environment=settings.ENVIRONMENT)
-
-# Shutdown event
-@app.on_event("shutdown")
-async def shutdown_event():
-    logger.info("Application shutting down")
-    if redis_client:
-        redis_client.close() 
\ No newline at end of file
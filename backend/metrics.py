@@ -0,0 +1,55 @@
+import os
+from fastapi import Request
+from fastapi.responses import Response
+from prometheus_client import CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest
+from prometheus_client import multiprocess
+from starlette.routing import Match
+
+# Requests that never reached a route (404s, CORS preflights) share one label
+UNMATCHED_ROUTE = "unmatched"
+
+REQUEST_COUNT = Counter(
+    'http_requests_total',
+    'Total HTTP requests',
+    ['method', 'route', 'status']
+)
+REQUEST_LATENCY = Histogram(
+    'http_request_duration_seconds',
+    'HTTP request latency by route template',
+    ['method', 'route'],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.075, 0.1, 0.25, 0.5, 0.75, 1, 2.5, 5, 10)
+)
+REQUESTS_IN_PROGRESS = Gauge(
+    'http_requests_in_progress',
+    'HTTP requests currently being handled',
+    ['method'],
+    multiprocess_mode='livesum'
+)
+
+def multiprocess_enabled() -> bool:
+    return bool(os.environ.get("PROMETHEUS_MULTIPROC_DIR"))
+
+def route_template(request: Request) -> str:
+    """The path template of the route that handled the request, e.g. ``/page-visit/{visit_id}``.
+    
+    Routing records the matched endpoint in the scope; look up the route
+    that owns it rather than labelling by the raw, unbounded URL path.
+    """
+    endpoint = request.scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED_ROUTE
+    for route in request.app.router.routes:
+        if getattr(route, "endpoint", None) is endpoint:
+            match, _ = route.matches(request.scope)
+            if match == Match.FULL:
+                return route.path
+    return UNMATCHED_ROUTE
+
+def metrics_response() -> Response:
+    """Exposition for /metrics, aggregated over every gunicorn worker in multiprocess mode"""
+    if multiprocess_enabled():
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+    else:
+        registry = REGISTRY
+    return Response(generate_latest(registry), media_type=CONTENT_TYPE_LATEST)
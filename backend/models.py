@@ -1,4 +1,5 @@
-from sqlalchemy import Column, Integer, String, DateTime, Text, ForeignKey, Float, Boolean, JSON
+from sqlalchemy import Column, Integer, String, DateTime, Date, Text, ForeignKey, Float, Boolean, JSON, Index
+from sqlalchemy.dialects.postgresql import JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -20,6 +21,8 @@ class User(Base):
     form_submissions = relationship("FormSubmission", back_populates="user")
     personalized_presentations = relationship("PersonalizedPresentation", back_populates="user")
 
+# login_events and page_visits may be partitioned by month on Postgres (see
+# partitions.py); the database key is then (id, timestamp), ids stay unique
 class LoginEvent(Base):
     __tablename__ = "login_events"
     
@@ -30,6 +33,18 @@ class LoginEvent(Base):
     
     # Relationships
     user = relationship("User", back_populates="login_events")
+    
+    # Created CONCURRENTLY by the add_analytics_indexes migration
+    __table_args__ = (
+        Index("ix_login_events_user_id_login_timestamp", user_id, login_timestamp.desc()),
+        # Open sessions, searched by record_logout
+        Index(
+            "ix_login_events_open_sessions", user_id, login_timestamp.desc(),
+            postgresql_where=session_duration_seconds.is_(None),
+            sqlite_where=session_duration_seconds.is_(None),
+        ),
+        Index("ix_login_events_login_timestamp", login_timestamp),
+    )
 
 class LogoutEvent(Base):
     __tablename__ = "logout_events"
@@ -41,6 +56,11 @@ class LogoutEvent(Base):
     
     # Relationships
     user = relationship("User", back_populates="logout_events")
+    
+    __table_args__ = (
+        Index("ix_logout_events_login_event_id", login_event_id),
+        Index("ix_logout_events_user_id_logout_timestamp", user_id, logout_timestamp),
+    )
 
 class PageVisit(Base):
     __tablename__ = "page_visits"
@@ -54,6 +74,11 @@ class PageVisit(Base):
     
     # Relationships
     user = relationship("User", back_populates="page_visits")
+    
+    __table_args__ = (
+        Index("ix_page_visits_user_id_entry_time", user_id, entry_time),
+        Index("ix_page_visits_entry_time", entry_time),
+    )
 
 class FormSubmission(Base):
     __tablename__ = "form_submissions"
@@ -71,7 +96,25 @@ class FormSubmission(Base):
     submitted_at = Column(DateTime(timezone=True), server_default=func.now())
     
     # Relationships
-    user = relationship("User", back_populates="form_submissions") 
+    user = relationship("User", back_populates="form_submissions")
+    
+    __table_args__ = (
+        Index("ix_form_submissions_user_id", user_id),
+    )
+
+class PresentationTemplate(Base):
+    __tablename__ = "presentation_templates"
+    
+    id = Column(Integer, primary_key=True, index=True)
+    name = Column(String, unique=True, nullable=False)
+    title = Column(String, nullable=True)
+    subtitle = Column(String, nullable=True)
+    slides = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=False)  # Base deck shared by many users
+    version = Column(Integer, nullable=False, server_default="1")  # Bumped by every edit
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    
+    __mapper_args__ = {"version_id_col": version, "eager_defaults": True}
 
 class PersonalizedPresentation(Base):
     __tablename__ = "personalized_presentations"
@@ -80,10 +123,81 @@ class PersonalizedPresentation(Base):
     user_id = Column(Integer, ForeignKey("users.id"))
     title = Column(String, nullable=True)  # Custom title for the presentation
     subtitle = Column(String, nullable=True)  # Custom subtitle
-    slides = Column(JSON)  # JSON array of customized slides
+    slides = Column(JSON().with_variant(JSONB(), "postgresql"))  # JSON array of customized slides
+    # Template-based presentations leave slides NULL and store only their
+    # differences from the template (see presentation_slides.merge_slides)
+    template_id = Column(Integer, ForeignKey("presentation_templates.id"), nullable=True)
+    slide_overrides = Column(JSON().with_variant(JSONB(), "postgresql"), nullable=True)
     is_active = Column(Boolean, default=True)  # Whether this personalized presentation is active
+    version = Column(Integer, nullable=False, server_default="1")  # Bumped by every edit
     created_at = Column(DateTime(timezone=True), server_default=func.now())
     updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
     
     # Relationships
-    user = relationship("User", back_populates="personalized_presentations") 
\ No newline at end of file
+    user = relationship("User", back_populates="personalized_presentations")
+    # Always needed to build the slides; one IN query per batch of presentations
+    template = relationship("PresentationTemplate", lazy="selectin")
+    
+    __table_args__ = (
+        # At most one active presentation per user
+        Index(
+            "uq_personalized_presentations_active_user", user_id, unique=True,
+            postgresql_where=is_active,
+            sqlite_where=is_active,
+        ),
+        Index("ix_personalized_presentations_template_id", template_id),
+    )
+    
+    # ORM updates check and increment version, so an edit based on a stale
+    # copy fails instead of overwriting; the new updated_at comes back with
+    # the UPDATE rather than needing a refresh
+    __mapper_args__ = {"version_id_col": version, "eager_defaults": True}
+
+# Daily rollups maintained by rollups.py
+class DailyUserEngagement(Base):
+    __tablename__ = "daily_user_engagement"
+    
+    user_id = Column(Integer, primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    page_visits = Column(Integer, default=0)
+    page_time_seconds = Column(Float, default=0)
+    logins = Column(Integer, default=0)
+    completed_sessions = Column(Integer, default=0)
+    session_time_seconds = Column(Float, default=0)
+
+class DailyPageEngagement(Base):
+    __tablename__ = "daily_page_engagement"
+    
+    page_name = Column(String, primary_key=True)
+    day = Column(Date, primary_key=True, index=True)
+    visits = Column(Integer, default=0)
+    unique_users = Column(Integer, default=0)
+    completed_visits = Column(Integer, default=0)  # Visits with a recorded duration
+    total_duration_seconds = Column(Float, default=0)
+
+class ActivitySession(Base):
+    """A run of page visits by one user with no gap longer than
+    SESSION_INACTIVITY_GAP_SECONDS, built by sessionization.py"""
+    __tablename__ = "sessions"
+    
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    started_at = Column(DateTime(timezone=True), nullable=False)  # First page entry
+    ended_at = Column(DateTime(timezone=True), nullable=False)  # Last exit, or last entry when no exit was recorded
+    duration_seconds = Column(Float, nullable=False)
+    page_visits = Column(Integer, nullable=False)
+    
+    __table_args__ = (
+        Index("ix_sessions_user_id_started_at", user_id, started_at),
+        Index("ix_sessions_started_at", started_at),
+        Index("ix_sessions_ended_at", ended_at),
+    )
+
+class RollupState(Base):
+    __tablename__ = "rollup_state"
+    
+    name = Column(String, primary_key=True)
+    last_page_visit_id = Column(Integer, default=0)  # High-water marks of processed raw rows
+    last_login_event_id = Column(Integer, default=0)
+    covered_until = Column(Date, nullable=True)  # Rollups are complete up to and including this day
+    refreshed_at = Column(DateTime(timezone=True), nullable=True)
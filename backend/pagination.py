@@ -0,0 +1,67 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional
+from fastapi import HTTPException, Query, Response, status
+from sqlalchemy.ext.asyncio import AsyncSession
+from config import settings
+
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(json.dumps({"id": last_id}).encode()).decode()
+
+def decode_cursor(cursor: Optional[str]) -> Optional[int]:
+    if cursor is None:
+        return None
+    try:
+        return int(json.loads(base64.urlsafe_b64decode(cursor.encode()))["id"])
+    except (ValueError, KeyError, TypeError):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid cursor"
+        )
+
+class PageParams:
+    """Query parameters for keyset pagination over an integer primary key"""
+    
+    def __init__(
+        self,
+        cursor: Optional[str] = Query(None, description="Token from the previous page's X-Next-Cursor header"),
+        limit: int = Query(settings.DEFAULT_PAGE_SIZE, ge=1, le=settings.MAX_PAGE_SIZE),
+    ):
+        self.after_id = decode_cursor(cursor)
+        self.limit = limit
+
+def _page_of(query, id_column, page: PageParams):
+    if page.after_id is not None:
+        query = query.filter(id_column > page.after_id)
+    return query.order_by(id_column).limit(page.limit + 1)
+
+def _trim(rows: List, page: PageParams, response: Response) -> List:
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(rows[-1].id)
+    return rows
+
+def paginate(query, id_column, page: PageParams, response: Response) -> List:
+    """Return one page of ``query`` ordered by ``id_column``.
+    
+    Sets the X-Next-Cursor header when more rows follow, so list endpoints
+    keep returning a plain JSON array.
+    """
+    return _trim(_page_of(query, id_column, page).all(), page, response)
+
+async def paginate_async(db: AsyncSession, statement, id_column, page: PageParams, response: Response) -> List:
+    """paginate() for a ``select()`` of ORM entities on an AsyncSession"""
+    rows = (await db.scalars(_page_of(statement, id_column, page))).unique().all()
+    return _trim(list(rows), page, response)
+
+def date_range(column, date_from: Optional[datetime], date_to: Optional[datetime]) -> List:
+    """Filter criteria for a half-open ``[date_from, date_to)`` range"""
+    criteria = []
+    if date_from is not None:
+        criteria.append(column >= date_from)
+    if date_to is not None:
+        criteria.append(column < date_to)
+    return criteria
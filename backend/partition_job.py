@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Partition maintenance for page_visits and login_events
+Creates monthly partitions ahead of time and detaches or drops those past the
+retention window. Run it daily, e.g. from cron.
+"""
+
+import argparse
+import time
+from datetime import datetime, timezone
+from database import engine
+from config import settings
+from partitions import (
+    PARTITIONED_TABLES, is_partitioned, convert_to_partitioned,
+    ensure_partitions, expire_partitions, month_start, add_months,
+)
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain monthly event table partitions")
+    parser.add_argument("--months-ahead", type=int, default=settings.PARTITION_MONTHS_AHEAD, help="Future months to create")
+    parser.add_argument("--retention-months", type=int, default=settings.PARTITION_RETENTION_MONTHS, help="Whole months to keep besides the current one; 0 keeps everything")
+    parser.add_argument("--detach-only", action="store_true", help="Detach expired partitions without dropping them, e.g. to archive them first")
+    parser.add_argument("--convert", action="store_true", help="Partition tables that are not partitioned yet (copies every row)")
+    parser.add_argument("--interval", type=int, help="Keep running, repeating every N seconds")
+    args = parser.parse_args()
+    
+    if engine.dialect.name != "postgresql":
+        print("❌ Partitioning needs PostgreSQL")
+        return
+    
+    while True:
+        maintain(args)
+        if not args.interval:
+            break
+        time.sleep(args.interval)
+
+def maintain(args):
+    this_month = month_start(datetime.now(timezone.utc).date())
+    for table in PARTITIONED_TABLES:
+        # One transaction per table
+        with engine.begin() as conn:
+            if not is_partitioned(conn, table):
+                if not args.convert:
+                    print(f"⏭️  {table} is not partitioned (use --convert)")
+                    continue
+                convert_to_partitioned(conn, table, args.months_ahead)
+                print(f"✅ Partitioned {table}")
+            
+            created = ensure_partitions(conn, table, through=add_months(this_month, args.months_ahead))
+            print(f"✅ {table}: {len(created)} partition(s) created")
+            
+            if args.retention_months > 0:
+                cutoff = add_months(this_month, -args.retention_months)
+                expired = expire_partitions(conn, table, cutoff, drop=not args.detach_only)
+                action = "detached" if args.detach_only else "dropped"
+                print(f"🗑️  {table}: {len(expired)} partition(s) before {cutoff} {action}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,223 @@
+import re
+from datetime import date, datetime, timezone
+from typing import List, Optional
+import structlog
+from sqlalchemy import text
+from sqlalchemy.engine import Connection
+from models import Base
+
+logger = structlog.get_logger()
+
+# Append-only event tables and the timestamp each is range-partitioned on
+PARTITIONED_TABLES = {
+    "page_visits": "entry_time",
+    "login_events": "login_timestamp",
+}
+
+def month_start(day: date) -> date:
+    return day.replace(day=1)
+
+def add_months(month: date, months: int) -> date:
+    index = month.year * 12 + month.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+def partition_name(table: str, month: date) -> str:
+    return f"{table}_{month:%Y_%m}"
+
+def default_partition_name(table: str) -> str:
+    return f"{table}_default"
+
+def _bound(month: date) -> datetime:
+    return datetime(month.year, month.month, 1, tzinfo=timezone.utc)
+
+def _literal(month: date) -> str:
+    # Partition bounds must be literals; midnight UTC regardless of the session time zone
+    return f"'{month.isoformat()} 00:00:00+00'"
+
+def _quote(conn: Connection, name: str) -> str:
+    return conn.dialect.identifier_preparer.quote(name)
+
+def is_partitioned(conn: Connection, table: str) -> bool:
+    return bool(conn.execute(
+        text("SELECT EXISTS (SELECT 1 FROM pg_partitioned_table WHERE partrelid = to_regclass(:table))"),
+        {"table": table}
+    ).scalar())
+
+def list_partitions(conn: Connection, table: str) -> List[date]:
+    """Months that have their own partition, oldest first"""
+    names = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:table)"
+    ), {"table": table}).scalars()
+    pattern = re.compile(rf"^{re.escape(table)}_(\d{{4}})_(\d{{2}})$")
+    months = []
+    for name in names:
+        match = pattern.match(name)
+        if match:
+            months.append(date(int(match.group(1)), int(match.group(2)), 1))
+    return sorted(months)
+
+def _has_default_partition(conn: Connection, table: str) -> bool:
+    return conn.execute(
+        text("SELECT to_regclass(:name) IS NOT NULL"),
+        {"name": default_partition_name(table)}
+    ).scalar()
+
+def create_partition(conn: Connection, table: str, month: date):
+    """Attach a partition for ``month``, moving in any rows the default partition caught for it"""
+    column = PARTITIONED_TABLES[table]
+    parent = _quote(conn, table)
+    name = _quote(conn, partition_name(table, month))
+    upper = add_months(month, 1)
+    
+    conn.execute(text(f"CREATE TABLE {name} (LIKE {parent} INCLUDING DEFAULTS)"))
+    if _has_default_partition(conn, table):
+        conn.execute(text(
+            f"WITH moved AS (DELETE FROM {_quote(conn, default_partition_name(table))} "
+            f"WHERE {column} >= :lower AND {column} < :upper RETURNING *) "
+            f"INSERT INTO {name} SELECT * FROM moved"
+        ), {"lower": _bound(month), "upper": _bound(upper)})
+    # Attaching builds the partition's copies of the parent's indexes and keys
+    conn.execute(text(
+        f"ALTER TABLE {parent} ATTACH PARTITION {name} "
+        f"FOR VALUES FROM ({_literal(month)}) TO ({_literal(upper)})"
+    ))
+    logger.info("Partition created", table=table, partition=partition_name(table, month))
+
+def ensure_partitions(conn: Connection, table: str, through: date, start: Optional[date] = None) -> List[str]:
+    """Create the default partition and one partition per month from ``start``
+    (default: this month) through ``through``; returns the partitions created"""
+    if not _has_default_partition(conn, table):
+        # Catches rows outside every monthly partition, e.g. client clocks far off
+        conn.execute(text(
+            f"CREATE TABLE {_quote(conn, default_partition_name(table))} "
+            f"PARTITION OF {_quote(conn, table)} DEFAULT"
+        ))
+    
+    existing = set(list_partitions(conn, table))
+    month = month_start(start or datetime.now(timezone.utc).date())
+    created = []
+    while month <= month_start(through):
+        if month not in existing:
+            create_partition(conn, table, month)
+            created.append(partition_name(table, month))
+        month = add_months(month, 1)
+    return created
+
+def expire_partitions(conn: Connection, table: str, cutoff: date, drop: bool = True) -> List[str]:
+    """Detach, and unless ``drop`` is False drop, partitions wholly before ``cutoff``.
+    
+    Removing a month is a catalog change rather than a DELETE of its rows.
+    Detached tables keep their names so they can be archived before dropping.
+    """
+    column = PARTITIONED_TABLES[table]
+    parent = _quote(conn, table)
+    expired = []
+    for month in list_partitions(conn, table):
+        if add_months(month, 1) > cutoff:
+            break
+        name = _quote(conn, partition_name(table, month))
+        conn.execute(text(f"ALTER TABLE {parent} DETACH PARTITION {name}"))
+        if drop:
+            conn.execute(text(f"DROP TABLE {name}"))
+        expired.append(partition_name(table, month))
+        logger.info("Partition expired", table=table, partition=partition_name(table, month), dropped=drop)
+    
+    if _has_default_partition(conn, table):
+        conn.execute(
+            text(f"DELETE FROM {_quote(conn, default_partition_name(table))} WHERE {column} < :cutoff"),
+            {"cutoff": _bound(cutoff)}
+        )
+    return expired
+
+# Converting existing tables
+#
+# Postgres can't partition a table in place, so the table is renamed, an
+# empty copy is created under the original name and the rows are copied
+# across. Plan a maintenance window: both tables are locked while it runs.
+
+def _drop_foreign_keys_to(conn: Connection, table: str):
+    # A foreign key to a partitioned table needs a unique key on the
+    # referenced column alone, which partitioning rules out
+    names = conn.execute(text(
+        "SELECT conrelid::regclass::text, conname FROM pg_constraint "
+        "WHERE contype = 'f' AND confrelid = to_regclass(:table)"
+    ), {"table": table}).all()
+    for referencing, name in names:
+        conn.execute(text(f"ALTER TABLE {referencing} DROP CONSTRAINT {_quote(conn, name)}"))
+
+def _set_aside(conn: Connection, table: str, new_name: str):
+    """Rename ``table`` and free the constraint and index names its replacement needs"""
+    conn.execute(text(f"ALTER TABLE {_quote(conn, table)} RENAME TO {_quote(conn, new_name)}"))
+    conn.execute(text(
+        f"ALTER TABLE {_quote(conn, new_name)} "
+        f"RENAME CONSTRAINT {_quote(conn, table + '_pkey')} TO {_quote(conn, new_name + '_pkey')}"
+    ))
+    indexes = conn.execute(text(
+        "SELECT indexname FROM pg_indexes "
+        "WHERE schemaname = current_schema() AND tablename = :table AND indexname <> :pkey"
+    ), {"table": new_name, "pkey": new_name + "_pkey"}).scalars().all()
+    for index in indexes:
+        conn.execute(text(f"DROP INDEX {_quote(conn, index)}"))
+
+def _finish_copy(conn: Connection, table: str, old_name: str):
+    """Index the new table, move the rows and the id sequence over and drop the old table"""
+    quoted = _quote(conn, table)
+    conn.execute(text(f"ALTER TABLE {quoted} ADD FOREIGN KEY (user_id) REFERENCES users (id)"))
+    for index in Base.metadata.tables[table].indexes:
+        index.create(conn)
+    
+    conn.execute(text(f"INSERT INTO {quoted} SELECT * FROM {_quote(conn, old_name)}"))
+    # The id default still uses the old table's sequence; keep it alive, and
+    # findable through pg_get_serial_sequence, once that table is dropped
+    sequence = conn.execute(text("SELECT pg_get_serial_sequence(:table, 'id')"), {"table": old_name}).scalar()
+    if sequence:
+        conn.execute(text(f"ALTER SEQUENCE {sequence} OWNED BY {quoted}.id"))
+    # Partitions are dropped along with their parent
+    conn.execute(text(f"DROP TABLE {_quote(conn, old_name)}"))
+
+def convert_to_partitioned(conn: Connection, table: str, months_ahead: int):
+    """Rebuild ``table`` as partitioned by month, with partitions for its whole history"""
+    column = PARTITIONED_TABLES[table]
+    quoted = _quote(conn, table)
+    # The partition key joins the primary key, so it can't be NULL
+    missing = conn.execute(text(f"SELECT count(*) FROM {quoted} WHERE {column} IS NULL")).scalar()
+    if missing:
+        raise RuntimeError(f"{missing} row(s) in {table} have no {column}; set it before partitioning")
+    
+    oldest = conn.execute(text(f"SELECT min({column}) FROM {quoted}")).scalar()
+    legacy = f"{table}_unpartitioned"
+    _drop_foreign_keys_to(conn, table)
+    _set_aside(conn, table, legacy)
+    
+    conn.execute(text(
+        f"CREATE TABLE {quoted} (LIKE {_quote(conn, legacy)} INCLUDING DEFAULTS) PARTITION BY RANGE ({column})"
+    ))
+    conn.execute(text(f"ALTER TABLE {quoted} ADD PRIMARY KEY (id, {column})"))
+    
+    today = datetime.now(timezone.utc).date()
+    ensure_partitions(
+        conn, table,
+        through=add_months(month_start(today), months_ahead),
+        start=oldest.astimezone(timezone.utc).date() if oldest else today,
+    )
+    _finish_copy(conn, table, legacy)
+    logger.info("Table partitioned", table=table)
+
+def convert_to_regular(conn: Connection, table: str):
+    """Undo convert_to_partitioned, copying every partition back into one table"""
+    quoted = _quote(conn, table)
+    partitioned = f"{table}_partitioned"
+    _set_aside(conn, table, partitioned)
+    
+    conn.execute(text(f"CREATE TABLE {quoted} (LIKE {_quote(conn, partitioned)} INCLUDING DEFAULTS)"))
+    conn.execute(text(f"ALTER TABLE {quoted} ADD PRIMARY KEY (id)"))
+    _finish_copy(conn, table, partitioned)
+    
+    if table == "login_events":
+        # Logouts may point at logins removed by retention, so existing rows aren't checked
+        conn.execute(text(
+            "ALTER TABLE logout_events ADD FOREIGN KEY (login_event_id) "
+            "REFERENCES login_events (id) NOT VALID"
+        ))
+    logger.info("Table unpartitioned", table=table)
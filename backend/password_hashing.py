@@ -0,0 +1,138 @@
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from typing import Optional, Tuple
+import structlog
+from fastapi import HTTPException, status
+from starlette.concurrency import run_in_threadpool
+from passlib.context import CryptContext
+from prometheus_client import Counter, Histogram
+from config import settings
+
+logger = structlog.get_logger()
+
+# Hashes at any other cost are flagged by needs_update and rehashed on the next login
+pwd_context = CryptContext(
+    schemes=["bcrypt"],
+    deprecated="auto",
+    bcrypt__default_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__min_rounds=settings.BCRYPT_ROUNDS,
+    bcrypt__max_rounds=settings.BCRYPT_ROUNDS,
+)
+
+HASH_QUEUE_WAIT = Histogram(
+    'password_hash_queue_wait_seconds',
+    'Time password hashing jobs wait for a worker',
+    ['operation']
+)
+HASH_DURATION = Histogram(
+    'password_hash_duration_seconds',
+    'Time spent hashing or verifying a password',
+    ['operation']
+)
+HASH_REJECTED = Counter(
+    'password_hash_rejected_total',
+    'Password hashing jobs rejected because the queue was full',
+    ['operation']
+)
+
+# Jobs running plus jobs waiting; anything beyond this is turned away
+_slots = threading.BoundedSemaphore(settings.PASSWORD_HASH_WORKERS + settings.PASSWORD_HASH_QUEUE_LIMIT)
+_executor: Optional[ProcessPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+def _hash(password: str) -> Tuple[str, float, float]:
+    started = time.time()
+    hashed = pwd_context.hash(password)
+    return hashed, started, time.time() - started
+
+def _verify_and_update(password: str, hashed_password: str) -> Tuple[Tuple[bool, Optional[str]], float, float]:
+    started = time.time()
+    result = pwd_context.verify_and_update(password, hashed_password)
+    return result, started, time.time() - started
+
+def _get_executor() -> Optional[ProcessPoolExecutor]:
+    global _executor
+    if settings.PASSWORD_HASH_WORKERS <= 0:
+        return None
+    with _executor_lock:
+        if _executor is None:
+            # Spawned rather than forked: the API process has live threads and sockets
+            _executor = ProcessPoolExecutor(
+                max_workers=settings.PASSWORD_HASH_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return _executor
+
+@contextmanager
+def _admitted(operation: str):
+    if not _slots.acquire(blocking=False):
+        HASH_REJECTED.labels(operation=operation).inc()
+        logger.warning("Password hashing queue full", operation=operation)
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Too many authentication requests, please retry shortly",
+            headers={"Retry-After": "1"},
+        )
+    try:
+        yield
+    finally:
+        _slots.release()
+
+def _observe(operation: str, submitted: float, started: float, elapsed: float):
+    HASH_QUEUE_WAIT.labels(operation=operation).observe(max(started - submitted, 0))
+    HASH_DURATION.labels(operation=operation).observe(elapsed)
+
+def _run(operation: str, fn, *args):
+    with _admitted(operation):
+        submitted = time.time()
+        executor = _get_executor()
+        if executor is None:
+            result, started, elapsed = fn(*args)
+        else:
+            result, started, elapsed = executor.submit(fn, *args).result()
+    
+    _observe(operation, submitted, started, elapsed)
+    return result
+
+async def _run_async(operation: str, fn, *args):
+    with _admitted(operation):
+        submitted = time.time()
+        executor = _get_executor()
+        if executor is None:
+            result, started, elapsed = await run_in_threadpool(fn, *args)
+        else:
+            result, started, elapsed = await asyncio.wrap_future(executor.submit(fn, *args))
+    
+    _observe(operation, submitted, started, elapsed)
+    return result
+
+def hash_password(password: str) -> str:
+    """Hash a password on the hashing pool, or raise 503 when it is saturated"""
+    return _run("hash", _hash, password)
+
+async def hash_password_async(password: str) -> str:
+    """hash_password() for async routes; waits without blocking the event loop"""
+    return await _run_async("hash", _hash, password)
+
+def verify_and_update(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """Verify a password on the hashing pool.
+    
+    Returns ``(valid, new_hash)``; ``new_hash`` is set when the stored hash
+    uses a different cost than BCRYPT_ROUNDS and should replace it.
+    """
+    return _run("verify", _verify_and_update, password, hashed_password)
+
+async def verify_and_update_async(password: str, hashed_password: str) -> Tuple[bool, Optional[str]]:
+    """verify_and_update() for async routes"""
+    return await _run_async("verify", _verify_and_update, password, hashed_password)
+
+def shutdown():
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown(wait=False, cancel_futures=True)
+            _executor = None
@@ -0,0 +1,94 @@
+import hashlib
+from dataclasses import dataclass
+from typing import Optional
+import redis
+import structlog
+from pydantic import TypeAdapter
+from config import settings
+from response_cache import CACHE_REQUESTS
+from schemas import PersonalizedPresentationResponse
+from ttl_cache import TTLCache
+import redis_conn
+
+logger = structlog.get_logger()
+
+ENDPOINT = "personalized-presentation"
+
+@dataclass(frozen=True)
+class RenderedPresentation:
+    body: bytes
+    etag: str
+
+adapter = TypeAdapter(PersonalizedPresentationResponse)
+
+# Keyed by the presentation's and its template's versions, so an edit to
+# either makes old entries unreachable in every worker
+local_cache = TTLCache(settings.PRESENTATION_CACHE_SIZE, settings.PRESENTATION_CACHE_TTL_SECONDS)
+
+def _key(presentation_id: int, version: int, template_version: Optional[int]) -> str:
+    return f"presentation:{presentation_id}:{version}:{template_version or 0}"
+
+def render(presentation) -> RenderedPresentation:
+    """Validate and serialize a presentation once, with a strong ETag of the bytes"""
+    body = adapter.dump_json(adapter.validate_python(presentation, from_attributes=True))
+    return RenderedPresentation(body=body, etag=f'"{hashlib.sha256(body).hexdigest()[:32]}"')
+
+async def get(presentation_id: int, version: int, template_version: Optional[int] = None) -> Optional[RenderedPresentation]:
+    key = _key(presentation_id, version, template_version)
+    rendered = local_cache.get(key)
+    if rendered is not None:
+        CACHE_REQUESTS.labels(endpoint=ENDPOINT, result="hit").inc()
+        return rendered
+    
+    client = redis_conn.async_redis_client
+    if client is not None:
+        try:
+            entry = await client.hgetall(key)
+        except redis.RedisError as e:
+            logger.warning("Presentation cache lookup failed", presentation_id=presentation_id, error=str(e))
+            entry = None
+        if entry:
+            rendered = RenderedPresentation(body=entry[b"body"], etag=entry[b"etag"].decode())
+            local_cache.set(key, rendered)
+            CACHE_REQUESTS.labels(endpoint=ENDPOINT, result="hit").inc()
+            return rendered
+    
+    CACHE_REQUESTS.labels(endpoint=ENDPOINT, result="miss").inc()
+    return None
+
+async def store(presentation_id: int, version: int, template_version: Optional[int], rendered: RenderedPresentation):
+    key = _key(presentation_id, version, template_version)
+    local_cache.set(key, rendered)
+    client = redis_conn.async_redis_client
+    if client is not None:
+        try:
+            pipe = client.pipeline()
+            pipe.hset(key, mapping={"body": rendered.body, "etag": rendered.etag})
+            pipe.expire(key, settings.PRESENTATION_REDIS_TTL_SECONDS)
+            await pipe.execute()
+        except redis.RedisError as e:
+            logger.warning("Presentation cache store failed", presentation_id=presentation_id, error=str(e))
+
+async def invalidate(presentation_id: int, version: int, template_version: Optional[int] = None):
+    """Drop the entry for a presentation version that was just edited or deleted.
+    
+    Readers already miss it once the version moves on; this frees the memory
+    sooner than the TTLs would.
+    """
+    key = _key(presentation_id, version, template_version)
+    local_cache.pop(key)
+    client = redis_conn.async_redis_client
+    if client is not None:
+        try:
+            await client.delete(key)
+        except redis.RedisError as e:
+            logger.warning("Presentation cache invalidation failed", presentation_id=presentation_id, error=str(e))
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """If-None-Match comparison, which ignores the weak W/ prefix"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = (candidate.strip() for candidate in if_none_match.split(","))
+    return etag in (candidate[2:] if candidate.startswith("W/") else candidate for candidate in candidates)
@@ -0,0 +1,133 @@
+from typing import Any, Dict, List, Optional
+from sqlalchemy import ARRAY, Integer, Text, cast, func, literal, select
+from sqlalchemy.dialects.postgresql import JSONB
+from models import PersonalizedPresentation
+
+# Per-slide edits (PATCH /forms/personalized-presentations/{id}/slides/{slide_id})
+#
+# On Postgres the new slides value is computed by the UPDATE itself from the
+# stored JSONB, so the request carries one slide and the deck is never read
+# into Python. Elsewhere the deck is edited in Python by apply_slide_patch.
+
+EMPTY_DECK = cast("[]", JSONB)
+
+# Editable fields; a new slide needs all of them
+SLIDE_FIELDS = ("title", "subtitle", "content")
+
+def apply_slide_patch(
+    slides: Optional[List[Dict[str, Any]]],
+    slide_id: int,
+    fields: Dict[str, Any],
+    position: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """Merge ``fields`` into slide ``slide_id``, appending it if missing, and
+    move it to ``position`` when given; returns a new list"""
+    slides = list(slides or [])
+    index = next((i for i, slide in enumerate(slides) if slide.get("id") == slide_id), None)
+    if index is None:
+        slide = {"id": slide_id, **fields}
+    else:
+        slide = {**slides.pop(index), **fields}
+        position = index if position is None else position
+    # list.insert clamps positions past the end
+    slides.insert(len(slides) if position is None else position, slide)
+    return slides
+
+# Template-based presentations (see PresentationTemplate) store an override
+# document instead of slides:
+#
+#     {"slides": {"<slide id>": {changed fields} | null}, "order": [slide ids]}
+#
+# A null hides a template slide, ids the template lacks are extra slides
+# stored whole, and "order" is only present when the order differs.
+
+def merge_slides(template_slides: List[Dict[str, Any]], overrides: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """The deck a template-based presentation shows"""
+    overrides = overrides or {}
+    patches = overrides.get("slides") or {}
+    slides = []
+    for slide in template_slides:
+        key = str(slide["id"])
+        if key in patches:
+            if patches[key] is None:
+                continue
+            slide = {**slide, **patches[key]}
+        slides.append(slide)
+    
+    template_ids = {str(slide["id"]) for slide in template_slides}
+    slides.extend({"id": int(key), **patch} for key, patch in patches.items() if key not in template_ids and patch is not None)
+    
+    order = overrides.get("order")
+    if order:
+        # Stable, so slides the order doesn't list keep their place at the end
+        rank = {slide_id: i for i, slide_id in enumerate(order)}
+        slides.sort(key=lambda slide: rank.get(slide["id"], len(order)))
+    return slides
+
+def diff_slides(template_slides: List[Dict[str, Any]], slides: List[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Smallest override document for which merge_slides gives back ``slides``"""
+    template = {slide["id"]: slide for slide in template_slides}
+    patches = {}
+    for slide in slides:
+        base = template.get(slide["id"], {})
+        changed = {field: value for field, value in slide.items() if field != "id" and base.get(field) != value}
+        if changed or slide["id"] not in template:
+            patches[str(slide["id"])] = changed
+    kept = {slide["id"] for slide in slides}
+    for slide_id in template:
+        if slide_id not in kept:
+            patches[str(slide_id)] = None
+    
+    overrides = {"slides": patches} if patches else {}
+    order = [slide["id"] for slide in slides]
+    if [slide["id"] for slide in merge_slides(template_slides, overrides)] != order:
+        overrides["order"] = order
+    return overrides or None
+
+def locate_slide(presentation_id: int, slide_id: int):
+    """SELECT of the presentation's version and template, the slide's array
+    index (NULL if missing) and the number of slides, read without loading
+    the deck (Postgres)"""
+    deck = func.coalesce(PersonalizedPresentation.slides, EMPTY_DECK)
+    elements = func.jsonb_array_elements(deck).table_valued("value", with_ordinality="ordinality").render_derived()
+    index = select(elements.c.ordinality - 1).where(
+        elements.c.value.op("->>")("id") == str(slide_id)
+    ).limit(1).scalar_subquery()
+    return select(
+        PersonalizedPresentation.version,
+        PersonalizedPresentation.template_id,
+        index.label("slide_index"),
+        func.jsonb_array_length(deck).label("slide_count"),
+    ).where(PersonalizedPresentation.id == presentation_id)
+
+def _path(index: int):
+    return literal([str(index)], ARRAY(Text))
+
+def _index(index: int):
+    # An untyped parameter would pick the text (object key) variants of -> and -
+    return cast(literal(index), Integer)
+
+def slide_patch_expression(
+    slide_index: Optional[int],
+    slide_count: int,
+    slide_id: int,
+    fields: Dict[str, Any],
+    position: Optional[int] = None,
+):
+    """JSONB expression for the slides column after apply_slide_patch, given
+    the slide's index and the deck length from locate_slide (Postgres)"""
+    deck = func.coalesce(PersonalizedPresentation.slides, EMPTY_DECK)
+    if slide_index is None:
+        slide = literal({"id": slide_id, **fields}, JSONB)
+        remaining, remaining_count = deck, slide_count
+    else:
+        slide = deck.op("->", return_type=JSONB)(_index(slide_index)).op("||", return_type=JSONB)(literal(fields, JSONB))
+        if position is None or position == slide_index:
+            # The common autosave case: rewrite one element in place
+            return func.jsonb_set(deck, _path(slide_index), slide, type_=JSONB)
+        remaining = deck.op("-", return_type=JSONB)(_index(slide_index))
+        remaining_count = slide_count - 1
+    
+    if position is None or position >= remaining_count:
+        return remaining.op("||", return_type=JSONB)(func.jsonb_build_array(slide, type_=JSONB))
+    return func.jsonb_insert(remaining, _path(position), slide, type_=JSONB)
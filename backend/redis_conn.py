@@ -0,0 +1,68 @@
+import redis
+import redis.asyncio
+import structlog
+from config import settings
+
+logger = structlog.get_logger()
+
+# Shared clients, opened by connect() after any fork; callers go through the
+# module attributes so they can be swapped
+#
+# redis_client is for threads and scripts; async request handlers use
+# async_redis_client so a slow Redis never stalls the event loop
+redis_client = None
+async_redis_client = None
+
+# For long blocking reads (live_events), whose read timeout has to outlast
+# the block; only opened when the shared client connected
+stream_redis_client = None
+
+def _timeouts(block_seconds: float = 0) -> dict:
+    """Client options that bound how long a call can wait on Redis"""
+    return {
+        "socket_timeout": settings.REDIS_SOCKET_TIMEOUT_SECONDS + block_seconds,
+        "socket_connect_timeout": settings.REDIS_CONNECT_TIMEOUT_SECONDS,
+    }
+
+def connect_redis(block_seconds: float = 0):
+    """Connect to Redis, returning None when it is unavailable"""
+    try:
+        client = redis.from_url(settings.REDIS_URL, **_timeouts(block_seconds))
+        client.ping()
+        logger.info("Redis connection established")
+        return client
+    except Exception as e:
+        logger.warning(f"Redis connection failed (optional): {e}")
+        return None
+
+def connect(block_seconds: float = 0):
+    """Open the shared clients for this process.
+    
+    ``block_seconds`` is the longest blocking read the caller makes on
+    redis_client, such as the ingestion worker's XREADGROUP.
+    """
+    global redis_client, async_redis_client, stream_redis_client
+    if redis_client is None:
+        redis_client = connect_redis(block_seconds)
+    if redis_client is not None and async_redis_client is None:
+        async_redis_client = redis.asyncio.from_url(settings.REDIS_URL, **_timeouts())
+    if redis_client is not None and stream_redis_client is None:
+        stream_redis_client = redis.asyncio.from_url(
+            settings.REDIS_URL, **_timeouts(settings.LIVE_EVENTS_HEARTBEAT_SECONDS)
+        )
+    return redis_client
+
+def close():
+    global redis_client
+    if redis_client is not None:
+        redis_client.close()
+        redis_client = None
+
+async def close_async():
+    global async_redis_client, stream_redis_client
+    if async_redis_client is not None:
+        await async_redis_client.aclose()
+        async_redis_client = None
+    if stream_redis_client is not None:
+        await stream_redis_client.aclose()
+        stream_redis_client = None
@@ -0,0 +1,162 @@
+import hashlib
+from typing import Any, Iterable, Optional, Tuple
+import redis
+import structlog
+from fastapi import Request, Response
+from prometheus_client import Counter
+from pydantic import TypeAdapter
+from config import settings
+import redis_conn
+
+logger = structlog.get_logger()
+
+CACHE_REQUESTS = Counter(
+    'response_cache_requests_total',
+    'Response cache lookups',
+    ['endpoint', 'result']
+)
+
+# Namespaces whose version counters key the cached responses. Writes bump the
+# namespaces they touch, which orphans every entry built from the old data.
+ANALYTICS = "analytics"
+USERS = "users"
+FORMS = "forms"
+PRESENTATIONS = "presentations"
+
+CACHED_HEADERS = ("X-Next-Cursor",)
+
+def _version_key(namespace: str) -> str:
+    return f"cache:version:{namespace}"
+
+def _bump_versions(client, namespaces):
+    pipe = client.pipeline(transaction=False)
+    for namespace in namespaces:
+        pipe.incr(_version_key(namespace))
+    return pipe.execute()
+
+def invalidate(*namespaces: str):
+    """Bump the version counters so cached responses for these namespaces stop matching"""
+    client = redis_conn.redis_client
+    if client is None or not settings.RESPONSE_CACHE_ENABLED:
+        return
+    try:
+        _bump_versions(client, namespaces)
+    except redis.RedisError as e:
+        logger.warning("Failed to invalidate response cache", namespaces=namespaces, error=str(e))
+
+async def invalidate_async(*namespaces: str):
+    """invalidate() for async handlers, without blocking the event loop"""
+    client = redis_conn.async_redis_client
+    if client is None or not settings.RESPONSE_CACHE_ENABLED:
+        return
+    try:
+        await _bump_versions(client, namespaces)
+    except redis.RedisError as e:
+        logger.warning("Failed to invalidate response cache", namespaces=namespaces, error=str(e))
+
+class CachedEndpoint:
+    """Redis cache of serialized JSON responses for one endpoint.
+    
+    Entries are keyed by the endpoint's query parameters and the current
+    versions of the namespaces it reads, and expire after a TTL.
+    """
+    
+    def __init__(self, name: str, response_type: Any, namespaces: Iterable[str], ttl: Optional[int] = None):
+        self.name = name
+        self.adapter = TypeAdapter(response_type)
+        self.namespaces = tuple(namespaces)
+        self.ttl = ttl
+    
+    def _version_keys(self):
+        return [_version_key(namespace) for namespace in self.namespaces]
+    
+    def _key(self, versions, request: Request) -> str:
+        versions = ".".join((v or b"0").decode() for v in versions)
+        params = "&".join(f"{k}={v}" for k, v in sorted(request.query_params.multi_items()))
+        digest = hashlib.sha1(f"{request.url.path}?{params}".encode()).hexdigest()
+        return f"cache:{self.name}:{versions}:{digest}"
+    
+    def _bypass(self, client) -> bool:
+        if client is None or not settings.RESPONSE_CACHE_ENABLED:
+            CACHE_REQUESTS.labels(endpoint=self.name, result="bypass").inc()
+            return True
+        return False
+    
+    def _error(self, error: Exception):
+        logger.warning("Response cache lookup failed", endpoint=self.name, error=str(error))
+        CACHE_REQUESTS.labels(endpoint=self.name, result="error").inc()
+    
+    def _hit(self, entry) -> Optional[Response]:
+        if not entry:
+            CACHE_REQUESTS.labels(endpoint=self.name, result="miss").inc()
+            return None
+        
+        CACHE_REQUESTS.labels(endpoint=self.name, result="hit").inc()
+        headers = {name: entry[name.encode()].decode() for name in CACHED_HEADERS if name.encode() in entry}
+        headers["X-Cache"] = "HIT"
+        return Response(content=entry[b"body"], media_type="application/json", headers=headers)
+    
+    def lookup(self, request: Request) -> Tuple[Optional[Response], Optional[str]]:
+        """Return ``(cached_response, key)``; pass the key to store() on a miss"""
+        client = redis_conn.redis_client
+        if self._bypass(client):
+            return None, None
+        
+        try:
+            key = self._key(client.mget(self._version_keys()), request)
+            entry = client.hgetall(key)
+        except redis.RedisError as e:
+            self._error(e)
+            return None, None
+        return self._hit(entry), key
+    
+    async def lookup_async(self, request: Request) -> Tuple[Optional[Response], Optional[str]]:
+        """lookup() for async handlers; pass the key to store_async()"""
+        client = redis_conn.async_redis_client
+        if self._bypass(client):
+            return None, None
+        
+        try:
+            key = self._key(await client.mget(self._version_keys()), request)
+            entry = await client.hgetall(key)
+        except redis.RedisError as e:
+            self._error(e)
+            return None, None
+        return self._hit(entry), key
+    
+    def _render(self, content: Any, response: Response) -> Tuple[bytes, dict]:
+        body = self.adapter.dump_json(self.adapter.validate_python(content, from_attributes=True))
+        headers = {name: response.headers[name] for name in CACHED_HEADERS if name in response.headers}
+        return body, headers
+    
+    def _store_pipeline(self, client, key: str, body: bytes, headers: dict):
+        pipe = client.pipeline()
+        pipe.hset(key, mapping={"body": body, **headers})
+        pipe.expire(key, self.ttl or settings.RESPONSE_CACHE_TTL_SECONDS)
+        return pipe.execute()
+    
+    def store(self, key: Optional[str], content: Any, response: Response) -> Response:
+        """Serialize ``content``, cache it under ``key`` and return it as a response"""
+        body, headers = self._render(content, response)
+        
+        client = redis_conn.redis_client
+        if key is not None and client is not None:
+            try:
+                self._store_pipeline(client, key, body, headers)
+            except redis.RedisError as e:
+                logger.warning("Response cache store failed", endpoint=self.name, error=str(e))
+        
+        return Response(content=body, media_type="application/json", headers={**headers, "X-Cache": "MISS"})
+    
+    async def store_async(self, key: Optional[str], content: Any, response: Response) -> Response:
+        """store() for async handlers"""
+        body, headers = self._render(content, response)
+        
+        client = redis_conn.async_redis_client
+        if key is not None and client is not None:
+            try:
+                await self._store_pipeline(client, key, body, headers)
+            except redis.RedisError as e:
+                logger.warning("Response cache store failed", endpoint=self.name, error=str(e))
+        
+        return Response(content=body, media_type="application/json", headers={**headers, "X-Cache": "MISS"})
@@ -0,0 +1,42 @@
+#!/usr/bin/env python3
+"""
+Engagement rollup job
+Incrementally refreshes the daily rollup tables and the sessions built from
+page visits, or backfills a date range
+"""
+
+import argparse
+import time
+from datetime import date
+from database import SessionLocal
+from rollups import refresh_rollups, backfill
+from sessionization import refresh_sessions
+
+def main():
+    parser = argparse.ArgumentParser(description="Maintain daily engagement rollups")
+    parser.add_argument("--backfill", action="store_true", help="Rebuild rollups instead of refreshing incrementally")
+    parser.add_argument("--start", type=date.fromisoformat, help="First day to backfill (YYYY-MM-DD)")
+    parser.add_argument("--end", type=date.fromisoformat, help="Last day to backfill (YYYY-MM-DD)")
+    parser.add_argument("--interval", type=int, help="Keep running, refreshing every N seconds")
+    args = parser.parse_args()
+    
+    db = SessionLocal()
+    try:
+        if args.backfill:
+            days = backfill(db, args.start, args.end)
+            print(f"✅ Rebuilt rollups for {days} day(s)")
+            return
+        
+        while True:
+            days = refresh_rollups(db)
+            print(f"✅ Rollups refreshed ({len(days)} day(s) rebuilt)")
+            sessions = refresh_sessions(db)
+            print(f"✅ Sessions refreshed ({sessions} session(s) written)")
+            if not args.interval:
+                break
+            time.sleep(args.interval)
+    finally:
+        db.close()
+
+if __name__ == "__main__":
+    main()
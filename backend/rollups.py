@@ -0,0 +1,261 @@
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional, Tuple
+import structlog
+from sqlalchemy import Date, func, select, delete, insert
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.orm import Session
+from sqlalchemy.sql.functions import FunctionElement
+from config import settings
+from models import PageVisit, LoginEvent, DailyUserEngagement, DailyPageEngagement, RollupState
+
+logger = structlog.get_logger()
+
+STATE_NAME = "engagement"
+
+class utc_date(FunctionElement):
+    """The UTC calendar day of a timestamp, matching the UTC ranges of _bounds"""
+    type = Date()
+    inherit_cache = True
+
+@compiles(utc_date)
+def _utc_date(element, compiler, **kw):
+    # SQLite stores naive UTC timestamps
+    return f"DATE({compiler.process(element.clauses, **kw)})"
+
+@compiles(utc_date, "postgresql")
+def _utc_date_postgresql(element, compiler, **kw):
+    # DATE() of a timestamptz follows the session time zone
+    return f"DATE(timezone('UTC', {compiler.process(element.clauses, **kw)}))"
+
+def _day(value) -> date:
+    # SQLite returns DATE() as text, Postgres as a date
+    return date.fromisoformat(value) if isinstance(value, str) else value
+
+def _bounds(start: date, end: date) -> Tuple[datetime, datetime]:
+    """UTC timestamps covering the days ``start`` through ``end`` inclusive"""
+    return (
+        datetime.combine(start, time.min, tzinfo=timezone.utc),
+        datetime.combine(end + timedelta(days=1), time.min, tzinfo=timezone.utc),
+    )
+
+def aggregate_user_days(db: Session, start: date, end: date, user_id: Optional[int] = None) -> Dict[tuple, Dict]:
+    """Per-user-per-day engagement for ``start``..``end`` computed from raw events"""
+    lower, upper = _bounds(start, end)
+    rows: Dict[tuple, Dict] = {}
+    
+    def row(user, day):
+        return rows.setdefault((user, _day(day)), {
+            "user_id": user,
+            "day": _day(day),
+            "page_visits": 0,
+            "page_time_seconds": 0.0,
+            "logins": 0,
+            "completed_sessions": 0,
+            "session_time_seconds": 0.0,
+        })
+    
+    visit_day = utc_date(PageVisit.entry_time)
+    query = select(
+        PageVisit.user_id, visit_day, func.count(), func.coalesce(func.sum(PageVisit.duration_seconds), 0)
+    ).where(PageVisit.entry_time >= lower, PageVisit.entry_time < upper)
+    if user_id is not None:
+        query = query.where(PageVisit.user_id == user_id)
+    for user, day, visits, seconds in db.execute(query.group_by(PageVisit.user_id, visit_day)):
+        entry = row(user, day)
+        entry["page_visits"] = visits
+        entry["page_time_seconds"] = float(seconds)
+    
+    login_day = utc_date(LoginEvent.login_timestamp)
+    query = select(
+        LoginEvent.user_id,
+        login_day,
+        func.count(),
+        func.count(LoginEvent.session_duration_seconds),
+        func.coalesce(func.sum(LoginEvent.session_duration_seconds), 0)
+    ).where(LoginEvent.login_timestamp >= lower, LoginEvent.login_timestamp < upper)
+    if user_id is not None:
+        query = query.where(LoginEvent.user_id == user_id)
+    for user, day, logins, completed, seconds in db.execute(query.group_by(LoginEvent.user_id, login_day)):
+        entry = row(user, day)
+        entry["logins"] = logins
+        entry["completed_sessions"] = completed
+        entry["session_time_seconds"] = float(seconds)
+    
+    return rows
+
+def aggregate_page_days(db: Session, start: date, end: date, page_name: Optional[str] = None) -> Dict[tuple, Dict]:
+    """Per-page-per-day engagement for ``start``..``end`` computed from raw events"""
+    lower, upper = _bounds(start, end)
+    visit_day = utc_date(PageVisit.entry_time)
+    query = select(
+        PageVisit.page_name,
+        visit_day,
+        func.count(),
+        func.count(func.distinct(PageVisit.user_id)),
+        func.count(PageVisit.duration_seconds),
+        func.coalesce(func.sum(PageVisit.duration_seconds), 0)
+    ).where(PageVisit.entry_time >= lower, PageVisit.entry_time < upper)
+    if page_name is not None:
+        query = query.where(PageVisit.page_name == page_name)
+    
+    return {
+        (name, _day(day)): {
+            "page_name": name,
+            "day": _day(day),
+            "visits": visits,
+            "unique_users": users,
+            "completed_visits": completed,
+            "total_duration_seconds": float(seconds),
+        }
+        for name, day, visits, users, completed, seconds
+        in db.execute(query.group_by(PageVisit.page_name, visit_day))
+    }
+
+def _ranges(days: Iterable[date]) -> List[Tuple[date, date]]:
+    """Collapse days into contiguous inclusive ranges"""
+    ranges = []
+    for day in sorted(set(days)):
+        if ranges and ranges[-1][1] + timedelta(days=1) == day:
+            ranges[-1] = (ranges[-1][0], day)
+        else:
+            ranges.append((day, day))
+    return ranges
+
+def rebuild_days(db: Session, start: date, end: date):
+    """Replace the rollup rows for ``start``..``end`` with freshly aggregated ones"""
+    db.execute(delete(DailyUserEngagement).where(DailyUserEngagement.day.between(start, end)))
+    db.execute(delete(DailyPageEngagement).where(DailyPageEngagement.day.between(start, end)))
+    
+    user_rows = list(aggregate_user_days(db, start, end).values())
+    if user_rows:
+        db.execute(insert(DailyUserEngagement), user_rows)
+    page_rows = list(aggregate_page_days(db, start, end).values())
+    if page_rows:
+        db.execute(insert(DailyPageEngagement), page_rows)
+
+def _get_state(db: Session) -> Optional[RollupState]:
+    return db.get(RollupState, STATE_NAME)
+
+def backfill(db: Session, start: Optional[date] = None, end: Optional[date] = None) -> int:
+    """Rebuild rollups for a date range, by default all history through today.
+    
+    Commits once per chunk of ROLLUP_BACKFILL_CHUNK_DAYS. Only a full
+    backfill moves the high-water marks; a partial one just repairs days.
+    Returns the number of days rebuilt.
+    """
+    full = start is None and end is None
+    today = datetime.now(timezone.utc).date()
+    max_visit_id = db.scalar(select(func.max(PageVisit.id))) or 0
+    max_login_id = db.scalar(select(func.max(LoginEvent.id))) or 0
+    
+    if start is None:
+        first = [
+            db.scalar(select(func.min(PageVisit.entry_time))),
+            db.scalar(select(func.min(LoginEvent.login_timestamp))),
+        ]
+        first = [value for value in first if value is not None]
+        start = min(first).date() if first else today
+    end = end or today
+    
+    chunk = timedelta(days=settings.ROLLUP_BACKFILL_CHUNK_DAYS)
+    day = start
+    while day <= end:
+        chunk_end = min(day + chunk - timedelta(days=1), end)
+        rebuild_days(db, day, chunk_end)
+        db.commit()
+        logger.info("Rollups rebuilt", start=str(day), end=str(chunk_end))
+        day = chunk_end + timedelta(days=1)
+    
+    if full:
+        state = _get_state(db) or RollupState(name=STATE_NAME)
+        state.last_page_visit_id = max_visit_id
+        state.last_login_event_id = max_login_id
+        state.covered_until = today - timedelta(days=1)
+        state.refreshed_at = datetime.now(timezone.utc)
+        db.merge(state)
+        db.commit()
+    
+    return (end - start).days + 1
+
+def refresh_rollups(db: Session) -> List[date]:
+    """Incrementally bring the rollups up to date.
+    
+    Rebuilds the days touched by raw rows past the high-water marks, plus
+    the last ROLLUP_LOOKBACK_DAYS days, which can still change as exits and
+    logouts arrive. The first run backfills all history.
+    """
+    state = _get_state(db)
+    if state is None or state.covered_until is None:
+        backfill(db)
+        return []
+    
+    today = datetime.now(timezone.utc).date()
+    # Read the marks before aggregating so rows inserted meanwhile are picked up next time
+    max_visit_id = db.scalar(select(func.max(PageVisit.id))) or 0
+    max_login_id = db.scalar(select(func.max(LoginEvent.id))) or 0
+    
+    dirty = {today - timedelta(days=offset) for offset in range(settings.ROLLUP_LOOKBACK_DAYS + 1)}
+    dirty.update(_day(day) for (day,) in db.execute(
+        select(utc_date(PageVisit.entry_time)).where(
+            PageVisit.id > state.last_page_visit_id, PageVisit.id <= max_visit_id
+        ).distinct()
+    ))
+    dirty.update(_day(day) for (day,) in db.execute(
+        select(utc_date(LoginEvent.login_timestamp)).where(
+            LoginEvent.id > state.last_login_event_id, LoginEvent.id <= max_login_id
+        ).distinct()
+    ))
+    
+    for start, end in _ranges(dirty):
+        rebuild_days(db, start, end)
+    
+    state.last_page_visit_id = max_visit_id
+    state.last_login_event_id = max_login_id
+    state.covered_until = today - timedelta(days=1)
+    state.refreshed_at = datetime.now(timezone.utc)
+    db.commit()
+    
+    logger.info("Rollups refreshed", days=len(dirty), covered_until=str(state.covered_until))
+    return sorted(dirty)
+
+def _split(db: Session, start: date, end: date) -> Tuple[Optional[Tuple[date, date]], Optional[Tuple[date, date]]]:
+    """Split a range into the part served by rollups and the part that needs raw events"""
+    state = _get_state(db)
+    covered_until = state.covered_until if state else None
+    if covered_until is None or covered_until < start:
+        return None, (start, end)
+    if covered_until >= end:
+        return (start, end), None
+    return (start, covered_until), (covered_until + timedelta(days=1), end)
+
+def user_engagement(db: Session, start: date, end: date, user_id: Optional[int] = None) -> List[Dict]:
+    """Per-user-per-day engagement, from rollups where they cover the range"""
+    covered, raw = _split(db, start, end)
+    rows = []
+    if covered:
+        query = select(DailyUserEngagement).where(DailyUserEngagement.day.between(*covered))
+        if user_id is not None:
+            query = query.where(DailyUserEngagement.user_id == user_id)
+        rows.extend(
+            {column.name: getattr(entry, column.name) for column in DailyUserEngagement.__table__.columns}
+            for entry in db.scalars(query)
+        )
+    if raw:
+        rows.extend(aggregate_user_days(db, *raw, user_id=user_id).values())
+    return sorted(rows, key=lambda entry: (entry["day"], entry["user_id"]))
+
+def page_engagement(db: Session, start: date, end: date, page_name: Optional[str] = None) -> List[Dict]:
+    """Per-page-per-day engagement, from rollups where they cover the range"""
+    covered, raw = _split(db, start, end)
+    rows = []
+    if covered:
+        query = select(DailyPageEngagement).where(DailyPageEngagement.day.between(*covered))
+        if page_name is not None:
+            query = query.where(DailyPageEngagement.page_name == page_name)
+        rows.extend(
+            {column.name: getattr(entry, column.name) for column in DailyPageEngagement.__table__.columns}
+            for entry in db.scalars(query)
+        )
+    if raw:
+        rows.extend(aggregate_page_days(db, *raw, page_name=page_name).values())
+    return sorted(rows, key=lambda entry: (entry["day"], entry["page_name"]))
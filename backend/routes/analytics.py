@@ -1,53 +1,126 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from datetime import datetime, timedelta, timezone
-from database import get_db
-from models import PageVisit, LoginEvent, LogoutEvent, User, FormSubmission
-from schemas import PageVisitCreate, PageVisitUpdate, PageVisitResponse, LoginEventResponse, LogoutEventResponse, UserAnalytics, SimplifiedUserAnalytics, UserSessionData
-from dependencies import get_current_user, get_current_admin_user
+from fastapi import APIRouter, Depends, Header, HTTPException, Query, Request, Response, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, StreamingResponse
+from sqlalchemy import func, select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import selectinload
+from starlette.concurrency import run_in_threadpool
+from typing import List, Optional
+from collections import defaultdict
+from datetime import date, datetime, timedelta, timezone
+from database import get_async_db
+from models import PageVisit, LoginEvent, LogoutEvent, User, FormSubmission, ActivitySession
+from schemas import PageVisitCreate, PageVisitUpdate, PageVisitResponse, PageVisitExitQueued, LoginEventResponse, LogoutEventResponse, UserAnalytics, SimplifiedUserAnalytics, UserSessionData, PageVisitBatch, PageVisitBatchResponse, PageVisitEventResult, DailyUserEngagementResponse, DailyPageEngagementResponse, SessionStatisticsResponse, ActivitySessionResponse
+from dependencies import get_current_user, get_current_admin_user, get_current_principal, Principal
+from ingestion import insert_page_visits, update_page_visit_exits, record_logout, enqueue_event, page_visit_ids
+from config import settings
+import redis_conn
+from pagination import PageParams, paginate_async, date_range
+import live_events
+import rollups
+import session_stats
+import response_cache
+from response_cache import CachedEndpoint
 import structlog
 
 logger = structlog.get_logger()
 
 router = APIRouter(prefix="/analytics", tags=["analytics"])
 
-def calculate_session_duration(login_event: LoginEvent, logout_event: LogoutEvent = None) -> float:
-    """Calculate session duration for a login event"""
-    if logout_event:
+user_analytics_cache = CachedEndpoint(
+    "user-analytics", List[UserAnalytics], (response_cache.ANALYTICS, response_cache.USERS, response_cache.FORMS)
+)
+simplified_analytics_cache = CachedEndpoint(
+    "simplified-analytics", List[SimplifiedUserAnalytics], (response_cache.ANALYTICS, response_cache.USERS, response_cache.FORMS)
+)
+daily_engagement_cache = CachedEndpoint(
+    "daily-engagement", List[DailyUserEngagementResponse], (response_cache.ANALYTICS,)
+)
+page_engagement_cache = CachedEndpoint(
+    "page-engagement", List[DailyPageEngagementResponse], (response_cache.ANALYTICS,)
+)
+activity_sessions_cache = CachedEndpoint(
+    "activity-sessions", List[ActivitySessionResponse], (response_cache.ANALYTICS,)
+)
+session_statistics_cache = CachedEndpoint(
+    "session-statistics", SessionStatisticsResponse, (response_cache.ANALYTICS,)
+)
+
+def session_duration_from_values(
+    login_timestamp: datetime,
+    stored_duration: Optional[float] = None,
+    logout_timestamp: Optional[datetime] = None,
+    current_time: Optional[datetime] = None
+) -> float:
+    """Calculate session duration from plain column values"""
+    if logout_timestamp is not None:
         # Calculate from logout timestamp
-        duration = (logout_event.logout_timestamp - login_event.login_timestamp).total_seconds()
+        duration = (logout_timestamp - login_timestamp).total_seconds()
         return max(0, duration)  # Ensure non-negative duration
-    elif login_event.session_duration_seconds is not None:
+    elif stored_duration is not None:
         # Use stored session duration
-        return max(0, login_event.session_duration_seconds)
+        return max(0, stored_duration)
     else:
         # For active sessions, calculate current duration
-        current_time = datetime.now(timezone.utc)
-        duration = (current_time - login_event.login_timestamp).total_seconds()
+        current_time = current_time or datetime.now(timezone.utc)
+        duration = (current_time - login_timestamp).total_seconds()
         # Don't count sessions older than 24 hours as active
         if duration > 24 * 3600:
             return 0
         return max(0, duration)
 
+def calculate_session_duration(login_event: LoginEvent, logout_event: LogoutEvent = None) -> float:
+    """Calculate session duration for a login event"""
+    return session_duration_from_values(
+        login_event.login_timestamp,
+        login_event.session_duration_seconds,
+        logout_event.logout_timestamp if logout_event else None
+    )
+
 @router.post("/page-visit", response_model=PageVisitResponse)
-def create_page_visit(
+async def create_page_visit(
     visit_data: PageVisitCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     logger.info("Creating page visit", 
                 user_id=current_user.id, 
                 page_name=visit_data.page_name,
                 username=current_user.username)
     
+    visit_id = await page_visit_ids.allocate() if settings.INGESTION_MODE == "queue" else None
+    if visit_id is not None:
+        page_visit = PageVisit(
+            id=visit_id,
+            user_id=current_user.id,
+            page_name=visit_data.page_name,
+            entry_time=datetime.now(timezone.utc)
+        )
+        event = {
+            "id": page_visit.id,
+            "user_id": page_visit.user_id,
+            "page_name": page_visit.page_name,
+            "entry_time": page_visit.entry_time,
+        }
+        if await enqueue_event("page_visit_enter", event):
+            await live_events.publish("page_visit_enter", event)
+            logger.info("Page visit queued", visit_id=visit_id, user_id=current_user.id)
+            return page_visit
+    
     page_visit = PageVisit(
         user_id=current_user.id,
         page_name=visit_data.page_name
     )
     db.add(page_visit)
-    db.commit()
-    db.refresh(page_visit)
+    await db.commit()
+    await db.refresh(page_visit)
+    await response_cache.invalidate_async(response_cache.ANALYTICS)
+    await live_events.publish("page_visit_enter", {
+        "id": page_visit.id,
+        "user_id": page_visit.user_id,
+        "page_name": page_visit.page_name,
+        "entry_time": page_visit.entry_time,
+    })
     
     logger.info("Page visit created", 
                 visit_id=page_visit.id, 
@@ -56,22 +129,42 @@ def create_page_visit(
     
     return page_visit
 
-@router.put("/page-visit/{visit_id}", response_model=PageVisitResponse)
-def update_page_visit(
+@router.put(
+    "/page-visit/{visit_id}",
+    response_model=PageVisitResponse,
+    responses={status.HTTP_202_ACCEPTED: {"model": PageVisitExitQueued, "description": "Exit queued for the ingestion worker"}}
+)
+async def update_page_visit(
     visit_id: int,
     visit_update: PageVisitUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     logger.info("Updating page visit", 
                 visit_id=visit_id, 
                 user_id=current_user.id,
                 duration_seconds=visit_update.duration_seconds)
     
-    page_visit = db.query(PageVisit).filter(
+    event = {
+        "id": visit_id,
+        "user_id": current_user.id,
+        "exit_time": visit_update.exit_time,
+        "duration_seconds": visit_update.duration_seconds,
+    }
+    # The visit itself may still be queued, so it isn't looked up here; the
+    # worker retries exits whose visit hasn't been written yet
+    if await enqueue_event("page_visit_exit", event):
+        await live_events.publish("page_visit_exit", event)
+        logger.info("Page visit exit queued", visit_id=visit_id, user_id=current_user.id)
+        return JSONResponse(
+            status_code=status.HTTP_202_ACCEPTED,
+            content=jsonable_encoder(PageVisitExitQueued(**event))
+        )
+    
+    page_visit = await db.scalar(select(PageVisit).where(
         PageVisit.id == visit_id,
         PageVisit.user_id == current_user.id
-    ).first()
+    ))
     
     if not page_visit:
         logger.warning("Page visit not found", 
@@ -84,8 +177,10 @@ def update_page_visit(
     
     page_visit.exit_time = visit_update.exit_time
     page_visit.duration_seconds = visit_update.duration_seconds
-    db.commit()
-    db.refresh(page_visit)
+    await db.commit()
+    await db.refresh(page_visit)
+    await response_cache.invalidate_async(response_cache.ANALYTICS)
+    await live_events.publish("page_visit_exit", event)
     
     logger.info("Page visit updated", 
                 visit_id=visit_id, 
@@ -96,26 +191,38 @@ def update_page_visit(
 
 # Alternative endpoint for sendBeacon (doesn't require response)
 @router.post("/page-visit/{visit_id}/exit")
-def update_page_visit_exit(
+async def update_page_visit_exit(
     visit_id: int,
     visit_update: PageVisitUpdate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     logger.info("Updating page visit exit", 
                 visit_id=visit_id, 
                 user_id=current_user.id,
                 duration_seconds=visit_update.duration_seconds)
     
-    page_visit = db.query(PageVisit).filter(
+    event = {
+        "id": visit_id,
+        "user_id": current_user.id,
+        "exit_time": visit_update.exit_time,
+        "duration_seconds": visit_update.duration_seconds,
+    }
+    if await enqueue_event("page_visit_exit", event):
+        await live_events.publish("page_visit_exit", event)
+        return {"message": "Page visit updated"}
+    
+    page_visit = await db.scalar(select(PageVisit).where(
         PageVisit.id == visit_id,
         PageVisit.user_id == current_user.id
-    ).first()
+    ))
     
     if page_visit:
         page_visit.exit_time = visit_update.exit_time
         page_visit.duration_seconds = visit_update.duration_seconds
-        db.commit()
+        await db.commit()
+        await response_cache.invalidate_async(response_cache.ANALYTICS)
+        await live_events.publish("page_visit_exit", event)
         logger.info("Page visit exit updated", 
                     visit_id=visit_id, 
                     user_id=current_user.id,
@@ -127,44 +234,137 @@ def update_page_visit_exit(
     
     return {"message": "Page visit updated"}
 
+def clamp_entry_time(entry_time: Optional[datetime], now: datetime) -> datetime:
+    """A client-supplied entry time, kept within ANALYTICS_MAX_ENTRY_AGE_SECONDS before ``now``.
+    
+    Unbounded times would land outside the rollup and sessionization
+    lookbacks and the current partitions.
+    """
+    if entry_time is None:
+        return now
+    if entry_time.tzinfo is None:
+        entry_time = entry_time.replace(tzinfo=timezone.utc)
+    earliest = now - timedelta(seconds=settings.ANALYTICS_MAX_ENTRY_AGE_SECONDS)
+    return min(max(entry_time, earliest), now)
+
+@router.post("/page-visits/batch", response_model=PageVisitBatchResponse)
+async def record_page_visit_batch(
+    batch: PageVisitBatch,
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Record many enter/exit events with one INSERT, one UPDATE and one commit"""
+    if len(batch.events) > settings.ANALYTICS_BATCH_MAX_EVENTS:
+        raise HTTPException(
+            status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE,
+            detail=f"Batch exceeds {settings.ANALYTICS_BATCH_MAX_EVENTS} events"
+        )
+    
+    results = [None] * len(batch.events)
+    now = datetime.now(timezone.utc)
+    
+    # Enters first so exits in the same batch can refer to them by client_ref
+    enters = [(index, event) for index, event in enumerate(batch.events) if event.type == "enter"]
+    visit_ids = await db.run_sync(insert_page_visits, [
+        {
+            "user_id": current_user.id,
+            "page_name": event.page_name,
+            "entry_time": clamp_entry_time(event.entry_time, now),
+        }
+        for _, event in enters
+    ])
+    
+    refs = {}
+    for (index, event), visit_id in zip(enters, visit_ids):
+        if event.client_ref is not None:
+            refs[event.client_ref] = visit_id
+        results[index] = PageVisitEventResult(
+            index=index, status="created", visit_id=visit_id, client_ref=event.client_ref
+        )
+    
+    exits = []
+    for index, event in enumerate(batch.events):
+        if event.type != "exit":
+            continue
+        visit_id = event.visit_id if event.visit_id is not None else refs.get(event.client_ref)
+        exits.append((index, event, visit_id))
+    
+    updated = await db.run_sync(update_page_visit_exits, [
+        {
+            "id": visit_id,
+            "user_id": current_user.id,
+            "exit_time": event.exit_time,
+            "duration_seconds": event.duration_seconds,
+        }
+        for _, event, visit_id in exits
+        if visit_id is not None
+    ])
+    
+    for index, event, visit_id in exits:
+        results[index] = PageVisitEventResult(
+            index=index,
+            status="updated" if visit_id in updated else "not_found",
+            visit_id=visit_id,
+            client_ref=event.client_ref
+        )
+    
+    await db.commit()
+    await response_cache.invalidate_async(response_cache.ANALYTICS)
+    await live_events.publish_many(
+        [
+            ("page_visit_enter", {
+                "id": visit_id,
+                "user_id": current_user.id,
+                "page_name": event.page_name,
+                "entry_time": clamp_entry_time(event.entry_time, now),
+            })
+            for (_, event), visit_id in zip(enters, visit_ids)
+        ] + [
+            ("page_visit_exit", {
+                "id": visit_id,
+                "user_id": current_user.id,
+                "exit_time": event.exit_time,
+                "duration_seconds": event.duration_seconds,
+            })
+            for _, event, visit_id in exits
+            if visit_id in updated
+        ]
+    )
+    
+    logger.info("Page visit batch recorded",
+                user_id=current_user.id,
+                created=len(visit_ids),
+                updated=len(updated),
+                not_found=sum(1 for result in results if result.status == "not_found"))
+    
+    return PageVisitBatchResponse(results=results)
+
 @router.post("/logout")
-def create_logout_event(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def create_logout_event(
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     logger.info("Processing logout event", 
                 user_id=current_user.id,
                 username=current_user.username)
     
-    # Find the most recent login event for this user that doesn't have session_duration_seconds set
-    latest_login = db.query(LoginEvent).filter(
-        LoginEvent.user_id == current_user.id,
-        LoginEvent.session_duration_seconds.is_(None)
-    ).order_by(LoginEvent.login_timestamp.desc()).first()
+    current_time = datetime.now(timezone.utc)
+    if await enqueue_event("logout", {"user_id": current_user.id, "logout_timestamp": current_time}):
+        await live_events.publish("logout", {"user_id": current_user.id, "logout_timestamp": current_time})
+        return {"message": "Logout event queued"}
     
-    if latest_login:
-        # Calculate session duration
-        current_time = datetime.now(timezone.utc)
-        session_duration = (current_time - latest_login.login_timestamp).total_seconds()
-        session_duration = max(0, session_duration)  # Ensure non-negative
-        
-        # Update the login event with session duration
-        latest_login.session_duration_seconds = session_duration
-        
-        # Check if logout event already exists for this login
-        existing_logout = db.query(LogoutEvent).filter(
-            LogoutEvent.login_event_id == latest_login.id
-        ).first()
-        
-        if not existing_logout:
-            # Create logout event
-            logout_event = LogoutEvent(
-                user_id=current_user.id,
-                login_event_id=latest_login.id
-            )
-            db.add(logout_event)
-        
-        db.commit()
+    logout = await db.run_sync(record_logout, current_user.id, current_time)
+    
+    if logout:
+        latest_login, session_duration = logout
+        await db.commit()
+        await response_cache.invalidate_async(response_cache.ANALYTICS)
+        await live_events.publish("logout", {
+            "user_id": current_user.id,
+            "logout_timestamp": current_time,
+            "login_event_id": latest_login.id,
+            "session_duration": session_duration,
+        })
         
         logger.info("Logout event recorded", 
                     user_id=current_user.id,
@@ -177,118 +377,273 @@ def create_logout_event(
                   user_id=current_user.id)
     return {"message": "No active session found"}
 
+def filter_users(query, user_id: Optional[int], role: Optional[str]):
+    if user_id is not None:
+        query = query.filter(User.id == user_id)
+    if role is not None:
+        query = query.filter(User.role == role)
+    return query
+
 @router.get("/user-analytics", response_model=List[UserAnalytics])
-def get_user_analytics(
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+async def get_user_analytics(
+    request: Request,
+    response: Response,
+    user_id: Optional[int] = None,
+    role: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    page_name: Optional[str] = None,
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    users = db.query(User).all()
-    analytics = []
+    """Every event of each user on the page.
     
-    for user in users:
-        login_events = db.query(LoginEvent).filter(
-            LoginEvent.user_id == user.id
-        ).all()
-        
-        logout_events = db.query(LogoutEvent).filter(
-            LogoutEvent.user_id == user.id
-        ).all()
-        
-        page_visits = db.query(PageVisit).filter(
-            PageVisit.user_id == user.id
-        ).all()
-        
-        form_submissions = db.query(FormSubmission).filter(
-            FormSubmission.user_id == user.id
-        ).all()
-        
-        analytics.append(UserAnalytics(
+    Lists raw rows, so it can't be served from the rollups; per-day totals
+    for a date range come from /daily-engagement and /page-engagement.
+    """
+    cached, cache_key = await user_analytics_cache.lookup_async(request)
+    if cached is not None:
+        return cached
+    
+    page_visit_filters = date_range(PageVisit.entry_time, date_from, date_to)
+    if page_name is not None:
+        page_visit_filters.append(PageVisit.page_name == page_name)
+    
+    # One query per relationship for the page of users instead of four per user
+    query = filter_users(select(User), user_id, role).options(
+        selectinload(User.login_events.and_(*date_range(LoginEvent.login_timestamp, date_from, date_to))),
+        selectinload(User.logout_events.and_(*date_range(LogoutEvent.logout_timestamp, date_from, date_to))),
+        selectinload(User.page_visits.and_(*page_visit_filters)),
+        selectinload(User.form_submissions.and_(*date_range(FormSubmission.submitted_at, date_from, date_to))),
+    )
+    users = await paginate_async(db, query, User.id, page, response)
+    
+    analytics = [
+        UserAnalytics(
             user=user,
-            login_events=login_events,
-            logout_events=logout_events,
-            page_visits=page_visits,
-            form_submissions=form_submissions
-        ))
+            login_events=user.login_events,
+            logout_events=user.logout_events,
+            page_visits=user.page_visits,
+            form_submissions=user.form_submissions
+        )
+        for user in users
+    ]
     
-    return analytics
+    return await user_analytics_cache.store_async(cache_key, analytics, response)
 
 @router.get("/simplified-analytics", response_model=List[SimplifiedUserAnalytics])
-def get_simplified_user_analytics(
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+async def get_simplified_user_analytics(
+    request: Request,
+    response: Response,
+    user_id: Optional[int] = None,
+    role: Optional[str] = None,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    """Get simplified analytics focusing on login/logout times, session duration, and form submission status"""
-    users = db.query(User).all()
-    analytics = []
-    
-    for user in users:
-        login_events = db.query(LoginEvent).filter(
-            LoginEvent.user_id == user.id
-        ).order_by(LoginEvent.login_timestamp.desc()).all()
-        
-        logout_events = db.query(LogoutEvent).filter(
-            LogoutEvent.user_id == user.id
-        ).order_by(LogoutEvent.logout_timestamp.desc()).all()
-        
-        form_submissions = db.query(FormSubmission).filter(
-            FormSubmission.user_id == user.id
-        ).all()
-        
-        # Create session data
-        sessions = []
-        total_time_spent = 0
+    """Get simplified analytics focusing on login/logout times, session duration, and form submission status.
+    
+    Activity totals are read from the sessions table (sessionization.py)
+    rather than paired up per request.
+    """
+    cached, cache_key = await simplified_analytics_cache.lookup_async(request)
+    if cached is not None:
+        return cached
+    
+    users = await paginate_async(db, filter_users(select(User), user_id, role), User.id, page, response)
+    user_ids = [user.id for user in users]
+    
+    # Pair every login with its latest logout in the database rather than per user in Python
+    latest_logout = select(
+        LogoutEvent.login_event_id.label("login_event_id"),
+        func.max(LogoutEvent.logout_timestamp).label("logout_timestamp")
+    ).where(LogoutEvent.user_id.in_(user_ids)).group_by(LogoutEvent.login_event_id).subquery()
+    
+    session_rows = (await db.execute(select(
+        LoginEvent.user_id,
+        LoginEvent.login_timestamp,
+        LoginEvent.session_duration_seconds,
+        latest_logout.c.logout_timestamp
+    ).outerjoin(
+        latest_logout, latest_logout.c.login_event_id == LoginEvent.id
+    ).where(
+        LoginEvent.user_id.in_(user_ids),
+        *date_range(LoginEvent.login_timestamp, date_from, date_to)
+    ).order_by(LoginEvent.user_id, LoginEvent.login_timestamp.desc()))).all()
+    
+    submitters = set(await db.scalars(
+        select(FormSubmission.user_id).where(FormSubmission.user_id.in_(user_ids)).distinct()
+    ))
+    
+    activity_rows = await db.execute(select(
+        ActivitySession.user_id, func.count(), func.sum(ActivitySession.duration_seconds)
+    ).where(
+        ActivitySession.user_id.in_(user_ids),
+        *date_range(ActivitySession.started_at, date_from, date_to)
+    ).group_by(ActivitySession.user_id))
+    activity_sessions = defaultdict(int)
+    activity_time = defaultdict(float)
+    for activity_user_id, count, seconds in activity_rows:
+        activity_sessions[activity_user_id] = count
+        activity_time[activity_user_id] = float(seconds)
+    
+    # Create session data
+    current_time = datetime.now(timezone.utc)
+    sessions_by_user = defaultdict(list)
+    time_spent_by_user = defaultdict(float)
+    
+    for login_user_id, login_timestamp, stored_duration, logout_timestamp in session_rows:
+        # Calculate session duration
+        session_duration = session_duration_from_values(
+            login_timestamp, stored_duration, logout_timestamp, current_time
+        )
         
-        for login_event in login_events:
-            # Find corresponding logout event
-            logout_event = next(
-                (logout for logout in logout_events if logout.login_event_id == login_event.id),
-                None
-            )
-            
-            # Calculate session duration
-            session_duration = calculate_session_duration(login_event, logout_event)
-            
-            # Add to total time only if session is completed (has explicit duration or logout recorded)
-            if (login_event.session_duration_seconds is not None) or (logout_event is not None):
-                total_time_spent += session_duration
-            
-            sessions.append(UserSessionData(
-                login_timestamp=login_event.login_timestamp,
-                logout_timestamp=logout_event.logout_timestamp if logout_event else None,
-                session_duration_seconds=session_duration,
-                has_submitted_form=len(form_submissions) > 0
-            ))
+        # Add to total time only if session is completed (has explicit duration or logout recorded)
+        if (stored_duration is not None) or (logout_timestamp is not None):
+            time_spent_by_user[login_user_id] += session_duration
         
-        analytics.append(SimplifiedUserAnalytics(
-            user=user,
-            sessions=sessions,
-            total_time_spent_seconds=total_time_spent,
-            total_logins=len(login_events),
-            has_submitted_form=len(form_submissions) > 0
+        sessions_by_user[login_user_id].append(UserSessionData(
+            login_timestamp=login_timestamp,
+            logout_timestamp=logout_timestamp,
+            session_duration_seconds=session_duration,
+            has_submitted_form=login_user_id in submitters
         ))
     
-    return analytics
+    analytics = [
+        SimplifiedUserAnalytics(
+            user=user,
+            sessions=sessions_by_user[user.id],
+            total_time_spent_seconds=time_spent_by_user[user.id],
+            total_logins=len(sessions_by_user[user.id]),
+            has_submitted_form=user.id in submitters,
+            activity_sessions=activity_sessions[user.id],
+            activity_time_seconds=activity_time[user.id]
+        )
+        for user in users
+    ]
+    
+    return await simplified_analytics_cache.store_async(cache_key, analytics, response)
+
+@router.get("/sessions", response_model=List[ActivitySessionResponse])
+async def get_activity_sessions(
+    request: Request,
+    response: Response,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Sessions rebuilt from page-visit gaps by the rollup job, filtered by start time.
+    
+    Unlike login-based sessions these don't depend on the client reporting a
+    logout; the newest may still grow until the next refresh.
+    """
+    cached, cache_key = await activity_sessions_cache.lookup_async(request)
+    if cached is not None:
+        return cached
+    
+    query = select(ActivitySession).where(*date_range(ActivitySession.started_at, date_from, date_to))
+    if user_id is not None:
+        query = query.where(ActivitySession.user_id == user_id)
+    sessions = await paginate_async(db, query, ActivitySession.id, page, response)
+    return await activity_sessions_cache.store_async(cache_key, sessions, response)
+
+@router.get("/session-statistics", response_model=SessionStatisticsResponse)
+async def get_session_statistics(
+    request: Request,
+    response: Response,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    top_users: int = Query(20, ge=0, le=1000),
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Session length percentiles and histogram, per-page dwell times and the most engaged users"""
+    cached, cache_key = await session_statistics_cache.lookup_async(request)
+    if cached is not None:
+        return cached
+    
+    sessions = await db.run_sync(session_stats.load_sessions, date_from, date_to, user_id)
+    visits = await db.run_sync(session_stats.load_page_visits, date_from, date_to, user_id)
+    # The array math runs off the event loop
+    statistics = await run_in_threadpool(session_stats.session_statistics, sessions, visits, top_users)
+    return await session_statistics_cache.store_async(cache_key, statistics, response)
+
+def engagement_range(date_from: Optional[date], date_to: Optional[date]):
+    """Default to the last 30 days and reject inverted ranges"""
+    date_to = date_to or datetime.now(timezone.utc).date()
+    date_from = date_from or date_to - timedelta(days=29)
+    if date_from > date_to:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="date_from must not be after date_to"
+        )
+    return date_from, date_to
+
+@router.get("/daily-engagement", response_model=List[DailyUserEngagementResponse])
+async def get_daily_engagement(
+    request: Request,
+    response: Response,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    user_id: Optional[int] = None,
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Per-user daily engagement, served from the rollup tables where they cover the range"""
+    date_from, date_to = engagement_range(date_from, date_to)
+    cached, cache_key = await daily_engagement_cache.lookup_async(request)
+    if cached is not None:
+        return cached
+    
+    rows = await db.run_sync(rollups.user_engagement, date_from, date_to, user_id=user_id)
+    return await daily_engagement_cache.store_async(cache_key, rows, response)
+
+@router.get("/page-engagement", response_model=List[DailyPageEngagementResponse])
+async def get_page_engagement(
+    request: Request,
+    response: Response,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    page_name: Optional[str] = None,
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Per-page daily engagement, served from the rollup tables where they cover the range"""
+    date_from, date_to = engagement_range(date_from, date_to)
+    cached, cache_key = await page_engagement_cache.lookup_async(request)
+    if cached is not None:
+        return cached
+    
+    rows = await db.run_sync(rollups.page_engagement, date_from, date_to, page_name=page_name)
+    return await page_engagement_cache.store_async(cache_key, rows, response)
 
 @router.get("/my-analytics")
-def get_my_analytics(
+async def get_my_analytics(
     current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    db: AsyncSession = Depends(get_async_db)
 ):
-    login_events = db.query(LoginEvent).filter(
+    login_events = (await db.scalars(select(LoginEvent).where(
         LoginEvent.user_id == current_user.id
-    ).all()
+    ))).all()
     
-    logout_events = db.query(LogoutEvent).filter(
+    logout_events = (await db.scalars(select(LogoutEvent).where(
         LogoutEvent.user_id == current_user.id
-    ).all()
+    ))).all()
     
-    page_visits = db.query(PageVisit).filter(
+    page_visits = (await db.scalars(select(PageVisit).where(
         PageVisit.user_id == current_user.id
-    ).all()
+    ))).all()
     
-    form_submission = db.query(FormSubmission).filter(
+    form_submission = await db.scalar(select(FormSubmission).where(
         FormSubmission.user_id == current_user.id
-    ).first()
+    ))
     
     return {
         "user": current_user,
@@ -296,4 +651,41 @@ def get_my_analytics(
         "logout_events": logout_events,
         "page_visits": page_visits,
         "form_submission": form_submission
-    } 
\ No newline at end of file
+    }
+
+@router.get("/live")
+async def live_updates(
+    request: Request,
+    last_event_id: Optional[str] = Header(None),
+    since: Optional[str] = Query(None, description="Event id to resume after when no Last-Event-ID header is sent"),
+    current_user: Principal = Depends(get_current_admin_user)
+):
+    """Server-Sent Events stream of logins, logouts, page visits and submissions as they happen.
+    
+    Dashboards load the full endpoints once and apply these deltas instead of
+    polling. Each event's id can be sent back as Last-Event-ID (EventSource
+    does this on reconnect) to resume; a ``reset`` event means too much was
+    missed and the dashboard should reload. Authenticates with the usual
+    bearer header, so browsers need a fetch-based EventSource.
+    """
+    if redis_conn.stream_redis_client is None or not settings.LIVE_EVENTS_ENABLED:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Live updates are unavailable"
+        )
+    
+    resume_from = last_event_id or since
+    if resume_from is not None and not live_events.EVENT_ID.match(resume_from):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid event id"
+        )
+    
+    logger.info("Live updates connected", admin_id=current_user.id, resume_from=resume_from)
+    return StreamingResponse(
+        live_events.stream_events(resume_from, request.is_disconnected),
+        media_type="text/event-stream",
+        # X-Accel-Buffering stops nginx holding events back in its buffer
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
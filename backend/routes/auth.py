@@ -1,26 +1,32 @@
 from fastapi import APIRouter, Depends, HTTPException, status
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
-from datetime import timedelta
-from database import get_db
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime, timedelta, timezone
+from database import get_async_db
 from models import User, LoginEvent
 from schemas import LoginRequest, Token, UserCreate, UserResponse
-from auth import verify_password, get_password_hash, create_access_token, get_current_user
+from auth import create_access_token
+from dependencies import get_current_user
+from password_hashing import hash_password_async, verify_and_update_async
 from config import settings
+from ingestion import enqueue_event, login_event_ids
+import live_events
+import response_cache
 
 router = APIRouter(prefix="/auth", tags=["authentication"])
 
 @router.post("/signup", response_model=UserResponse)
-def signup(user: UserCreate, db: Session = Depends(get_db)):
+async def signup(user: UserCreate, db: AsyncSession = Depends(get_async_db)):
     # Check if user already exists
-    db_user = db.query(User).filter(User.email == user.email).first()
+    db_user = await db.scalar(select(User).where(User.email == user.email))
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Email already registered"
         )
     
-    db_user = db.query(User).filter(User.username == user.username).first()
+    db_user = await db.scalar(select(User).where(User.username == user.username))
     if db_user:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
@@ -28,7 +34,7 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = await hash_password_async(user.password)
     db_user = User(
         email=user.email,
         username=user.username,
@@ -36,26 +42,45 @@ def signup(user: UserCreate, db: Session = Depends(get_db)):
         role=user.role
     )
     db.add(db_user)
-    db.commit()
-    db.refresh(db_user)
+    await db.commit()
+    await db.refresh(db_user)
+    await response_cache.invalidate_async(response_cache.USERS)
     
     return db_user
 
 @router.post("/login", response_model=Token)
-def login(login_data: LoginRequest, db: Session = Depends(get_db)):
+async def login(login_data: LoginRequest, db: AsyncSession = Depends(get_async_db)):
     # Find user by email
-    user = db.query(User).filter(User.email == login_data.email).first()
-    if not user or not verify_password(login_data.password, user.hashed_password):
+    user = await db.scalar(select(User).where(User.email == login_data.email))
+    valid, new_hash = await verify_and_update_async(login_data.password, user.hashed_password) if user else (False, None)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
-    # Create login event
-    login_event = LoginEvent(user_id=user.id)
-    db.add(login_event)
-    db.commit()
+    # Upgrade hashes made with a different BCRYPT_ROUNDS while we have the plaintext
+    if new_hash:
+        user.hashed_password = new_hash
+        await db.commit()
+    
+    # Create login event, through the ingestion queue when it is enabled
+    queued = False
+    event = {"user_id": user.id, "login_timestamp": datetime.now(timezone.utc)}
+    if settings.INGESTION_MODE == "queue":
+        event_id = await login_event_ids.allocate()
+        if event_id is not None:
+            event["id"] = event_id
+        queued = await enqueue_event("login", event)
+    
+    if not queued:
+        login_event = LoginEvent(user_id=user.id)
+        db.add(login_event)
+        await db.commit()
+        await response_cache.invalidate_async(response_cache.ANALYTICS)
+        event["id"] = login_event.id
+    await live_events.publish("login", event)
     
     # Create access token
     access_token_expires = timedelta(minutes=settings.ACCESS_TOKEN_EXPIRE_MINUTES)
@@ -66,5 +91,5 @@ def login(login_data: LoginRequest, db: Session = Depends(get_db)):
     return {"access_token": access_token, "token_type": "bearer"}
 
 @router.get("/me", response_model=UserResponse)
-def get_current_user_info(current_user: User = Depends(get_current_user)):
+async def get_current_user_info(current_user: User = Depends(get_current_user)):
     return current_user 
\ No newline at end of file
@@ -0,0 +1,194 @@
+import csv
+import io
+import json
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Dict, Iterable, List, Literal, Optional, Sequence
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query, status
+from fastapi.responses import StreamingResponse
+from sqlalchemy import func, select
+from database import engine, async_engine
+from models import PageVisit, LoginEvent, LogoutEvent, FormSubmission
+from dependencies import get_current_admin_user, Principal
+from config import settings
+from pagination import date_range
+from routes.analytics import session_duration_from_values
+import snapshots
+import structlog
+
+logger = structlog.get_logger()
+
+router = APIRouter(prefix="/exports", tags=["exports"])
+
+ExportFormat = Literal["ndjson", "csv"]
+
+MEDIA_TYPES = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+def _encode(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+def _csv_value(value):
+    return value.isoformat() if isinstance(value, datetime) else value
+
+def _ndjson(records: List[Dict]) -> str:
+    return "".join(json.dumps(record, default=_encode) + "\n" for record in records)
+
+def _csv(rows: Iterable[Sequence]) -> str:
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(rows)
+    return buffer.getvalue()
+
+async def _stream_rows(
+    statement,
+    columns: Sequence[str],
+    export_format: str,
+    to_record: Optional[Callable] = None,
+) -> AsyncIterator[str]:
+    """Encode the rows of ``statement`` one server-side cursor batch at a time.
+    
+    Uses its own connection for the whole export, so memory stays bounded by
+    EXPORT_BATCH_SIZE however many rows match.
+    """
+    if export_format == "csv":
+        # Headers go out before the query runs
+        yield _csv([columns])
+    
+    rows = 0
+    async with async_engine.connect() as conn:
+        result = await conn.stream(statement.execution_options(yield_per=settings.EXPORT_BATCH_SIZE))
+        async for batch in result.mappings().partitions():
+            records = [to_record(row) for row in batch] if to_record else [dict(row) for row in batch]
+            rows += len(records)
+            if export_format == "ndjson":
+                yield _ndjson(records)
+            else:
+                yield _csv([_csv_value(record[column]) for column in columns] for record in records)
+    logger.info("Export finished", columns=list(columns), rows=rows)
+
+def _export_response(name: str, statement, columns: Sequence[str], export_format: str, to_record=None) -> StreamingResponse:
+    filename = f"{name}-{datetime.now(timezone.utc):%Y%m%dT%H%M%SZ}.{export_format}"
+    return StreamingResponse(
+        _stream_rows(statement, columns, export_format, to_record),
+        media_type=MEDIA_TYPES[export_format],
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+PAGE_VISIT_COLUMNS = ("id", "user_id", "page_name", "entry_time", "exit_time", "duration_seconds")
+
+@router.get("/page-visits")
+async def export_page_visits(
+    export_format: ExportFormat = Query("ndjson", alias="format"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    current_user: Principal = Depends(get_current_admin_user)
+):
+    """Stream raw page visits that started in ``[date_from, date_to)``"""
+    statement = select(*(getattr(PageVisit, column) for column in PAGE_VISIT_COLUMNS)).where(
+        *date_range(PageVisit.entry_time, date_from, date_to)
+    )
+    if user_id is not None:
+        statement = statement.where(PageVisit.user_id == user_id)
+    return _export_response("page-visits", statement.order_by(PageVisit.id), PAGE_VISIT_COLUMNS, export_format)
+
+SESSION_COLUMNS = ("login_event_id", "user_id", "login_timestamp", "logout_timestamp", "session_duration_seconds", "completed")
+
+@router.get("/sessions")
+async def export_sessions(
+    export_format: ExportFormat = Query("ndjson", alias="format"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+    current_user: Principal = Depends(get_current_admin_user)
+):
+    """Stream one row per login in ``[date_from, date_to)`` with its logout and duration.
+    
+    Durations of sessions still open are measured up to the start of the export.
+    """
+    latest_logout = select(
+        LogoutEvent.login_event_id.label("login_event_id"),
+        func.max(LogoutEvent.logout_timestamp).label("logout_timestamp")
+    ).group_by(LogoutEvent.login_event_id).subquery()
+    
+    statement = select(
+        LoginEvent.id.label("login_event_id"),
+        LoginEvent.user_id,
+        LoginEvent.login_timestamp,
+        LoginEvent.session_duration_seconds,
+        latest_logout.c.logout_timestamp
+    ).outerjoin(
+        latest_logout, latest_logout.c.login_event_id == LoginEvent.id
+    ).where(*date_range(LoginEvent.login_timestamp, date_from, date_to))
+    if user_id is not None:
+        statement = statement.where(LoginEvent.user_id == user_id)
+    
+    current_time = datetime.now(timezone.utc)
+    
+    def to_record(row) -> Dict:
+        completed = row["session_duration_seconds"] is not None or row["logout_timestamp"] is not None
+        # SQLite returns naive timestamps
+        now = current_time if row["login_timestamp"].tzinfo else current_time.replace(tzinfo=None)
+        return {
+            "login_event_id": row["login_event_id"],
+            "user_id": row["user_id"],
+            "login_timestamp": row["login_timestamp"],
+            "logout_timestamp": row["logout_timestamp"],
+            "session_duration_seconds": session_duration_from_values(
+                row["login_timestamp"], row["session_duration_seconds"], row["logout_timestamp"], now
+            ),
+            "completed": completed,
+        }
+    
+    return _export_response("sessions", statement.order_by(LoginEvent.id), SESSION_COLUMNS, export_format, to_record)
+
+SUBMISSION_COLUMNS = (
+    "id", "user_id", "rating", "feedback", "suggestions", "selected_options",
+    "contact_name", "contact_email", "contact_phone", "contact_notes", "submitted_at",
+)
+
+@router.get("/submissions")
+async def export_submissions(
+    export_format: ExportFormat = Query("ndjson", alias="format"),
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    current_user: Principal = Depends(get_current_admin_user)
+):
+    """Stream form submissions made in ``[date_from, date_to)``"""
+    statement = select(*(getattr(FormSubmission, column) for column in SUBMISSION_COLUMNS)).where(
+        *date_range(FormSubmission.submitted_at, date_from, date_to)
+    )
+    return _export_response("submissions", statement.order_by(FormSubmission.id), SUBMISSION_COLUMNS, export_format)
+
+# Columnar snapshots (see snapshots.py); large, so written in the background
+
+@router.post("/snapshots", status_code=status.HTTP_202_ACCEPTED)
+async def start_snapshot(
+    background_tasks: BackgroundTasks,
+    snapshot_format: Optional[Literal["parquet", "arrow"]] = Query(None, alias="format"),
+    current_user: Principal = Depends(get_current_admin_user)
+):
+    """Append rows added since the last snapshot to the datasets under SNAPSHOT_DIR"""
+    try:
+        lock = snapshots.acquire_lock(settings.SNAPSHOT_DIR)
+    except snapshots.SnapshotInProgress:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A snapshot is already running"
+        )
+    
+    background_tasks.add_task(snapshots.run_snapshot, engine, file_format=snapshot_format, lock=lock)
+    logger.info("Snapshot started", admin_id=current_user.id, format=snapshot_format or settings.SNAPSHOT_FORMAT)
+    return {"status": "started"}
+
+@router.get("/snapshots")
+async def get_snapshot_status(current_user: Principal = Depends(get_current_admin_user)):
+    """The last exported row id per table"""
+    return {
+        "running": snapshots.snapshot_running(settings.SNAPSHOT_DIR),
+        "format": settings.SNAPSHOT_FORMAT,
+        "watermarks": snapshots.read_watermarks(settings.SNAPSHOT_DIR),
+    }
@@ -1,23 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, status
-from sqlalchemy.orm import Session
-from typing import List
-from database import get_db
-from models import FormSubmission, User, PersonalizedPresentation
-from schemas import FormSubmissionCreate, FormSubmissionResponse, FormSubmissionWithUser, PersonalizedPresentationCreate, PersonalizedPresentationResponse, PersonalizedPresentationUpdate, PersonalizedPresentationWithUser
-from dependencies import get_current_user, get_current_admin_user
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, Response, status
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import contains_eager
+from sqlalchemy.orm.exc import StaleDataError
+from typing import List, Optional
+from datetime import datetime
+from database import get_async_db
+from models import FormSubmission, User, PersonalizedPresentation, PresentationTemplate
+from schemas import FormSubmissionCreate, FormSubmissionResponse, FormSubmissionWithUser, PersonalizedPresentationCreate, PersonalizedPresentationResponse, PersonalizedPresentationUpdate, PersonalizedPresentationWithUser, SlidePatch, SlidePatchResponse
+from schemas import PresentationTemplateCreate, PresentationTemplateResponse, PresentationTemplateUpdate, TemplateAssignment, TemplateAssignmentResponse
+from dependencies import get_current_admin_user, get_current_principal, Principal
+from pagination import PageParams, paginate_async, date_range
+import live_events
+import presentation_cache
+import presentation_slides
+import response_cache
+from response_cache import CachedEndpoint
+import structlog
+
+logger = structlog.get_logger()
 
 router = APIRouter(prefix="/forms", tags=["forms"])
 
+submissions_cache = CachedEndpoint(
+    "submissions", List[FormSubmissionWithUser], (response_cache.FORMS, response_cache.USERS)
+)
+presentations_cache = CachedEndpoint(
+    "personalized-presentations", List[PersonalizedPresentationWithUser], (response_cache.PRESENTATIONS, response_cache.USERS)
+)
+
 @router.post("/submit", response_model=FormSubmissionResponse)
-def submit_form(
+async def submit_form(
     form_data: FormSubmissionCreate,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Check if user already has a submission
-    existing_submission = db.query(FormSubmission).filter(
+    existing_submission = await db.scalar(select(FormSubmission).where(
         FormSubmission.user_id == current_user.id
-    ).first()
+    ))
     
     if existing_submission:
         raise HTTPException(
@@ -31,27 +53,52 @@ def submit_form(
         **form_data.dict()
     )
     db.add(submission)
-    db.commit()
-    db.refresh(submission)
+    await db.commit()
+    await db.refresh(submission)
+    await response_cache.invalidate_async(response_cache.FORMS)
+    await live_events.publish("form_submission", {
+        "id": submission.id,
+        "user_id": submission.user_id,
+        "rating": submission.rating,
+        "submitted_at": submission.submitted_at,
+    })
     
     return submission
 
 @router.get("/submissions", response_model=List[FormSubmissionWithUser])
-def get_all_submissions(
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+async def get_all_submissions(
+    request: Request,
+    response: Response,
+    user_id: Optional[int] = None,
+    role: Optional[str] = None,
+    submitted_from: Optional[datetime] = None,
+    submitted_to: Optional[datetime] = None,
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    submissions = db.query(FormSubmission).join(User).all()
-    return submissions
+    cached, cache_key = await submissions_cache.lookup_async(request)
+    if cached is not None:
+        return cached
+    
+    query = select(FormSubmission).join(User).options(contains_eager(FormSubmission.user)).where(
+        *date_range(FormSubmission.submitted_at, submitted_from, submitted_to)
+    )
+    if user_id is not None:
+        query = query.where(FormSubmission.user_id == user_id)
+    if role is not None:
+        query = query.where(User.role == role)
+    submissions = await paginate_async(db, query, FormSubmission.id, page, response)
+    return await submissions_cache.store_async(cache_key, submissions, response)
 
 @router.get("/my-submission", response_model=FormSubmissionResponse)
-def get_my_submission(
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+async def get_my_submission(
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    submission = db.query(FormSubmission).filter(
+    submission = await db.scalar(select(FormSubmission).where(
         FormSubmission.user_id == current_user.id
-    ).first()
+    ))
     
     if not submission:
         raise HTTPException(
@@ -61,15 +108,57 @@ def get_my_submission(
     
     return submission
 
+def presentation_conflict(current_version: Optional[int] = None) -> HTTPException:
+    detail = "Presentation was changed by another edit"
+    if current_version is not None:
+        detail += f" (now at version {current_version})"
+    return HTTPException(status_code=status.HTTP_409_CONFLICT, detail=detail)
+
+ACTIVE_PRESENTATION_INDEX = "uq_personalized_presentations_active_user"
+
+def violates_active_presentation_index(error: IntegrityError) -> bool:
+    # asyncpg's exception is the adapted error's cause and names the index;
+    # SQLite only names the columns
+    cause = error.orig.__cause__ if error.orig is not None else None
+    if getattr(cause, "constraint_name", None) is not None:
+        return cause.constraint_name == ACTIVE_PRESENTATION_INDEX
+    return str(error.orig) == "UNIQUE constraint failed: personalized_presentations.user_id"
+
+async def commit_presentation(db: AsyncSession):
+    """Commit, reporting a clash on the one-active-presentation-per-user index
+    as a 400 and a concurrent edit (see the version column) as a 409"""
+    try:
+        await db.commit()
+    except IntegrityError as e:
+        await db.rollback()
+        if not violates_active_presentation_index(e):
+            raise
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User already has an active personalized presentation"
+        )
+    except StaleDataError:
+        await db.rollback()
+        raise presentation_conflict()
+
+def template_version(presentation: PersonalizedPresentation) -> Optional[int]:
+    return presentation.template.version if presentation.template is not None else None
+
+def presentation_deck(presentation: PersonalizedPresentation) -> List[dict]:
+    """The slides a presentation shows, merging template-based ones"""
+    if presentation.template is not None:
+        return presentation_slides.merge_slides(presentation.template.slides, presentation.slide_overrides)
+    return presentation.slides or []
+
 # Personalized Presentation endpoints
 @router.post("/personalized-presentations", response_model=PersonalizedPresentationResponse)
-def create_personalized_presentation(
+async def create_personalized_presentation(
     presentation_data: PersonalizedPresentationCreate,
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Check if user exists
-    target_user = db.query(User).filter(User.id == presentation_data.user_id).first()
+    target_user = await db.get(User, presentation_data.user_id)
     if not target_user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
@@ -77,10 +166,10 @@ def create_personalized_presentation(
         )
     
     # Check if presentation already exists for this user
-    existing_presentation = db.query(PersonalizedPresentation).filter(
+    existing_presentation = await db.scalar(select(PersonalizedPresentation).where(
         PersonalizedPresentation.user_id == presentation_data.user_id,
-        PersonalizedPresentation.is_active == True
-    ).first()
+        PersonalizedPresentation.is_active  # Matches the partial unique index predicate
+    ).limit(1))
     
     if existing_presentation:
         raise HTTPException(
@@ -88,35 +177,64 @@ def create_personalized_presentation(
             detail="User already has an active personalized presentation"
         )
     
+    template = None
+    if presentation_data.template_id is not None:
+        template = await db.get(PresentationTemplate, presentation_data.template_id)
+        if not template:
+            raise HTTPException(
+                status_code=status.HTTP_404_NOT_FOUND,
+                detail="Template not found"
+            )
+    
     # Create new personalized presentation
     # Convert SlideContent objects to dictionaries for JSON storage
-    slides_dict = [slide.model_dump() for slide in presentation_data.slides]
+    slides_dict = [slide.model_dump() for slide in presentation_data.slides] if presentation_data.slides is not None else None
     presentation = PersonalizedPresentation(
         user_id=presentation_data.user_id,
         title=presentation_data.title,
         subtitle=presentation_data.subtitle,
-        slides=slides_dict,
         is_active=presentation_data.is_active
     )
+    if template is not None:
+        presentation.template = template
+        presentation.slide_overrides = presentation_slides.diff_slides(template.slides, slides_dict) if slides_dict is not None else None
+    else:
+        presentation.slides = slides_dict
     db.add(presentation)
-    db.commit()
-    db.refresh(presentation)
+    await commit_presentation(db)
+    await db.refresh(presentation)
+    await response_cache.invalidate_async(response_cache.PRESENTATIONS)
     
     return presentation
 
 @router.get("/personalized-presentations", response_model=List[PersonalizedPresentationWithUser])
-def get_all_personalized_presentations(
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+async def get_all_personalized_presentations(
+    request: Request,
+    response: Response,
+    user_id: Optional[int] = None,
+    is_active: Optional[bool] = None,
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    presentations = db.query(PersonalizedPresentation).join(User).all()
-    return presentations
+    cached, cache_key = await presentations_cache.lookup_async(request)
+    if cached is not None:
+        return cached
+    
+    query = select(PersonalizedPresentation).join(User).options(contains_eager(PersonalizedPresentation.user))
+    if user_id is not None:
+        query = query.where(PersonalizedPresentation.user_id == user_id)
+    if is_active is not None:
+        query = query.where(PersonalizedPresentation.is_active == is_active)
+    presentations = await paginate_async(db, query, PersonalizedPresentation.id, page, response)
+    return await presentations_cache.store_async(cache_key, presentations, response)
 
 @router.get("/personalized-presentations/{user_id}", response_model=PersonalizedPresentationResponse)
-def get_user_personalized_presentation(
+async def get_user_personalized_presentation(
     user_id: int,
-    current_user: User = Depends(get_current_user),
-    db: Session = Depends(get_db)
+    if_none_match: Optional[str] = Header(None),
+    current_user: Principal = Depends(get_current_principal),
+    db: AsyncSession = Depends(get_async_db)
 ):
     # Check if user is requesting their own presentation or is admin
     if current_user.role != "admin" and current_user.id != user_id:
@@ -125,29 +243,43 @@ def get_user_personalized_presentation(
             detail="Not authorized to access this presentation"
         )
     
-    presentation = db.query(PersonalizedPresentation).filter(
+    # Only the versions are read until the cache misses; slides can be large
+    version = (await db.execute(select(
+        PersonalizedPresentation.id,
+        PersonalizedPresentation.version,
+        PresentationTemplate.version.label("template_version")
+    ).outerjoin(PresentationTemplate, PresentationTemplate.id == PersonalizedPresentation.template_id).where(
         PersonalizedPresentation.user_id == user_id,
-        PersonalizedPresentation.is_active == True
-    ).first()
+        PersonalizedPresentation.is_active  # Matches the partial unique index predicate
+    ).limit(1))).first()
     
-    if not presentation:
+    if not version:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND,
             detail="No personalized presentation found for this user"
         )
     
-    return presentation
+    rendered = await presentation_cache.get(version.id, version.version, version.template_version)
+    if rendered is None:
+        # Template-based decks are merged here, once per version
+        presentation = await db.get(PersonalizedPresentation, version.id)
+        rendered = presentation_cache.render(presentation)
+        await presentation_cache.store(version.id, presentation.version, template_version(presentation), rendered)
+    
+    # Clients revalidate on every view and skip the download when unchanged
+    headers = {"ETag": rendered.etag, "Cache-Control": "private, no-cache"}
+    if presentation_cache.etag_matches(if_none_match, rendered.etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=rendered.body, media_type="application/json", headers=headers)
 
 @router.put("/personalized-presentations/{presentation_id}", response_model=PersonalizedPresentationResponse)
-def update_personalized_presentation(
+async def update_personalized_presentation(
     presentation_id: int,
     presentation_data: PersonalizedPresentationUpdate,
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    presentation = db.query(PersonalizedPresentation).filter(
-        PersonalizedPresentation.id == presentation_id
-    ).first()
+    presentation = await db.get(PersonalizedPresentation, presentation_id)
     
     if not presentation:
         raise HTTPException(
@@ -155,6 +287,10 @@ def update_personalized_presentation(
             detail="Presentation not found"
         )
     
+    previous_version = presentation.version
+    if presentation_data.version is not None and presentation_data.version != previous_version:
+        raise presentation_conflict(previous_version)
+    
     # Update fields if provided
     if presentation_data.title is not None:
         presentation.title = presentation_data.title
@@ -163,24 +299,98 @@ def update_personalized_presentation(
     if presentation_data.slides is not None:
         # Convert SlideContent objects to dictionaries for JSON storage
         slides_dict = [slide.model_dump() for slide in presentation_data.slides]
-        presentation.slides = slides_dict
+        if presentation.template is not None:
+            presentation.slide_overrides = presentation_slides.diff_slides(presentation.template.slides, slides_dict)
+        else:
+            presentation.slides = slides_dict
     if presentation_data.is_active is not None:
         presentation.is_active = presentation_data.is_active
     
-    db.commit()
-    db.refresh(presentation)
+    await commit_presentation(db)
+    await response_cache.invalidate_async(response_cache.PRESENTATIONS)
+    await presentation_cache.invalidate(presentation_id, previous_version, template_version(presentation))
     
     return presentation
 
+@router.patch("/personalized-presentations/{presentation_id}/slides/{slide_id}", response_model=SlidePatchResponse)
+async def patch_presentation_slide(
+    presentation_id: int,
+    slide_id: int,
+    patch: SlidePatch,
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Update, insert or move one slide without resending the deck.
+    
+    Given fields are merged into slide ``slide_id``, which is appended (or
+    inserted at ``position``) if the deck has no such slide. Fails with 409
+    unless ``version`` is the presentation's current version.
+    """
+    fields = patch.model_dump(include=set(presentation_slides.SLIDE_FIELDS), exclude_none=True)
+    
+    located = None
+    if db.get_bind().dialect.name == "postgresql":
+        # Read the slide's index, not the deck; the UPDATE edits the JSONB in place
+        located = (await db.execute(presentation_slides.locate_slide(presentation_id, slide_id))).first()
+    
+    if located is not None and located.template_id is None:
+        presentation = None
+        current_version, slide_index, slide_count = located.version, located.slide_index, located.slide_count
+    else:
+        # Elsewhere, and for the small override documents of template-based decks, edit in Python
+        presentation = await db.get(PersonalizedPresentation, presentation_id)
+        current_version = presentation.version if presentation else None
+        deck = presentation_deck(presentation) if presentation else []
+        slide_index = next((i for i, slide in enumerate(deck) if slide.get("id") == slide_id), None)
+    
+    if current_version is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Presentation not found"
+        )
+    if patch.version != current_version:
+        raise presentation_conflict(current_version)
+    if slide_index is None and len(fields) < len(presentation_slides.SLIDE_FIELDS):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A new slide needs a title, subtitle and content"
+        )
+    
+    if presentation is None:
+        values = {"slides": presentation_slides.slide_patch_expression(slide_index, slide_count, slide_id, fields, patch.position)}
+    elif presentation.template is not None:
+        deck = presentation_slides.apply_slide_patch(deck, slide_id, fields, patch.position)
+        values = {"slide_overrides": presentation_slides.diff_slides(presentation.template.slides, deck)}
+    else:
+        values = {"slides": presentation_slides.apply_slide_patch(deck, slide_id, fields, patch.position)}
+    
+    # The version check makes the edit atomic against the index read above
+    updated = (await db.execute(
+        update(PersonalizedPresentation).where(
+            PersonalizedPresentation.id == presentation_id,
+            PersonalizedPresentation.version == patch.version
+        ).values(
+            version=PersonalizedPresentation.version + 1,
+            **values
+        ).returning(PersonalizedPresentation.id, PersonalizedPresentation.version, PersonalizedPresentation.updated_at),
+        execution_options={"synchronize_session": False}
+    )).first()
+    if updated is None:
+        await db.rollback()
+        raise presentation_conflict()
+    await db.commit()
+    await response_cache.invalidate_async(response_cache.PRESENTATIONS)
+    await presentation_cache.invalidate(presentation_id, patch.version, template_version(presentation) if presentation else None)
+    
+    return updated
+
 @router.delete("/personalized-presentations/{presentation_id}")
-def delete_personalized_presentation(
+async def delete_personalized_presentation(
     presentation_id: int,
-    current_user: User = Depends(get_current_admin_user),
-    db: Session = Depends(get_db)
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
 ):
-    presentation = db.query(PersonalizedPresentation).filter(
-        PersonalizedPresentation.id == presentation_id
-    ).first()
+    presentation = await db.get(PersonalizedPresentation, presentation_id)
     
     if not presentation:
         raise HTTPException(
@@ -188,7 +398,170 @@ def delete_personalized_presentation(
             detail="Presentation not found"
         )
     
-    db.delete(presentation)
-    db.commit()
+    previous_version, previous_template_version = presentation.version, template_version(presentation)
+    await db.delete(presentation)
+    await commit_presentation(db)
+    await response_cache.invalidate_async(response_cache.PRESENTATIONS)
+    await presentation_cache.invalidate(presentation_id, previous_version, previous_template_version)
     
-    return {"message": "Presentation deleted successfully"} 
\ No newline at end of file
+    return {"message": "Presentation deleted successfully"}
+
+# Presentation templates: one shared deck, per-user differences in slide_overrides
+
+async def commit_template(db: AsyncSession):
+    """Commit, reporting a duplicate name as a 400 and a concurrent edit as a 409"""
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A template with this name already exists"
+        )
+    except StaleDataError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Template was changed by another edit"
+        )
+
+async def get_template_or_404(db: AsyncSession, template_id: int) -> PresentationTemplate:
+    template = await db.get(PresentationTemplate, template_id)
+    if not template:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Template not found"
+        )
+    return template
+
+@router.post("/presentation-templates", response_model=PresentationTemplateResponse)
+async def create_presentation_template(
+    template_data: PresentationTemplateCreate,
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    template = PresentationTemplate(
+        name=template_data.name,
+        title=template_data.title,
+        subtitle=template_data.subtitle,
+        slides=[slide.model_dump() for slide in template_data.slides]
+    )
+    db.add(template)
+    await commit_template(db)
+    
+    return template
+
+@router.get("/presentation-templates", response_model=List[PresentationTemplateResponse])
+async def get_presentation_templates(
+    response: Response,
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await paginate_async(db, select(PresentationTemplate), PresentationTemplate.id, page, response)
+
+@router.get("/presentation-templates/{template_id}", response_model=PresentationTemplateResponse)
+async def get_presentation_template(
+    template_id: int,
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await get_template_or_404(db, template_id)
+
+@router.put("/presentation-templates/{template_id}", response_model=PresentationTemplateResponse)
+async def update_presentation_template(
+    template_id: int,
+    template_data: PresentationTemplateUpdate,
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Edit the base deck; every presentation built on it picks up the change"""
+    template = await get_template_or_404(db, template_id)
+    if template_data.version is not None and template_data.version != template.version:
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail=f"Template was changed by another edit (now at version {template.version})"
+        )
+    
+    if template_data.name is not None:
+        template.name = template_data.name
+    if template_data.title is not None:
+        template.title = template_data.title
+    if template_data.subtitle is not None:
+        template.subtitle = template_data.subtitle
+    if template_data.slides is not None:
+        template.slides = [slide.model_dump() for slide in template_data.slides]
+    
+    await commit_template(db)
+    # The new template version is part of every merged deck's cache key
+    await response_cache.invalidate_async(response_cache.PRESENTATIONS)
+    
+    return template
+
+@router.post("/presentation-templates/{template_id}/assign", response_model=TemplateAssignmentResponse)
+async def assign_presentation_template(
+    template_id: int,
+    assignment: TemplateAssignment,
+    current_user: Principal = Depends(get_current_admin_user),
+    db: AsyncSession = Depends(get_async_db)
+):
+    """Give many users a presentation built on this template in one call.
+    
+    Users without an active presentation get one with no overrides, in a
+    single multi-row INSERT. ``existing`` decides what happens to the others:
+    skip them, replace their deck with the bare template, or rebase it,
+    keeping their slides as overrides on the template.
+    """
+    template = await get_template_or_404(db, template_id)
+    user_ids = sorted(set(assignment.user_ids))
+    
+    known = set((await db.scalars(select(User.id).where(User.id.in_(user_ids)))).all())
+    active = dict((await db.execute(select(PersonalizedPresentation.user_id, PersonalizedPresentation.id).where(
+        PersonalizedPresentation.user_id.in_(user_ids),
+        PersonalizedPresentation.is_active
+    ))).all())
+    new_users = [user_id for user_id in user_ids if user_id in known and user_id not in active]
+    existing_users = [user_id for user_id in user_ids if user_id in active]
+    
+    if new_users:
+        await db.execute(insert(PersonalizedPresentation), [
+            {"user_id": user_id, "template_id": template_id, "is_active": True, "version": 1}
+            for user_id in new_users
+        ])
+    if existing_users and assignment.existing == "replace":
+        await db.execute(
+            update(PersonalizedPresentation).where(
+                PersonalizedPresentation.id.in_([active[user_id] for user_id in existing_users])
+            ).values(
+                template_id=template_id,
+                slides=None,
+                slide_overrides=None,
+                version=PersonalizedPresentation.version + 1
+            ),
+            execution_options={"synchronize_session": False}
+        )
+    elif existing_users and assignment.existing == "rebase":
+        presentations = (await db.scalars(select(PersonalizedPresentation).where(
+            PersonalizedPresentation.id.in_([active[user_id] for user_id in existing_users])
+        ))).all()
+        for presentation in presentations:
+            deck = presentation_deck(presentation)
+            presentation.template = template
+            presentation.slides = None
+            presentation.slide_overrides = presentation_slides.diff_slides(template.slides, deck)
+    
+    # Updated presentations have new versions, so their cached decks no longer match
+    await commit_presentation(db)
+    await response_cache.invalidate_async(response_cache.PRESENTATIONS)
+    
+    updated = existing_users if assignment.existing != "skip" else []
+    logger.info(
+        "Template assigned", template_id=template_id, admin_id=current_user.id,
+        created=len(new_users), updated=len(updated)
+    )
+    return {
+        "created": new_users,
+        "updated": updated,
+        "skipped": existing_users if assignment.existing == "skip" else [],
+        "unknown_users": [user_id for user_id in user_ids if user_id not in known],
+    }
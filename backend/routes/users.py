@@ -1,26 +1,45 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Request, Response, status
 from sqlalchemy.orm import Session
-from typing import List
+from typing import List, Optional
+from datetime import datetime
 from database import get_db
 from models import User
 from schemas import UserCreate, UserResponse
-from dependencies import get_current_admin_user
-from auth import get_password_hash
+from dependencies import get_current_admin_user, invalidate_principal, Principal
+from password_hashing import hash_password
+from pagination import PageParams, paginate, date_range
+import response_cache
+from response_cache import CachedEndpoint
 
 router = APIRouter(prefix="/users", tags=["users"])
 
+users_cache = CachedEndpoint("users", List[UserResponse], (response_cache.USERS,))
+
 @router.get("/", response_model=List[UserResponse])
 def get_all_users(
-    current_user: User = Depends(get_current_admin_user),
+    request: Request,
+    response: Response,
+    role: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    page: PageParams = Depends(),
+    current_user: Principal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
-    users = db.query(User).all()
-    return users
+    cached, cache_key = users_cache.lookup(request)
+    if cached is not None:
+        return cached
+    
+    query = db.query(User).filter(*date_range(User.created_at, created_from, created_to))
+    if role is not None:
+        query = query.filter(User.role == role)
+    users = paginate(query, User.id, page, response)
+    return users_cache.store(cache_key, users, response)
 
 @router.post("/", response_model=UserResponse)
 def create_user(
     user: UserCreate,
-    current_user: User = Depends(get_current_admin_user),
+    current_user: Principal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     # Check if user already exists
@@ -39,7 +58,7 @@ def create_user(
         )
     
     # Create new user
-    hashed_password = get_password_hash(user.password)
+    hashed_password = hash_password(user.password)
     db_user = User(
         email=user.email,
         username=user.username,
@@ -49,13 +68,14 @@ def create_user(
     db.add(db_user)
     db.commit()
     db.refresh(db_user)
+    response_cache.invalidate(response_cache.USERS)
     
     return db_user
 
 @router.delete("/{user_id}")
 def delete_user(
     user_id: int,
-    current_user: User = Depends(get_current_admin_user),
+    current_user: Principal = Depends(get_current_admin_user),
     db: Session = Depends(get_db)
 ):
     # Prevent admin from deleting themselves
@@ -76,5 +96,9 @@ def delete_user(
     # Delete the user
     db.delete(db_user)
     db.commit()
+    invalidate_principal(user_id)
+    response_cache.invalidate(
+        response_cache.USERS, response_cache.ANALYTICS, response_cache.FORMS, response_cache.PRESENTATIONS
+    )
     
     return {"message": "User deleted successfully"} 
\ No newline at end of file
@@ -1,6 +1,7 @@
-from pydantic import BaseModel, EmailStr, model_validator
-from typing import Optional, List, Dict, Any
-from datetime import datetime
+from pydantic import BaseModel, EmailStr, Field, model_validator
+from typing import Optional, List, Dict, Any, Literal
+from datetime import date, datetime
+from presentation_slides import merge_slides
 
 # User schemas
 class UserBase(BaseModel):
@@ -95,6 +96,46 @@ class PageVisitResponse(PageVisitBase):
     class Config:
         from_attributes = True
 
+class PageVisitExitQueued(BaseModel):
+    """Body of a 202 from PUT /page-visit/{id} when the exit went to the ingestion queue"""
+    id: int
+    user_id: int
+    exit_time: datetime
+    duration_seconds: float
+
+class PageVisitEvent(BaseModel):
+    type: Literal["enter", "exit"]
+    # Lets an exit refer to an enter sent in the same batch
+    client_ref: Optional[str] = None
+    page_name: Optional[str] = None
+    entry_time: Optional[datetime] = None
+    visit_id: Optional[int] = None
+    exit_time: Optional[datetime] = None
+    duration_seconds: Optional[float] = None
+    
+    @model_validator(mode='after')
+    def check_event_fields(self):
+        if self.type == "enter" and not self.page_name:
+            raise ValueError("enter events require page_name")
+        if self.type == "exit":
+            if self.exit_time is None or self.duration_seconds is None:
+                raise ValueError("exit events require exit_time and duration_seconds")
+            if self.visit_id is None and self.client_ref is None:
+                raise ValueError("exit events require visit_id or client_ref")
+        return self
+
+class PageVisitBatch(BaseModel):
+    events: List[PageVisitEvent]
+
+class PageVisitEventResult(BaseModel):
+    index: int
+    status: str  # "created", "updated" or "not_found"
+    visit_id: Optional[int] = None
+    client_ref: Optional[str] = None
+
+class PageVisitBatchResponse(BaseModel):
+    results: List[PageVisitEventResult]
+
 # Admin schemas
 class UserAnalytics(BaseModel):
     user: UserResponse
@@ -109,6 +150,73 @@ class SimplifiedUserAnalytics(BaseModel):
     total_time_spent_seconds: float
     total_logins: int
     has_submitted_form: bool
+    # From the precomputed page-visit sessions, so time counts even without a logout
+    activity_sessions: int = 0
+    activity_time_seconds: float = 0.0
+
+class DailyUserEngagementResponse(BaseModel):
+    user_id: int
+    day: date
+    page_visits: int
+    page_time_seconds: float
+    logins: int
+    completed_sessions: int
+    session_time_seconds: float
+
+class DailyPageEngagementResponse(BaseModel):
+    page_name: str
+    day: date
+    visits: int
+    unique_users: int
+    completed_visits: int
+    total_duration_seconds: float
+    average_duration_seconds: Optional[float] = None
+    
+    @model_validator(mode='after')
+    def compute_average(self):
+        if self.average_duration_seconds is None and self.completed_visits:
+            self.average_duration_seconds = self.total_duration_seconds / self.completed_visits
+        return self
+
+class ActivitySessionResponse(BaseModel):
+    id: int
+    user_id: int
+    started_at: datetime
+    ended_at: datetime
+    duration_seconds: float
+    page_visits: int
+    
+    class Config:
+        from_attributes = True
+
+class DistributionStats(BaseModel):
+    count: int
+    mean: Optional[float] = None
+    p50: Optional[float] = None
+    p90: Optional[float] = None
+    p99: Optional[float] = None
+
+class HistogramBucket(BaseModel):
+    lower: float
+    upper: Optional[float] = None  # None for the open-ended last bucket
+    count: int
+
+class PageDwellStats(DistributionStats):
+    page_name: str
+
+class UserSessionStats(BaseModel):
+    user_id: int
+    logins: int
+    completed_sessions: int
+    total_time_seconds: float
+    mean_session_seconds: Optional[float] = None
+
+class SessionStatisticsResponse(BaseModel):
+    sessions: DistributionStats  # Lengths of completed sessions, in seconds
+    open_sessions: int
+    session_histogram: List[HistogramBucket]
+    page_dwell: List[PageDwellStats]
+    top_users: List[UserSessionStats]
 
 class FormSubmissionWithUser(BaseModel):
     id: int
@@ -151,21 +259,94 @@ class PersonalizedPresentationBase(BaseModel):
 
 class PersonalizedPresentationCreate(PersonalizedPresentationBase):
     user_id: int
+    template_id: Optional[int] = None
+    slides: Optional[List[SlideContent]] = None  # Required without a template; with one, stored as overrides
+    
+    @model_validator(mode='after')
+    def require_slides(self):
+        if self.template_id is None and self.slides is None:
+            raise ValueError("slides are required unless template_id is given")
+        return self
 
 class PersonalizedPresentationUpdate(BaseModel):
     title: Optional[str] = None
     subtitle: Optional[str] = None
     slides: Optional[List[SlideContent]] = None
     is_active: Optional[bool] = None
+    version: Optional[int] = None  # When given, the update fails if the presentation has moved on
+
+class PresentationTemplateBase(BaseModel):
+    name: str
+    title: Optional[str] = None
+    subtitle: Optional[str] = None
+    slides: List[SlideContent]
+
+class PresentationTemplateCreate(PresentationTemplateBase):
+    pass
+
+class PresentationTemplateUpdate(BaseModel):
+    name: Optional[str] = None
+    title: Optional[str] = None
+    subtitle: Optional[str] = None
+    slides: Optional[List[SlideContent]] = None
+    version: Optional[int] = None  # When given, the update fails if the template has moved on
+
+class PresentationTemplateResponse(PresentationTemplateBase):
+    id: int
+    version: int
+    created_at: datetime
+    updated_at: datetime
+    
+    class Config:
+        from_attributes = True
+
+class TemplateAssignment(BaseModel):
+    user_ids: List[int] = Field(..., min_length=1, max_length=10000)
+    # Users who already have an active presentation: leave it, replace it with
+    # the bare template, or keep their deck as overrides on the template
+    existing: Literal["skip", "replace", "rebase"] = "skip"
+
+class TemplateAssignmentResponse(BaseModel):
+    created: List[int]
+    updated: List[int]
+    skipped: List[int]
+    unknown_users: List[int]
+
+class SlidePatch(BaseModel):
+    version: int  # Version of the presentation the edit was made against
+    title: Optional[str] = None
+    subtitle: Optional[str] = None
+    content: Optional[Dict[str, Any]] = None
+    position: Optional[int] = Field(None, ge=0)  # Move or insert the slide at this index
+
+class SlidePatchResponse(BaseModel):
+    id: int
+    version: int
+    updated_at: datetime
 
 class PersonalizedPresentationResponse(PersonalizedPresentationBase):
     id: int
     user_id: int
+    template_id: Optional[int] = None
+    version: int
     created_at: datetime
     updated_at: datetime
     
     class Config:
         from_attributes = True
+    
+    @model_validator(mode='before')
+    @classmethod
+    def apply_template(cls, values):
+        # Rows built on a template hold overrides rather than slides
+        template = getattr(values, "template", None)
+        if template is None:
+            return values
+        data = {name: getattr(values, name) for name in cls.model_fields if name != "slides"}
+        data["slides"] = merge_slides(template.slides, values.slide_overrides)
+        data["title"] = values.title if values.title is not None else template.title
+        data["subtitle"] = values.subtitle if values.subtitle is not None else template.subtitle
+        return data
 
 class PersonalizedPresentationWithUser(PersonalizedPresentationResponse):
     user: UserResponse 
\ No newline at end of file
@@ -0,0 +1,214 @@
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence
+import numpy as np
+from sqlalchemy import Float, cast, extract, func, select
+from sqlalchemy.orm import Session
+from models import LoginEvent, LogoutEvent, PageVisit
+from pagination import date_range
+
+# Sessions open longer than this are treated as abandoned, as in session_duration_from_values
+MAX_OPEN_SESSION_SECONDS = 24 * 3600
+
+# Session length histogram edges in seconds; the last bucket is open-ended
+HISTOGRAM_EDGES = (0, 30, 60, 120, 300, 600, 1800, 3600, 7200, 14400, 86400)
+
+PERCENTILES = (50, 90, 99)
+
+@dataclass
+class SessionArrays:
+    """Column arrays of logins; timestamps are epoch seconds, NaN where missing"""
+    user_id: np.ndarray
+    login: np.ndarray
+    stored_duration: np.ndarray
+    logout: np.ndarray
+
+@dataclass
+class PageVisitArrays:
+    """Completed page visits; ``page`` indexes into ``page_names``"""
+    page_names: np.ndarray
+    page: np.ndarray
+    duration: np.ndarray
+
+def _epoch(column):
+    return cast(extract("epoch", column), Float)
+
+def _floats(values: Sequence) -> np.ndarray:
+    return np.array([np.nan if value is None else value for value in values], dtype=np.float64)
+
+def load_sessions(
+    db: Session,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+) -> SessionArrays:
+    """Fetch every login in the range, paired with its latest logout, as arrays"""
+    latest_logout = select(
+        LogoutEvent.login_event_id.label("login_event_id"),
+        func.max(LogoutEvent.logout_timestamp).label("logout_timestamp")
+    ).group_by(LogoutEvent.login_event_id).subquery()
+    
+    statement = select(
+        LoginEvent.user_id,
+        _epoch(LoginEvent.login_timestamp),
+        LoginEvent.session_duration_seconds,
+        _epoch(latest_logout.c.logout_timestamp),
+    ).outerjoin(
+        latest_logout, latest_logout.c.login_event_id == LoginEvent.id
+    ).where(*date_range(LoginEvent.login_timestamp, date_from, date_to))
+    if user_id is not None:
+        statement = statement.where(LoginEvent.user_id == user_id)
+    
+    rows = db.execute(statement).all()
+    user_ids, logins, stored, logouts = zip(*rows) if rows else ((), (), (), ())
+    return SessionArrays(
+        user_id=np.array(user_ids, dtype=np.int64),
+        login=_floats(logins),
+        stored_duration=_floats(stored),
+        logout=_floats(logouts),
+    )
+
+def load_page_visits(
+    db: Session,
+    date_from: Optional[datetime] = None,
+    date_to: Optional[datetime] = None,
+    user_id: Optional[int] = None,
+) -> PageVisitArrays:
+    """Fetch the page and duration of every completed visit in the range"""
+    statement = select(PageVisit.page_name, PageVisit.duration_seconds).where(
+        PageVisit.page_name.isnot(None),
+        PageVisit.duration_seconds.isnot(None),
+        *date_range(PageVisit.entry_time, date_from, date_to)
+    )
+    if user_id is not None:
+        statement = statement.where(PageVisit.user_id == user_id)
+    
+    rows = db.execute(statement).all()
+    names, durations = zip(*rows) if rows else ((), ())
+    page_names, page = np.unique(np.array(names, dtype=object), return_inverse=True)
+    return PageVisitArrays(
+        page_names=page_names,
+        page=page.astype(np.int64),
+        duration=np.array(durations, dtype=np.float64),
+    )
+
+def session_durations(sessions: SessionArrays, now: float) -> tuple:
+    """Vectorised session_duration_from_values: ``(durations, completed mask)``"""
+    has_logout = ~np.isnan(sessions.logout)
+    has_stored = ~np.isnan(sessions.stored_duration)
+    
+    open_duration = now - sessions.login
+    open_duration = np.where(open_duration > MAX_OPEN_SESSION_SECONDS, 0.0, open_duration)
+    durations = np.where(
+        has_logout,
+        sessions.logout - sessions.login,
+        np.where(has_stored, sessions.stored_duration, open_duration),
+    )
+    return np.maximum(durations, 0.0), has_logout | has_stored
+
+def distribution(values: np.ndarray) -> Dict:
+    if values.size == 0:
+        return {"count": 0, "mean": None, **{f"p{p}": None for p in PERCENTILES}}
+    quantiles = np.percentile(values, PERCENTILES)
+    return {
+        "count": int(values.size),
+        "mean": float(values.mean()),
+        **{f"p{p}": float(q) for p, q in zip(PERCENTILES, quantiles)},
+    }
+
+def histogram(values: np.ndarray, edges: Sequence[float] = HISTOGRAM_EDGES) -> List[Dict]:
+    bins = np.append(np.asarray(edges, dtype=np.float64), np.inf)
+    counts, _ = np.histogram(values, bins=bins)
+    return [
+        {"lower": float(lower), "upper": float(upper) if np.isfinite(upper) else None, "count": int(count)}
+        for lower, upper, count in zip(bins[:-1], bins[1:], counts)
+    ]
+
+def grouped_distributions(groups: np.ndarray, values: np.ndarray, group_count: int) -> Dict[str, np.ndarray]:
+    """Count, mean and percentiles of ``values`` per group id, without a Python loop over groups.
+    
+    Orders values by (group, value) and interpolates each group's percentiles
+    between neighbouring ranks, like np.percentile's default method.
+    """
+    # Sorting by value and then stably by group is much faster than lexsort:
+    # NumPy radix-sorts 16-bit keys
+    by_value = np.argsort(values)
+    group_keys = groups[by_value]
+    if group_count <= np.iinfo(np.int16).max:
+        group_keys = group_keys.astype(np.int16)
+    sorted_values = values[by_value[np.argsort(group_keys, kind="stable")]]
+    counts = np.bincount(groups, minlength=group_count)
+    starts = np.concatenate(([0], np.cumsum(counts)[:-1]))
+    nonempty = counts > 0
+    
+    stats = {
+        "count": counts,
+        "mean": np.divide(
+            np.bincount(groups, weights=values, minlength=group_count), counts,
+            out=np.full(group_count, np.nan), where=nonempty,
+        ),
+    }
+    for p in PERCENTILES:
+        position = starts + (np.maximum(counts, 1) - 1) * (p / 100)
+        lower = np.floor(position).astype(np.int64)
+        upper = np.ceil(position).astype(np.int64)
+        if sorted_values.size:
+            lower_values = sorted_values[np.minimum(lower, sorted_values.size - 1)]
+            upper_values = sorted_values[np.minimum(upper, sorted_values.size - 1)]
+            result = lower_values + (upper_values - lower_values) * (position - lower)
+        else:
+            result = np.full(group_count, np.nan)
+        stats[f"p{p}"] = np.where(nonempty, result, np.nan)
+    return stats
+
+def _optional(value: float) -> Optional[float]:
+    return None if np.isnan(value) else float(value)
+
+def session_statistics(
+    sessions: SessionArrays,
+    visits: PageVisitArrays,
+    top_users: int = 20,
+    now: Optional[float] = None,
+) -> Dict:
+    """Session length distribution, per-page dwell times and the most engaged users.
+    
+    Length statistics cover completed sessions only; open sessions are counted
+    separately, and per-user time sums completed sessions like simplified-analytics.
+    """
+    now = datetime.now(timezone.utc).timestamp() if now is None else now
+    durations, completed = session_durations(sessions, now)
+    completed_durations = durations[completed]
+    
+    # User ids are dense enough to index per-user totals directly
+    logins = np.bincount(sessions.user_id)
+    completed_sessions = np.bincount(sessions.user_id, weights=completed, minlength=logins.size)
+    total_time = np.bincount(sessions.user_id, weights=np.where(completed, durations, 0.0), minlength=logins.size)
+    users = np.flatnonzero(logins)
+    ranked = users[np.argsort(-total_time[users], kind="stable")[:top_users]]
+    
+    dwell = grouped_distributions(visits.page, visits.duration, visits.page_names.size)
+    
+    return {
+        "sessions": distribution(completed_durations),
+        "open_sessions": int(completed.size - np.count_nonzero(completed)),
+        "session_histogram": histogram(completed_durations),
+        "page_dwell": [
+            {
+                "page_name": str(visits.page_names[i]),
+                "count": int(dwell["count"][i]),
+                "mean": _optional(dwell["mean"][i]),
+                **{f"p{p}": _optional(dwell[f"p{p}"][i]) for p in PERCENTILES},
+            }
+            for i in range(visits.page_names.size)
+        ],
+        "top_users": [
+            {
+                "user_id": int(i),
+                "logins": int(logins[i]),
+                "completed_sessions": int(completed_sessions[i]),
+                "total_time_seconds": float(total_time[i]),
+                "mean_session_seconds": float(total_time[i] / completed_sessions[i]) if completed_sessions[i] else None,
+            }
+            for i in ranked
+        ],
+    }
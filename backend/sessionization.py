@@ -0,0 +1,143 @@
+from datetime import datetime, timedelta, timezone
+from typing import Optional
+import structlog
+from sqlalchemy import Float, case, cast, delete, extract, func, insert, or_, select
+from sqlalchemy.orm import Session
+from config import settings
+from models import PageVisit, ActivitySession, RollupState
+
+logger = structlog.get_logger()
+
+STATE_NAME = "sessions"
+
+def _epoch(column):
+    return cast(extract("epoch", column), Float)
+
+def _utc(value: datetime) -> datetime:
+    # SQLite hands back naive datetimes
+    return value.replace(tzinfo=timezone.utc) if value.tzinfo is None else value
+
+def _sessions_from_visits(*criteria):
+    """SELECT of one row per session among the page visits matching ``criteria``.
+    
+    A visit starts a new session when it begins more than the inactivity gap
+    after the user's previous visit was last seen (its exit, else its entry).
+    """
+    last_seen = func.coalesce(PageVisit.exit_time, PageVisit.entry_time)
+    visits = select(
+        PageVisit.id,
+        PageVisit.user_id,
+        PageVisit.entry_time,
+        last_seen.label("last_seen"),
+        func.lag(last_seen).over(
+            partition_by=PageVisit.user_id,
+            order_by=(PageVisit.entry_time, PageVisit.id)
+        ).label("previous_seen"),
+    ).where(
+        PageVisit.user_id.isnot(None),
+        PageVisit.entry_time.isnot(None),
+        *criteria
+    ).subquery()
+    
+    starts_session = case(
+        (or_(
+            visits.c.previous_seen.is_(None),
+            _epoch(visits.c.entry_time) - _epoch(visits.c.previous_seen) > settings.SESSION_INACTIVITY_GAP_SECONDS
+        ), 1),
+        else_=0
+    )
+    numbered = select(
+        visits.c.user_id,
+        visits.c.entry_time,
+        visits.c.last_seen,
+        # Running count of session starts numbers each user's sessions
+        func.sum(starts_session).over(
+            partition_by=visits.c.user_id,
+            order_by=(visits.c.entry_time, visits.c.id)
+        ).label("session_number"),
+    ).subquery()
+    
+    started_at = func.min(numbered.c.entry_time)
+    ended_at = func.max(numbered.c.last_seen)
+    duration = _epoch(ended_at) - _epoch(started_at)
+    return select(
+        numbered.c.user_id,
+        started_at,
+        ended_at,
+        case((duration > 0, duration), else_=0.0),
+        func.count(),
+    ).group_by(numbered.c.user_id, numbered.c.session_number)
+
+def sessionize(db: Session, since: Optional[datetime] = None) -> int:
+    """Rebuild the sessions that visits entered at or after ``since`` belong to.
+    
+    Sessions that ended more than the inactivity gap before ``since`` can't
+    be extended and are kept. For each user, visits are re-read from the
+    start of their first session that could be, so sessions spanning the
+    boundary are rebuilt whole. Without ``since`` every session is rebuilt.
+    Returns the number of sessions written; the caller commits.
+    """
+    if since is None:
+        db.execute(delete(ActivitySession))
+        result = db.execute(insert(ActivitySession).from_select(
+            ["user_id", "started_at", "ended_at", "duration_seconds", "page_visits"],
+            _sessions_from_visits()
+        ))
+        return result.rowcount
+    
+    cut = since - timedelta(seconds=settings.SESSION_INACTIVITY_GAP_SECONDS)
+    reopened = select(func.min(ActivitySession.started_at)).where(
+        ActivitySession.user_id == PageVisit.user_id,
+        ActivitySession.ended_at >= cut
+    ).scalar_subquery()
+    # The global lower bound lets the entry_time index narrow the scan
+    earliest = db.scalar(select(func.min(ActivitySession.started_at)).where(ActivitySession.ended_at >= cut))
+    lower = min(since, _utc(earliest)) if earliest is not None else since
+    replaced_up_to = db.scalar(select(func.max(ActivitySession.id)))
+    
+    # Insert first: the per-user bounds read the sessions being replaced
+    result = db.execute(insert(ActivitySession).from_select(
+        ["user_id", "started_at", "ended_at", "duration_seconds", "page_visits"],
+        _sessions_from_visits(
+            PageVisit.entry_time >= lower,
+            # From the earlier of the user's first reopened session and since
+            or_(PageVisit.entry_time >= since, PageVisit.entry_time >= reopened),
+        )
+    ))
+    if replaced_up_to is not None:
+        db.execute(delete(ActivitySession).where(
+            ActivitySession.id <= replaced_up_to,
+            ActivitySession.ended_at >= cut
+        ))
+    return result.rowcount
+
+def refresh_sessions(db: Session) -> int:
+    """Sessionize the visits inserted since the previous run.
+    
+    New visits are found by id, past the high-water mark, so visits written
+    late (queued, batched, or with an early entry time) are never missed.
+    Visits entered in the last SESSION_LOOKBACK_MINUTES are re-read as well,
+    since their exits can still arrive. The first run builds sessions from
+    all history.
+    """
+    state = db.get(RollupState, STATE_NAME)
+    # Read the mark first so visits inserted meanwhile are picked up next time
+    max_visit_id = db.scalar(select(func.max(PageVisit.id))) or 0
+    
+    since = None
+    if state is not None and state.last_page_visit_id:
+        since = datetime.now(timezone.utc) - timedelta(minutes=settings.SESSION_LOOKBACK_MINUTES)
+        earliest_new = db.scalar(select(func.min(PageVisit.entry_time)).where(
+            PageVisit.id > state.last_page_visit_id, PageVisit.id <= max_visit_id
+        ))
+        if earliest_new is not None:
+            since = min(since, _utc(earliest_new))
+    
+    written = sessionize(db, since)
+    state = state or RollupState(name=STATE_NAME)
+    state.last_page_visit_id = max_visit_id
+    state.refreshed_at = datetime.now(timezone.utc)
+    db.merge(state)
+    db.commit()
+    logger.info("Sessions refreshed", since=since, sessions=written)
+    return written
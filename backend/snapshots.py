@@ -0,0 +1,289 @@
+import fcntl
+import json
+import os
+from collections import defaultdict
+from datetime import date, datetime, time, timedelta, timezone
+from typing import Dict, Iterable, List, Optional
+import structlog
+from sqlalchemy import Boolean, DateTime, Float, Integer, func, select
+from sqlalchemy.engine import Engine
+from config import settings
+from models import PageVisit, LoginEvent, LogoutEvent, FormSubmission
+
+logger = structlog.get_logger()
+
+# Exported tables and the timestamp that settles them and picks their day partition
+SNAPSHOT_TABLES = {
+    "page_visits": (PageVisit, PageVisit.entry_time),
+    "login_events": (LoginEvent, LoginEvent.login_timestamp),
+    "logout_events": (LogoutEvent, LogoutEvent.logout_timestamp),
+    "form_submissions": (FormSubmission, FormSubmission.submitted_at),
+}
+
+FORMATS = ("parquet", "arrow")
+
+WATERMARK_FILE = "_watermarks.json"
+LOCK_FILE = ".lock"
+# Files being re-exported; dataset readers skip names starting with "_" or "."
+REEXPORT_PREFIX = "_reexport-"
+
+class SnapshotInProgress(Exception):
+    pass
+
+def _arrow_schema(model):
+    import pyarrow as pa
+    
+    fields = []
+    for column in model.__table__.columns:
+        if isinstance(column.type, DateTime):
+            arrow_type = pa.timestamp("us", tz="UTC")
+        elif isinstance(column.type, Integer):
+            arrow_type = pa.int64()
+        elif isinstance(column.type, Float):
+            arrow_type = pa.float64()
+        elif isinstance(column.type, Boolean):
+            arrow_type = pa.bool_()
+        else:
+            arrow_type = pa.string()
+        fields.append(pa.field(column.name, arrow_type))
+    return pa.schema(fields)
+
+def read_watermarks(directory: str) -> Dict[str, int]:
+    """The last exported id of each table"""
+    try:
+        with open(os.path.join(directory, WATERMARK_FILE)) as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+
+def _write_watermarks(directory: str, watermarks: Dict[str, int]):
+    path = os.path.join(directory, WATERMARK_FILE)
+    with open(path + ".tmp", "w") as f:
+        json.dump(watermarks, f, indent=2, sort_keys=True)
+    os.replace(path + ".tmp", path)
+
+def acquire_lock(directory: str):
+    """Take the snapshot lock for ``directory`` or raise SnapshotInProgress.
+    
+    Shared by the CLI and every API worker; pass the handle to release_lock().
+    The holder's pid goes in the lock file for snapshot_running().
+    """
+    os.makedirs(directory, exist_ok=True)
+    # Not "w": that would truncate the holder's pid before the lock is ours
+    handle = open(os.path.join(directory, LOCK_FILE), "a+")
+    try:
+        fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        handle.close()
+        raise SnapshotInProgress(directory)
+    handle.truncate(0)
+    handle.write(str(os.getpid()))
+    handle.flush()
+    return handle
+
+def release_lock(handle):
+    handle.truncate(0)
+    fcntl.flock(handle, fcntl.LOCK_UN)
+    handle.close()
+
+def snapshot_running(directory: str) -> bool:
+    """Whether a snapshot holds the lock, without taking it"""
+    try:
+        with open(os.path.join(directory, LOCK_FILE)) as f:
+            pid = f.read().strip()
+    except FileNotFoundError:
+        return False
+    if not pid:
+        return False
+    try:
+        os.kill(int(pid), 0)
+    except ProcessLookupError:
+        # Left behind by a run that was killed
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _write_file(table, path: str, file_format: str):
+    import pyarrow.feather as feather
+    import pyarrow.parquet as parquet
+    
+    # Readers never see a half-written file
+    if file_format == "parquet":
+        parquet.write_table(table, path + ".tmp", compression="zstd")
+    else:
+        feather.write_feather(table, path + ".tmp", compression="zstd")
+    os.replace(path + ".tmp", path)
+
+def _remove_partial_run(table_dir: str, prefix: str):
+    # Files from an interrupted run that started at the same watermark
+    if not os.path.isdir(table_dir):
+        return
+    for partition in os.listdir(table_dir):
+        partition_dir = os.path.join(table_dir, partition)
+        if not os.path.isdir(partition_dir):
+            continue
+        for name in os.listdir(partition_dir):
+            if name.startswith(prefix):
+                os.remove(os.path.join(partition_dir, name))
+
+def _day(value: datetime) -> str:
+    # SQLite returns naive UTC timestamps
+    if value.tzinfo is not None:
+        value = value.astimezone(timezone.utc)
+    return value.strftime("%Y-%m-%d")
+
+def _write_rows(engine: Engine, name: str, statement, table_dir: str, file_format: str, prefix: str) -> Dict:
+    """Stream ``statement`` into day partitions as ``<prefix><n>.<ext>`` files,
+    one batch of SNAPSHOT_BATCH_SIZE rows read at a time"""
+    import pyarrow as pa
+    
+    model, timestamp = SNAPSHOT_TABLES[name]
+    schema = _arrow_schema(model)
+    rows = files = 0
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=settings.SNAPSHOT_BATCH_SIZE).execute(statement)
+        for batch in result.mappings().partitions():
+            by_day: Dict[str, List[Dict]] = defaultdict(list)
+            for row in batch:
+                by_day[_day(row[timestamp.name])].append(dict(row))
+            for day, records in by_day.items():
+                partition_dir = os.path.join(table_dir, f"date={day}")
+                os.makedirs(partition_dir, exist_ok=True)
+                path = os.path.join(partition_dir, f"{prefix}{files:05d}.{file_format}")
+                _write_file(pa.Table.from_pylist(records, schema=schema), path, file_format)
+                files += 1
+            rows += len(batch)
+    return {"rows": rows, "files": files}
+
+def snapshot_table(
+    engine: Engine,
+    name: str,
+    directory: str,
+    file_format: str,
+    after_id: int,
+    up_to_id: int,
+) -> Dict:
+    """Append rows of ``name`` with ids in ``(after_id, up_to_id]`` to its dataset.
+    
+    Files are laid out as ``<table>/date=YYYY-MM-DD/part-<first id>-<n>.<ext>``.
+    """
+    model, _ = SNAPSHOT_TABLES[name]
+    table_dir = os.path.join(directory, name)
+    prefix = f"part-{after_id + 1:012d}-"
+    _remove_partial_run(table_dir, prefix)
+    
+    statement = select(*model.__table__.columns).where(
+        model.id > after_id, model.id <= up_to_id
+    ).order_by(model.id)
+    result = _write_rows(engine, name, statement, table_dir, file_format, prefix)
+    
+    logger.info("Snapshot written", table=name, after_id=after_id, up_to_id=up_to_id, **result)
+    return result
+
+def _settled_up_to(conn, name: str, after_id: int, until: datetime) -> int:
+    """The highest id past ``after_id`` such that every row up to it is older than ``until``"""
+    model, timestamp = SNAPSHOT_TABLES[name]
+    first_unsettled = conn.scalar(select(func.min(model.id)).where(model.id > after_id, timestamp >= until))
+    if first_unsettled is not None:
+        return first_unsettled - 1
+    return conn.scalar(select(func.max(model.id))) or after_id
+
+def run_snapshot(
+    engine: Engine,
+    directory: Optional[str] = None,
+    file_format: Optional[str] = None,
+    tables: Optional[Iterable[str]] = None,
+    lock=None,
+) -> Dict[str, Dict]:
+    """Export rows added since the last run for each table and advance its watermark.
+    
+    Watermarks are row ids, so rows inserted late with old timestamps are
+    still exported. A run stops short of the first row newer than
+    SNAPSHOT_SETTLE_HOURS, so exits and logouts recorded within that time
+    are included; later updates reach the dataset through reexport_days().
+    Rows committed after a higher id was exported (ids are handed out in
+    blocks in queue mode) are missed too and need the same re-export.
+    
+    Takes the snapshot lock unless ``lock`` (from acquire_lock) is passed
+    in, and releases it.
+    """
+    directory = directory or settings.SNAPSHOT_DIR
+    file_format = file_format or settings.SNAPSHOT_FORMAT
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown snapshot format {file_format!r}")
+    
+    lock = lock or acquire_lock(directory)
+    try:
+        watermarks = read_watermarks(directory)
+        until = datetime.now(timezone.utc) - timedelta(hours=settings.SNAPSHOT_SETTLE_HOURS)
+        results = {}
+        for name in tables or SNAPSHOT_TABLES:
+            after_id = watermarks.get(name, 0)
+            with engine.connect() as conn:
+                up_to_id = _settled_up_to(conn, name, after_id, until)
+            if up_to_id <= after_id:
+                results[name] = {"rows": 0, "files": 0}
+                continue
+            results[name] = snapshot_table(engine, name, directory, file_format, after_id, up_to_id)
+            watermarks[name] = up_to_id
+            _write_watermarks(directory, watermarks)
+        return results
+    finally:
+        release_lock(lock)
+
+def reexport_days(
+    engine: Engine,
+    start: date,
+    end: date,
+    directory: Optional[str] = None,
+    file_format: Optional[str] = None,
+    tables: Optional[Iterable[str]] = None,
+    lock=None,
+) -> Dict[str, Dict]:
+    """Rewrite the day partitions from ``start`` to ``end`` from the rows as they are now.
+    
+    Picks up updates made after the rows were exported, and rows missed by
+    run_snapshot(). Only rows up to each table's watermark are written, so
+    the next run doesn't export them twice; tables never exported are skipped.
+    """
+    directory = directory or settings.SNAPSHOT_DIR
+    file_format = file_format or settings.SNAPSHOT_FORMAT
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown snapshot format {file_format!r}")
+    
+    lower = datetime.combine(start, time.min, tzinfo=timezone.utc)
+    upper = datetime.combine(end + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    days = {f"date={start + timedelta(days=offset):%Y-%m-%d}" for offset in range((end - start).days + 1)}
+    
+    lock = lock or acquire_lock(directory)
+    try:
+        watermarks = read_watermarks(directory)
+        results = {}
+        for name in tables or SNAPSHOT_TABLES:
+            model, timestamp = SNAPSHOT_TABLES[name]
+            up_to_id = watermarks.get(name, 0)
+            if not up_to_id:
+                continue
+            
+            # Written under a name dataset readers skip, then swapped in per day
+            table_dir = os.path.join(directory, name)
+            _remove_partial_run(table_dir, REEXPORT_PREFIX)
+            statement = select(*model.__table__.columns).where(
+                timestamp >= lower, timestamp < upper, model.id <= up_to_id
+            ).order_by(model.id)
+            results[name] = _write_rows(engine, name, statement, table_dir, file_format, REEXPORT_PREFIX)
+            
+            for partition in days & set(os.listdir(table_dir) if os.path.isdir(table_dir) else ()):
+                partition_dir = os.path.join(table_dir, partition)
+                names = os.listdir(partition_dir)
+                for old in names:
+                    if old.startswith("part-"):
+                        os.remove(os.path.join(partition_dir, old))
+                for new in names:
+                    if new.startswith(REEXPORT_PREFIX):
+                        os.replace(os.path.join(partition_dir, new), os.path.join(partition_dir, "part-" + new[len(REEXPORT_PREFIX):]))
+            logger.info("Snapshot days re-exported", table=name, start=str(start), end=str(end), **results[name])
+        return results
+    finally:
+        release_lock(lock)
@@ -0,0 +1,49 @@
+import os
+import tempfile
+
+# Settings are read at import time, so point the app at a throwaway database
+# (never DATABASE_URL, which the tables are dropped from) and an address no
+# Redis listens on, which turns the caches off
+os.environ["DATABASE_URL"] = os.environ.get(
+    "TEST_DATABASE_URL", f"sqlite:///{tempfile.mkdtemp(prefix='pitchvelo-tests-')}/test.db"
+)
+os.environ["REDIS_URL"] = "redis://localhost:1"
+os.environ["ENVIRONMENT"] = "development"
+os.environ["PASSWORD_HASH_WORKERS"] = "0"
+os.environ["BCRYPT_ROUNDS"] = "4"
+
+import pytest
+from fastapi.testclient import TestClient
+import presentation_cache
+from auth import token_cache
+from database import Base, SessionLocal, engine
+from dependencies import principal_cache
+from main import app
+
+@pytest.fixture
+def client():
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    # Ids restart with the tables, so entries cached by earlier tests would be wrong
+    for cache in (token_cache, principal_cache, presentation_cache.local_cache):
+        cache.clear()
+    with TestClient(app) as client:
+        yield client
+
+@pytest.fixture
+def db(client):
+    session = SessionLocal()
+    yield session
+    session.close()
+
+@pytest.fixture
+def make_user(client):
+    """Sign up and log in a user, returning their auth headers"""
+    def make_user(username: str, role: str = "user") -> dict:
+        credentials = {"email": f"{username}@example.com", "password": "password"}
+        response = client.post("/auth/auth/signup", json={**credentials, "username": username, "role": role})
+        assert response.status_code == 200, response.text
+        response = client.post("/auth/auth/login", json=credentials)
+        assert response.status_code == 200, response.text
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+    return make_user
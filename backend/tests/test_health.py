@@ -0,0 +1,17 @@
+from sqlalchemy import event
+from database import engine
+
+def test_health_checks_the_database_without_the_sync_engine(client):
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        response = client.get("/health")
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    assert response.status_code == 200
+    assert response.json()["database"] == "healthy"
+    assert statements == []
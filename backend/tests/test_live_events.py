@@ -0,0 +1,22 @@
+import asyncio
+import redis
+import live_events
+import redis_conn
+
+class FailingStream:
+    """A stream client whose connection drops on the first blocking read"""
+    
+    async def exists(self, stream):
+        return 0
+    
+    async def xread(self, streams, count, block):
+        raise redis.ConnectionError("Connection reset by peer")
+
+async def collect(last_event_id=None):
+    return [message async for message in live_events.stream_events(last_event_id)]
+
+def test_redis_errors_end_the_stream_cleanly(monkeypatch):
+    monkeypatch.setattr(redis_conn, "stream_redis_client", FailingStream())
+    
+    # Just the retry hint, so EventSource reconnects with its Last-Event-ID
+    assert asyncio.run(collect()) == [f"retry: {live_events.RECONNECT_MS}\n\n"]
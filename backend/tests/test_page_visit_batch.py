@@ -0,0 +1,81 @@
+from datetime import datetime, timedelta, timezone
+from config import settings
+from models import PageVisit
+from routes import analytics
+
+BATCH = "/analytics/analytics/page-visits/batch"
+
+def test_batch_reports_a_status_per_event(client, db, make_user):
+    user = make_user("viewer")
+    other = make_user("other")
+    others_visit = client.post("/analytics/analytics/page-visit", headers=other, json={"page_name": "home"}).json()["id"]
+    
+    response = client.post(BATCH, headers=user, json={"events": [
+        {"type": "enter", "page_name": "slides", "client_ref": "a"},
+        {"type": "exit", "client_ref": "a", "exit_time": "2026-01-01T00:00:30Z", "duration_seconds": 30},
+        {"type": "enter", "page_name": "pricing"},
+        {"type": "exit", "visit_id": 999999, "exit_time": "2026-01-01T00:00:30Z", "duration_seconds": 5},
+        {"type": "exit", "visit_id": others_visit, "exit_time": "2026-01-01T00:00:30Z", "duration_seconds": 5},
+    ]})
+    assert response.status_code == 200, response.text
+    results = response.json()["results"]
+    
+    assert [result["index"] for result in results] == [0, 1, 2, 3, 4]
+    assert [result["status"] for result in results] == ["created", "updated", "created", "not_found", "not_found"]
+    assert results[1]["visit_id"] == results[0]["visit_id"]
+    assert results[1]["client_ref"] == "a"
+    
+    visit = db.get(PageVisit, results[0]["visit_id"])
+    assert visit.page_name == "slides"
+    assert visit.duration_seconds == 30
+    # Someone else's visit is not touched
+    assert db.get(PageVisit, others_visit).duration_seconds is None
+
+def test_batch_exit_for_an_earlier_visit_is_updated(client, db, make_user):
+    user = make_user("viewer")
+    visit_id = client.post("/analytics/analytics/page-visit", headers=user, json={"page_name": "home"}).json()["id"]
+    
+    response = client.post(BATCH, headers=user, json={"events": [
+        {"type": "exit", "visit_id": visit_id, "exit_time": "2026-01-01T00:01:00Z", "duration_seconds": 60},
+    ]})
+    assert response.json()["results"] == [
+        {"index": 0, "status": "updated", "visit_id": visit_id, "client_ref": None}
+    ]
+    assert db.get(PageVisit, visit_id).duration_seconds == 60
+
+def test_batch_clamps_client_entry_times(client, db, make_user):
+    user = make_user("viewer")
+    results = client.post(BATCH, headers=user, json={"events": [
+        {"type": "enter", "page_name": "past", "entry_time": "2020-01-01T00:00:00Z"},
+        {"type": "enter", "page_name": "future", "entry_time": "2099-01-01T00:00:00Z"},
+    ]}).json()["results"]
+    
+    now = datetime.now(timezone.utc)
+    past, future = (db.get(PageVisit, result["visit_id"]).entry_time.replace(tzinfo=timezone.utc) for result in results)
+    max_age = timedelta(seconds=settings.ANALYTICS_MAX_ENTRY_AGE_SECONDS)
+    assert abs(past - (now - max_age)) < timedelta(seconds=5)
+    assert abs(future - now) < timedelta(seconds=5)
+
+def test_batch_size_is_limited(client, make_user, monkeypatch):
+    monkeypatch.setattr(settings, "ANALYTICS_BATCH_MAX_EVENTS", 2)
+    user = make_user("viewer")
+    events = [{"type": "enter", "page_name": "slides"}] * 3
+    assert client.post(BATCH, headers=user, json={"events": events}).status_code == 413
+
+def test_queued_exit_matches_its_declared_202_body(client, make_user, monkeypatch):
+    queued = []
+    async def enqueue_event(kind, event):
+        queued.append((kind, event))
+        return True
+    monkeypatch.setattr(analytics, "enqueue_event", enqueue_event)
+    user = make_user("viewer")
+    
+    response = client.put("/analytics/analytics/page-visit/41", headers=user, json={
+        "exit_time": "2026-01-01T00:00:30Z", "duration_seconds": 30,
+    })
+    assert response.status_code == 202, response.text
+    assert set(response.json()) == {"id", "user_id", "exit_time", "duration_seconds"}
+    assert [kind for kind, _ in queued] == ["page_visit_exit"]
+    
+    declared = client.get("/openapi.json").json()["paths"]["/analytics/analytics/page-visit/{visit_id}"]["put"]["responses"]["202"]
+    assert declared["content"]["application/json"]["schema"] == {"$ref": "#/components/schemas/PageVisitExitQueued"}
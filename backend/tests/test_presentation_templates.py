@@ -0,0 +1,94 @@
+import pytest
+from presentation_slides import diff_slides, merge_slides
+
+TEMPLATE = [
+    {"id": 1, "title": "Intro", "subtitle": "", "content": {"body": "Hello"}},
+    {"id": 2, "title": "Pricing", "subtitle": "", "content": {"plans": 3}},
+    {"id": 3, "title": "Team", "subtitle": "", "content": {}},
+]
+
+def edited(*changes):
+    slides = [dict(slide) for slide in TEMPLATE]
+    for change in changes:
+        change(slides)
+    return slides
+
+@pytest.mark.parametrize("slides", [
+    edited(lambda s: s[0].update(title="Welcome")),
+    edited(lambda s: s[1].update(content={"plans": 1})),
+    edited(lambda s: s.pop(1)),
+    edited(lambda s: s.append({"id": 9, "title": "Extra", "subtitle": "x", "content": {}})),
+    edited(lambda s: s.insert(0, {"id": 9, "title": "Extra", "subtitle": "x", "content": {}})),
+    edited(lambda s: s.reverse()),
+    edited(lambda s: s.reverse(), lambda s: s.pop(0), lambda s: s[0].update(subtitle="new")),
+    [],
+])
+def test_diff_then_merge_gives_back_the_deck(slides):
+    assert merge_slides(TEMPLATE, diff_slides(TEMPLATE, slides)) == slides
+
+def test_diff_of_the_bare_template_is_empty():
+    assert diff_slides(TEMPLATE, edited()) is None
+    assert merge_slides(TEMPLATE, None) == TEMPLATE
+
+def test_diff_stores_only_changed_fields():
+    overrides = diff_slides(TEMPLATE, edited(lambda s: s[0].update(title="Welcome"), lambda s: s.pop(2)))
+    
+    assert overrides == {"slides": {"1": {"title": "Welcome"}, "3": None}}
+
+def test_overrides_follow_template_edits():
+    overrides = diff_slides(TEMPLATE, edited(lambda s: s[0].update(title="Welcome")))
+    template = [dict(slide) for slide in TEMPLATE]
+    template[0]["content"] = {"body": "Hi there"}
+    template[1]["title"] = "Plans"
+    
+    merged = merge_slides(template, overrides)
+    
+    assert merged[0] == {"id": 1, "title": "Welcome", "subtitle": "", "content": {"body": "Hi there"}}
+    assert merged[1]["title"] == "Plans"
+
+def test_assigned_presentations_keep_overrides_across_template_edits(client, make_user):
+    admin = make_user("admin", role="admin")
+    first, second = make_user("first"), make_user("second")
+    template = client.post("/forms/forms/presentation-templates", headers=admin, json={
+        "name": "pitch", "slides": TEMPLATE,
+    }).json()
+    
+    response = client.post(f"/forms/forms/presentation-templates/{template['id']}/assign", headers=admin, json={
+        "user_ids": [2, 3, 999],
+    })
+    assert response.json() == {"created": [2, 3], "updated": [], "skipped": [], "unknown_users": [999]}
+    
+    presentation = client.get("/forms/forms/personalized-presentations/2", headers=first).json()
+    response = client.patch(
+        f"/forms/forms/personalized-presentations/{presentation['id']}/slides/1",
+        headers=admin, json={"version": presentation["version"], "title": "Welcome"},
+    )
+    assert response.status_code == 200, response.text
+    
+    response = client.put(f"/forms/forms/presentation-templates/{template['id']}", headers=admin, json={
+        "slides": [{**TEMPLATE[0], "subtitle": "v2"}, *TEMPLATE[1:]],
+    })
+    assert response.status_code == 200, response.text
+    
+    first_slides = client.get("/forms/forms/personalized-presentations/2", headers=first).json()["slides"]
+    second_slides = client.get("/forms/forms/personalized-presentations/3", headers=second).json()["slides"]
+    assert (first_slides[0]["title"], first_slides[0]["subtitle"]) == ("Welcome", "v2")
+    assert (second_slides[0]["title"], second_slides[0]["subtitle"]) == ("Intro", "v2")
+
+def test_rebase_keeps_an_existing_deck(client, make_user):
+    admin = make_user("admin", role="admin")
+    viewer = make_user("viewer")
+    deck = edited(lambda s: s.pop(1), lambda s: s[0].update(title="Mine"))
+    client.post("/forms/forms/personalized-presentations", headers=admin, json={"user_id": 2, "slides": deck})
+    template = client.post("/forms/forms/presentation-templates", headers=admin, json={
+        "name": "pitch", "slides": TEMPLATE,
+    }).json()
+    
+    response = client.post(f"/forms/forms/presentation-templates/{template['id']}/assign", headers=admin, json={
+        "user_ids": [2], "existing": "rebase",
+    })
+    assert response.json()["updated"] == [2]
+    
+    presentation = client.get("/forms/forms/personalized-presentations/2", headers=viewer).json()
+    assert presentation["template_id"] == template["id"]
+    assert presentation["slides"] == deck
@@ -0,0 +1,92 @@
+import pytest
+from sqlalchemy.exc import IntegrityError
+from models import PersonalizedPresentation, User
+from routes.forms import violates_active_presentation_index
+
+PRESENTATIONS = "/forms/forms/personalized-presentations"
+
+def slide(slide_id: int, title: str) -> dict:
+    return {"id": slide_id, "title": title, "subtitle": "", "content": {}}
+
+def create_presentation(client, admin, user_id: int) -> dict:
+    response = client.post(PRESENTATIONS, headers=admin, json={
+        "user_id": user_id,
+        "slides": [slide(1, "Intro"), slide(2, "Pricing")],
+    })
+    assert response.status_code == 200, response.text
+    return response.json()
+
+def test_patch_with_a_stale_version_conflicts(client, make_user):
+    admin = make_user("admin", role="admin")
+    viewer = make_user("viewer")
+    presentation = create_presentation(client, admin, user_id=2)
+    assert presentation["version"] == 1
+    slides_url = f"{PRESENTATIONS}/{presentation['id']}/slides"
+    
+    response = client.patch(f"{slides_url}/1", headers=admin, json={"version": 1, "title": "Welcome"})
+    assert response.status_code == 200, response.text
+    assert response.json()["version"] == 2
+    
+    # A second editor still holding version 1 must not overwrite the first edit
+    response = client.patch(f"{slides_url}/1", headers=admin, json={"version": 1, "title": "Hello"})
+    assert response.status_code == 409
+    assert "version 2" in response.json()["detail"]
+    
+    slides = client.get(f"{PRESENTATIONS}/2", headers=viewer).json()["slides"]
+    assert [s["title"] for s in slides] == ["Welcome", "Pricing"]
+
+def test_patch_inserts_and_moves_slides(client, make_user):
+    admin = make_user("admin", role="admin")
+    viewer = make_user("viewer")
+    presentation = create_presentation(client, admin, user_id=2)
+    slides_url = f"{PRESENTATIONS}/{presentation['id']}/slides"
+    
+    # A new slide needs every field
+    response = client.patch(f"{slides_url}/3", headers=admin, json={"version": 1, "title": "Team"})
+    assert response.status_code == 400
+    
+    response = client.patch(f"{slides_url}/3", headers=admin, json={"version": 1, "position": 0, **slide(3, "Team")})
+    assert response.json()["version"] == 2
+    response = client.patch(f"{slides_url}/1", headers=admin, json={"version": 2, "position": 5})
+    assert response.json()["version"] == 3
+    
+    slides = client.get(f"{PRESENTATIONS}/2", headers=viewer).json()["slides"]
+    assert [s["id"] for s in slides] == [3, 2, 1]
+
+def test_put_with_a_stale_version_conflicts(client, make_user):
+    admin = make_user("admin", role="admin")
+    make_user("viewer")
+    presentation = create_presentation(client, admin, user_id=2)
+    url = f"{PRESENTATIONS}/{presentation['id']}"
+    
+    response = client.put(url, headers=admin, json={"version": 1, "title": "First"})
+    assert response.status_code == 200, response.text
+    assert response.json()["version"] == 2
+    
+    response = client.put(url, headers=admin, json={"version": 1, "title": "Second"})
+    assert response.status_code == 409
+    
+    # Without a version the update is unconditional
+    response = client.put(url, headers=admin, json={"title": "Third"})
+    assert response.json()["version"] == 3
+
+class AsyncpgError(Exception):
+    def __init__(self, constraint_name: str):
+        self.constraint_name = constraint_name
+
+def integrity_error(constraint_name: str) -> IntegrityError:
+    orig = Exception("violation")
+    orig.__cause__ = AsyncpgError(constraint_name)
+    return IntegrityError("INSERT", {}, orig)
+
+def test_only_the_active_presentation_index_is_reported_as_a_duplicate(db):
+    db.add(User(email="viewer@example.com", username="viewer", hashed_password="x"))
+    db.commit()
+    db.add_all([PersonalizedPresentation(user_id=1), PersonalizedPresentation(user_id=1)])
+    with pytest.raises(IntegrityError) as sqlite_error:
+        db.commit()
+    db.rollback()
+    assert violates_active_presentation_index(sqlite_error.value)
+    
+    assert violates_active_presentation_index(integrity_error("uq_personalized_presentations_active_user"))
+    assert not violates_active_presentation_index(integrity_error("personalized_presentations_user_id_fkey"))
@@ -0,0 +1,49 @@
+import numpy as np
+import pytest
+from session_stats import PERCENTILES, SessionArrays, grouped_distributions, session_durations
+
+@pytest.mark.parametrize("group_count", [1, 7, 40000])
+def test_grouped_distributions_match_numpy(group_count):
+    rng = np.random.default_rng(group_count)
+    groups = rng.integers(0, group_count, size=5000)
+    values = rng.exponential(120, size=5000)
+    
+    stats = grouped_distributions(groups, values, group_count)
+    
+    for group in np.unique(groups)[:200]:
+        members = values[groups == group]
+        assert stats["count"][group] == members.size
+        assert stats["mean"][group] == pytest.approx(members.mean())
+        for p, expected in zip(PERCENTILES, np.percentile(members, PERCENTILES)):
+            assert stats[f"p{p}"][group] == pytest.approx(expected)
+
+def test_grouped_distributions_leave_empty_groups_nan():
+    stats = grouped_distributions(np.array([0, 0, 2]), np.array([1.0, 3.0, 5.0]), 4)
+    
+    assert list(stats["count"]) == [2, 0, 1, 0]
+    assert stats["p50"][0] == 2.0
+    assert stats["p50"][2] == 5.0
+    for name in ("mean", *(f"p{p}" for p in PERCENTILES)):
+        assert np.isnan(stats[name][1]) and np.isnan(stats[name][3])
+
+def test_grouped_distributions_of_nothing():
+    stats = grouped_distributions(np.array([], dtype=np.int64), np.array([]), 2)
+    
+    assert list(stats["count"]) == [0, 0]
+    assert np.isnan(stats["p99"]).all()
+
+def test_session_durations_match_the_scalar_rules():
+    now = 100000.0
+    sessions = SessionArrays(
+        user_id=np.array([1, 1, 2, 3]),
+        login=np.array([now - 50, now - 500, now - 30, now - 200000]),
+        stored_duration=np.array([np.nan, 120.0, np.nan, np.nan]),
+        logout=np.array([now - 10, np.nan, np.nan, np.nan]),
+    )
+    
+    durations, completed = session_durations(sessions, now)
+    
+    # Logout wins, then the stored duration; open sessions count until now
+    # unless they are older than a day
+    assert list(durations) == [40.0, 120.0, 30.0, 0.0]
+    assert list(completed) == [True, True, False, False]
@@ -0,0 +1,63 @@
+from datetime import datetime, timedelta, timezone
+import pyarrow.dataset as ds
+from config import settings
+from database import engine
+from models import PageVisit, User
+from snapshots import acquire_lock, read_watermarks, reexport_days, release_lock, run_snapshot, snapshot_running
+
+def add_visit(db, entry_time: datetime, page_name: str = "slides") -> PageVisit:
+    visit = PageVisit(user_id=1, page_name=page_name, entry_time=entry_time)
+    db.add(visit)
+    db.commit()
+    return visit
+
+def exported(directory) -> dict:
+    table = ds.dataset(str(directory / "page_visits"), format="parquet", partitioning="hive").to_table()
+    return dict(zip(table.column("id").to_pylist(), table.column("duration_seconds").to_pylist()))
+
+def test_late_rows_and_updates_reach_the_snapshot(db, tmp_path):
+    db.add(User(email="viewer@example.com", username="viewer", hashed_password="x"))
+    db.commit()
+    old = (datetime.now(timezone.utc) - timedelta(days=3)).replace(hour=12, minute=0, second=0, microsecond=0)
+    
+    first = add_visit(db, old)
+    recent = add_visit(db, datetime.now(timezone.utc))
+    run_snapshot(engine, str(tmp_path), tables=["page_visits"])
+    # The recent visit hasn't settled, so the watermark stops short of it
+    assert exported(tmp_path) == {first.id: None}
+    assert read_watermarks(str(tmp_path)) == {"page_visits": first.id}
+    
+    # Inserted after the run with a timestamp older than everything exported
+    late = add_visit(db, old - timedelta(hours=1))
+    first.duration_seconds = 30.0
+    db.commit()
+    run_snapshot(engine, str(tmp_path), tables=["page_visits"])
+    assert exported(tmp_path) == {first.id: None}
+    
+    recent.entry_time = old + timedelta(hours=1)
+    db.commit()
+    run_snapshot(engine, str(tmp_path), tables=["page_visits"])
+    assert exported(tmp_path) == {first.id: None, recent.id: None, late.id: None}
+    
+    # The exit landed after the day was exported
+    results = reexport_days(engine, old.date(), old.date(), str(tmp_path), tables=["page_visits"])
+    assert results == {"page_visits": {"rows": 3, "files": 1}}
+    assert exported(tmp_path) == {first.id: 30.0, recent.id: None, late.id: None}
+    
+    # Re-exporting doesn't move the watermark, so the next run adds nothing twice
+    run_snapshot(engine, str(tmp_path), tables=["page_visits"])
+    assert sorted(exported(tmp_path)) == sorted([first.id, recent.id, late.id])
+
+def test_status_does_not_take_the_lock(client, make_user, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "SNAPSHOT_DIR", str(tmp_path))
+    admin = make_user("admin", role="admin")
+    assert client.get("/exports/exports/snapshots", headers=admin).json()["running"] is False
+    
+    lock = acquire_lock(str(tmp_path))
+    try:
+        assert client.get("/exports/exports/snapshots", headers=admin).json()["running"] is True
+        # The status check left the holder's pid in place
+        assert snapshot_running(str(tmp_path))
+    finally:
+        release_lock(lock)
+    assert client.get("/exports/exports/snapshots", headers=admin).json()["running"] is False
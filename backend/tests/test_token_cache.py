@@ -0,0 +1,16 @@
+from auth import token_cache
+
+def test_deleted_user_is_refused_despite_cached_claims(client, make_user):
+    admin = make_user("admin", role="admin")
+    viewer = make_user("viewer")
+    assert client.get("/forms/forms/my-submission", headers=viewer).status_code == 404
+    
+    users = client.get("/users/users/", headers=admin).json()
+    viewer_id = next(user["id"] for user in users if user["username"] == "viewer")
+    assert client.delete(f"/users/users/{viewer_id}", headers=admin).status_code == 200
+    
+    # The claims stay cached, but the principal behind them is gone
+    assert len(token_cache) == 2
+    response = client.get("/forms/forms/my-submission", headers=viewer)
+    assert response.status_code == 401
+    assert response.json()["detail"] == "User not found"
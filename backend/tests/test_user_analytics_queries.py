@@ -0,0 +1,65 @@
+from contextlib import contextmanager
+from sqlalchemy import event
+from database import async_engine
+from dependencies import principal_cache
+from models import FormSubmission, LoginEvent, LogoutEvent, PageVisit, User
+
+@contextmanager
+def count_statements():
+    statements = []
+    
+    def record(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+    
+    event.listen(async_engine.sync_engine, "before_cursor_execute", record)
+    try:
+        yield statements
+    finally:
+        event.remove(async_engine.sync_engine, "before_cursor_execute", record)
+
+def add_users(db, count: int, start: int = 0):
+    for i in range(start, start + count):
+        user = User(email=f"user{i}@example.com", username=f"user{i}", hashed_password="x", role="user")
+        db.add(user)
+        db.flush()
+        login = LoginEvent(user_id=user.id, session_duration_seconds=60)
+        db.add(login)
+        db.flush()
+        db.add_all([
+            LogoutEvent(user_id=user.id, login_event_id=login.id),
+            PageVisit(user_id=user.id, page_name="slides", duration_seconds=30),
+            PageVisit(user_id=user.id, page_name="pricing"),
+            FormSubmission(user_id=user.id, feedback="good", rating=5),
+        ])
+    db.commit()
+
+def user_analytics_statements(client, headers, **params) -> tuple:
+    with count_statements() as statements:
+        response = client.get("/analytics/analytics/user-analytics", headers=headers, params=params)
+    assert response.status_code == 200, response.text
+    return len(statements), response.json()
+
+def test_user_analytics_query_count_does_not_grow_with_users(client, db, make_user):
+    admin = make_user("admin", role="admin")
+    add_users(db, 2)
+    
+    # The page of users plus one query per relationship, and the admin's
+    # principal while it isn't cached yet
+    count, analytics = user_analytics_statements(client, admin)
+    assert len(analytics) == 3
+    assert count == 6
+    
+    principal_cache.clear()
+    add_users(db, 20, start=2)
+    count, analytics = user_analytics_statements(client, admin)
+    assert len(analytics) == 23
+    assert count == 6
+    
+    count, _ = user_analytics_statements(client, admin, user_id=3)
+    assert count == 5
+    
+    user = next(entry for entry in analytics if entry["user"]["username"] == "user5")
+    assert len(user["login_events"]) == 1
+    assert len(user["logout_events"]) == 1
+    assert len(user["page_visits"]) == 2
+    assert len(user["form_submissions"]) == 1
@@ -9,7 +9,7 @@ import AdminUserTable from '@/components/AdminUserTable';
 import AnalyticsTable from '@/components/AnalyticsTable';
 import SubmissionsTable from '@/components/SubmissionsTable';
 import PersonalizedPresentationsManager from '@/components/PersonalizedPresentationsManager';
-import { usersAPI, analyticsAPI } from '@/lib/api';
+import { usersAPI, analyticsAPI, fetchAllPages } from '@/lib/api';
 import { AnimatePresence } from 'framer-motion';
 import { 
   Users, 
@@ -47,21 +47,22 @@ export default function AdminPage() {
       setIsLoading(true);
       setError(null);
       
-      const [usersResponse, analyticsResponse] = await Promise.all([
-        usersAPI.getAll(),
-        analyticsAPI.getSimplifiedAnalytics(),
+      // The stats cover every user, so read past the first page
+      const [allUsers, allAnalytics] = await Promise.all([
+        fetchAllPages(usersAPI.getAll),
+        fetchAllPages(analyticsAPI.getSimplifiedAnalytics),
       ]);
       
-      setUsers(usersResponse.data);
-      setAnalytics(analyticsResponse.data);
+      setUsers(allUsers);
+      setAnalytics(allAnalytics);
       
       // Calculate stats from simplified analytics
-      const totalUsers = usersResponse.data.length;
-      const totalVisits = analyticsResponse.data.reduce((acc: number, user: any) => 
+      const totalUsers = allUsers.length;
+      const totalVisits = allAnalytics.reduce((acc: number, user: any) => 
         acc + user.total_logins, 0);
-      const totalSubmissions = analyticsResponse.data.reduce((acc: number, user: any) => 
+      const totalSubmissions = allAnalytics.reduce((acc: number, user: any) => 
         acc + (user.has_submitted_form ? 1 : 0), 0);
-      const totalTimeSpent = analyticsResponse.data.reduce((acc: number, user: any) => 
+      const totalTimeSpent = allAnalytics.reduce((acc: number, user: any) => 
         acc + user.total_time_spent_seconds, 0);
 
       setStats({
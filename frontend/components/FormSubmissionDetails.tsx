@@ -27,14 +27,9 @@ export default function FormSubmissionDetails() {
   useEffect(() => {
     const fetchSubmission = async () => {
       try {
-        const response = await formsAPI.getSubmissions();
-        // Get the most recent submission for the current user
-        const submissions = response.data;
-        if (submissions && submissions.length > 0) {
-          setSubmission(submissions[0]); // Most recent submission
-        } else {
-          setSubmission(null);
-        }
+        // The submissions list is admin-only and paginated; this is the user's own
+        const response = await formsAPI.getMySubmission();
+        setSubmission(response.data);
       } catch (error: any) {
         if (error.response?.status === 404) {
           // No submission found
@@ -14,7 +14,7 @@ import {
   Settings,
   UserCheck
 } from 'lucide-react';
-import { personalizedPresentationsAPI, usersAPI, PersonalizedPresentationWithUser, User } from '@/lib/api';
+import { personalizedPresentationsAPI, usersAPI, fetchAllPages, PersonalizedPresentationWithUser, User } from '@/lib/api';
 import SlideEditor from './SlideEditor';
 
 interface PersonalizedPresentationsManagerProps {
@@ -156,12 +156,12 @@ export default function PersonalizedPresentationsManager({ onClose }: Personaliz
   const loadData = async () => {
     try {
       setIsLoading(true);
-      const [presentationsRes, usersRes] = await Promise.all([
-        personalizedPresentationsAPI.getAll(),
-        usersAPI.getAll()
+      const [allPresentations, allUsers] = await Promise.all([
+        fetchAllPages<PersonalizedPresentationWithUser>(personalizedPresentationsAPI.getAll),
+        fetchAllPages<User>(usersAPI.getAll)
       ]);
-      setPresentations(presentationsRes.data);
-      setUsers(usersRes.data);
+      setPresentations(allPresentations);
+      setUsers(allUsers);
     } catch (error: any) {
       setError(error.response?.data?.detail || 'Failed to load data');
     } finally {
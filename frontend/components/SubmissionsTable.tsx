@@ -13,7 +13,7 @@ import {
   Download,
   Filter
 } from 'lucide-react';
-import { formsAPI } from '@/lib/api';
+import { formsAPI, fetchAllPages } from '@/lib/api';
 import toast from 'react-hot-toast';
 
 interface SubmissionData {
@@ -46,8 +46,8 @@ export default function SubmissionsTable() {
   useEffect(() => {
     const fetchSubmissions = async () => {
       try {
-        const response = await formsAPI.getSubmissions();
-        setSubmissions(response.data);
+        // Filtering and the CSV export work on every submission
+        setSubmissions(await fetchAllPages<SubmissionData>(formsAPI.getSubmissions));
       } catch (error: any) {
         toast.error('Failed to load submissions');
         console.error('Error fetching submissions:', error);
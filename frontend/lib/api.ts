@@ -32,6 +32,34 @@ api.interceptors.response.use(
   }
 );
 
+// List endpoints are keyset-paginated; the next page's cursor comes back in a header
+export interface ListParams {
+  cursor?: string;
+  limit?: number;
+  [filter: string]: string | number | boolean | undefined;
+}
+
+export const getNextCursor = (response: { headers: Record<string, any> }): string | undefined =>
+  response.headers['x-next-cursor'];
+
+// The backend's MAX_PAGE_SIZE
+const MAX_PAGE_SIZE = 1000;
+
+// Follows the cursor to the end of a list, for views that work on every row
+export const fetchAllPages = async <T = any>(
+  getPage: (params: ListParams) => Promise<{ data: T[]; headers: Record<string, any> }>,
+  params: ListParams = {}
+): Promise<T[]> => {
+  const rows: T[] = [];
+  let cursor: string | undefined;
+  do {
+    const response = await getPage({ limit: MAX_PAGE_SIZE, ...params, cursor });
+    rows.push(...response.data);
+    cursor = getNextCursor(response);
+  } while (cursor);
+  return rows;
+};
+
 // Auth API
 export const authAPI = {
   login: (data: { email: string; password: string }) =>
@@ -47,7 +75,7 @@ export const authAPI = {
 
 // Users API
 export const usersAPI = {
-  getAll: () => api.get('/users/users/'),
+  getAll: (params?: ListParams) => api.get('/users/users/', { params }),
   getById: (id: number) => api.get(`/users/users/${id}`),
   create: (data: any) => api.post('/users/users/', data),
   update: (id: number, data: any) => api.put(`/users/users/${id}`, data),
@@ -57,7 +85,8 @@ export const usersAPI = {
 // Forms API
 export const formsAPI = {
   submit: (data: any) => api.post('/forms/forms/submit', data),
-  getSubmissions: () => api.get('/forms/forms/submissions'),
+  getSubmissions: (params?: ListParams) => api.get('/forms/forms/submissions', { params }),
+  getMySubmission: () => api.get('/forms/forms/my-submission'),
   getSubmissionById: (id: number) => api.get(`/forms/forms/submissions/${id}`),
 };
 
@@ -69,9 +98,13 @@ export const analyticsAPI = {
   updatePageVisit: (visitId: number, data: { exit_time: string; duration_seconds: number }) =>
     api.put(`/analytics/analytics/page-visit/${visitId}`, data),
   
-  getUserAnalytics: () => api.get('/analytics/analytics/user-analytics'),
+  recordPageVisitBatch: (events: PageVisitEvent[]) =>
+    api.post('/analytics/analytics/page-visits/batch', { events }),
   
-  getSimplifiedAnalytics: () => api.get('/analytics/analytics/simplified-analytics'),
+  getUserAnalytics: (params?: ListParams) => api.get('/analytics/analytics/user-analytics', { params }),
+  
+  getSimplifiedAnalytics: (params?: ListParams) =>
+    api.get('/analytics/analytics/simplified-analytics', { params }),
   
   getMyAnalytics: () => api.get('/analytics/analytics/my-analytics'),
 };
@@ -79,7 +112,7 @@ export const analyticsAPI = {
 // Personalized Presentations API
 export const personalizedPresentationsAPI = {
   create: (data: any) => api.post('/forms/forms/personalized-presentations', data),
-  getAll: () => api.get('/forms/forms/personalized-presentations'),
+  getAll: (params?: ListParams) => api.get('/forms/forms/personalized-presentations', { params }),
   getByUserId: (userId: number) => api.get(`/forms/forms/personalized-presentations/${userId}`),
   update: (presentationId: number, data: any) => 
     api.put(`/forms/forms/personalized-presentations/${presentationId}`, data),
@@ -110,6 +143,16 @@ export interface FormSubmission {
   submitted_at: string;
 }
 
+export interface PageVisitEvent {
+  type: 'enter' | 'exit';
+  client_ref?: string;
+  page_name?: string;
+  entry_time?: string;
+  visit_id?: number;
+  exit_time?: string;
+  duration_seconds?: number;
+}
+
 export interface UserSessionData {
   login_timestamp: string;
   logout_timestamp?: string;
@@ -123,6 +166,8 @@ export interface SimplifiedUserAnalytics {
   total_time_spent_seconds: number;
   total_logins: number;
   has_submitted_form: boolean;
+  activity_sessions: number;
+  activity_time_seconds: number;
 }
 
 export interface SlideContent {